@@ -1,34 +1,245 @@
 
-from flask import Flask, request, redirect, url_for, render_template, jsonify, session, make_response
-from services.mongodb_service import get_collection
-from datetime import datetime
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from io import BytesIO
+from flask import Flask, request, redirect, url_for, render_template, jsonify, session, Response, stream_with_context, send_file
+from utils.datetimes import parse_timestamp
+from services.mongodb_service import get_collection, pool_stats
+from services.risk_service import RISK_FIELDS, score_documents
+from services.index_service import ensure_indexes
+from services.report_service import collection_version, submit_report, get_job
+from services.stats_service import read_counters
+from utils.ttl_cache import TTLCache
+from config1.config import CONFIG
+from datetime import datetime, timedelta
+from io import StringIO
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from bson import ObjectId, json_util
+from bisect import bisect_left
+import csv
+import heapq
+import json
 
 app = Flask(__name__, template_folder='.')
 app.secret_key = 'your-secret-key-123'  # Replace with a secure key in production
 
-def calculate_risk_score(collection, identifier, field):
-    """Count occurrences of an identifier in a field across the collection."""
-    return collection.count_documents({field: identifier})
-
-def parse_datetime(dt):
-    """Convert string datetime to datetime object, or return as-is if already datetime."""
-    if isinstance(dt, str):
-        try:
-            # Try ISO format (e.g., "2025-07-06T12:25:30Z")
-            return datetime.strptime(dt.replace("Z", ""), "%Y-%m-%dT%H:%M:%S")
-        except ValueError:
-            try:
-                # Try standard format (e.g., "2025-07-06 12:25:30")
-                return datetime.strptime(dt, "%Y-%m-%d %H:%M:%S")
-            except ValueError:
-                # Try DD-MM-YYYY format (e.g., "06-07-2025 12:25:30")
-                return datetime.strptime(dt, "%d-%m-%Y %H:%M:%S")
-    return dt
+SCAMMER_CLASSIFICATIONS = ["scammer", "scammer_image", "scammer_voice"]
+SCAMMER_FIELDS = ["user", "text", "upi_ids", "phones", "account_numbers", "socials", "datetime", "risk_score"]
+EMAIL_FIELDS = ["_id", "scam_report_id", "category", "to_email", "subject", "status", "sent_at"]
+API_DEFAULT_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+EXPORT_FORMATS = ["ndjson", "csv"]
+EXPORT_BATCH_SIZE = 1000
+DASHBOARD_READ_PREFERENCE = CONFIG["dashboard_read_preference"]
+HIGH_RISK_SCORE = 5  # Scores above this count as high risk
+HIGH_RISK_LIST_SIZE = 100
+RISK_BUCKET_BOUNDS = [2, 5, 10, 20]  # Upper bounds of the dashboard's risk histogram; the last bucket is open
+RECENT_DAYS = 7
+OVERVIEW_CACHE_SECONDS = 60
+
+_risk_summaries = TTLCache(maxsize=16, ttl=OVERVIEW_CACHE_SECONDS)
+
+def scammer_query(search_query, classification):
+    """Build the contacts filter shared by the scammer listings."""
+    query = {"classification": classification}
+    if search_query:
+        query["$or"] = [
+            {"user": search_query},
+            {"upi_ids": search_query},
+            {"phones": search_query},
+            {"account_numbers": search_query},
+            {"socials": search_query}
+        ]
+    return query
+
+def email_query(search_query):
+    """Build the sent_emails filter shared by the email listings."""
+    query = {}
+    if search_query:
+        query["$or"] = [
+            {"scam_report_id": search_query},
+            {"to_email": search_query},
+            {"subject": search_query},
+            {"category": search_query}
+        ]
+    return query
+
+def serialize_scammer(doc, risk_score):
+    dt = parse_timestamp(doc.get("datetime", datetime.utcnow()))
+    return {
+        "user": doc.get("user", "Unknown"),
+        "text": doc.get("text", ""),
+        "upi_ids": doc.get("upi_ids", []),
+        "phones": doc.get("phones", []),
+        "account_numbers": doc.get("account_numbers", []),
+        "socials": doc.get("socials", []),
+        "datetime": dt.strftime("%Y-%m-%d %H:%M:%S"),
+        "risk_score": risk_score
+    }
+
+def serialize_email(doc):
+    dt = parse_timestamp(doc.get("sent_at", datetime.utcnow()))
+    return {
+        "_id": str(doc.get("_id")),
+        "scam_report_id": doc.get("scam_report_id", "Unknown"),
+        "category": doc.get("category", "Unknown"),
+        "to_email": doc.get("to_email", "Unknown"),
+        "subject": doc.get("subject", ""),
+        "status": doc.get("status", "Unknown"),
+        "sent_at": dt.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+def encode_cursor(doc, sort_field):
+    """Opaque keyset cursor for the (sort_field, _id) position of doc."""
+    raw = json_util.dumps({"v": doc.get(sort_field), "id": doc["_id"]})
+    return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(token):
+    try:
+        raw = urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        cursor = json_util.loads(raw)
+        value, last_id = cursor["v"], cursor["id"]
+    except Exception:
+        raise ValueError("Invalid cursor")
+    # Both go straight into the filter, so a crafted cursor must not smuggle in operators
+    if not isinstance(value, (datetime, str, type(None))) or not isinstance(last_id, ObjectId):
+        raise ValueError("Invalid cursor")
+    return value, last_id
+
+def keyset_filter(sort_field, token):
+    """Filter for the rows after a cursor in (sort_field desc, _id desc) order."""
+    value, last_id = decode_cursor(token)
+    clauses = [{sort_field: value, "_id": {"$lt": last_id}}]
+    if value is not None:
+        clauses.append({sort_field: {"$lt": value}})
+        # Range operators only compare within one BSON type, so rows of a type that
+        # sorts below the cursor's (strings and nulls below dates) must be added explicitly.
+        if isinstance(value, datetime):
+            clauses.append({sort_field: {"$not": {"$type": "date"}}})
+        else:
+            clauses.append({sort_field: None})
+    return {"$or": clauses}
+
+def page_args(allowed_fields):
+    """Parse limit, fields and cursor query parameters for the paginated API."""
+    try:
+        limit = int(request.args.get('limit', API_DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    limit = min(limit, API_MAX_PAGE_SIZE)
+    return limit, requested_fields(allowed_fields), request.args.get('cursor')
+
+def requested_fields(allowed_fields):
+    """Parse the fields= query parameter, defaulting to every allowed field."""
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+    unknown = [f for f in fields if f not in allowed_fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields or list(allowed_fields)
+
+def scammer_projection(fields):
+    projection = {f: 1 for f in fields if f != "risk_score"}
+    if "risk_score" in fields:
+        projection.update({f: 1 for f in RISK_FIELDS})
+    return projection
+
+def iter_batches(cursor, size):
+    """Group a Mongo cursor into lists of at most size documents."""
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def score_in_batches(collection, cursor):
+    """(doc, risk_score) pairs for a cursor, one risk aggregation per EXPORT_BATCH_SIZE documents."""
+    for batch in iter_batches(cursor.batch_size(EXPORT_BATCH_SIZE), EXPORT_BATCH_SIZE):
+        yield from score_documents(collection, batch)
+
+def iter_scammer_rows(collection, query, fields):
+    """Yield serialized scammer rows, scoring risk one cursor batch at a time."""
+    cursor = collection.find(query, scammer_projection(fields)).sort([("datetime", -1), ("_id", -1)]).batch_size(EXPORT_BATCH_SIZE)
+    for batch in iter_batches(cursor, EXPORT_BATCH_SIZE):
+        if "risk_score" in fields:
+            scored = score_documents(collection, batch)
+        else:
+            scored = [(doc, None) for doc in batch]
+        for doc, risk_score in scored:
+            row = serialize_scammer(doc, risk_score)
+            yield {f: row[f] for f in fields}
+
+def risk_summary(collection, query):
+    """
+    High-risk count, risk histogram and the HIGH_RISK_LIST_SIZE riskiest rows
+    for the scammers matching query. Risk is scored in export batches, and the
+    result is kept per collection_version so dashboard reloads do not rescore.
+    """
+    version = collection_version(collection, query)
+    summary = _risk_summaries.get(version)
+    if summary is not None:
+        return summary
+    buckets = [0] * (len(RISK_BUCKET_BOUNDS) + 1)
+    high_risk = 0
+    riskiest = []  # Min-heap of (risk_score, position, row)
+    for position, row in enumerate(iter_scammer_rows(collection, query, SCAMMER_FIELDS)):
+        buckets[bisect_left(RISK_BUCKET_BOUNDS, row["risk_score"])] += 1
+        if row["risk_score"] > HIGH_RISK_SCORE:
+            high_risk += 1
+            # Ties keep the newer row, which the datetime-descending scan yields first
+            entry = (row["risk_score"], -position, row)
+            if len(riskiest) < HIGH_RISK_LIST_SIZE:
+                heapq.heappush(riskiest, entry)
+            elif entry > riskiest[0]:
+                heapq.heapreplace(riskiest, entry)
+    summary = {
+        "high_risk": high_risk,
+        "risk_buckets": buckets,
+        "riskiest": [row for _, _, row in sorted(riskiest, reverse=True)]
+    }
+    _risk_summaries.set(version, summary)
+    return summary
+
+def iter_email_rows(collection, query, fields):
+    cursor = collection.find(query, {f: 1 for f in fields}).sort([("sent_at", -1), ("_id", -1)]).batch_size(EXPORT_BATCH_SIZE)
+    for doc in cursor:
+        row = serialize_email(doc)
+        yield {f: row[f] for f in fields}
+
+def export_response(rows, fields, export_format, name):
+    """Stream rows as NDJSON or CSV without materializing the result set."""
+    def generate_ndjson():
+        for row in rows:
+            yield json.dumps(row) + "\n"
+
+    def generate_csv():
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow([", ".join(v) if isinstance(v, list) else v for v in (row[f] for f in fields)])
+            if buffer.tell() >= 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        yield buffer.getvalue()
+
+    if export_format == 'csv':
+        response = Response(stream_with_context(generate_csv()), mimetype='text/csv')
+    else:
+        response = Response(stream_with_context(generate_ndjson()), mimetype='application/x-ndjson')
+    response.headers['Content-Disposition'] = f'attachment; filename={name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{export_format}'
+    return response
+
+def fetch_page(collection, query, sort_field, projection, limit, cursor):
+    """Fetch one keyset page; returns (docs, next_cursor)."""
+    if cursor:
+        query = {"$and": [query, keyset_filter(sort_field, cursor)]}
+    projection = dict(projection, **{sort_field: 1})
+    docs = list(collection.find(query, projection).sort([(sort_field, -1), ("_id", -1)]).limit(limit + 1))
+    next_cursor = encode_cursor(docs[limit - 1], sort_field) if len(docs) > limit else None
+    return docs[:limit], next_cursor
 
 @app.route('/')
 @app.route('/login')
@@ -66,52 +277,15 @@ def logout():
 def dashboard():
     if not session.get('logged_in'):
         return redirect('/login')
-    collection = get_collection("contacts", db_type="scam_database")
-    email_collection = get_collection("sent_emails", db_type="email_transactions")
+    collection = get_collection("contacts", db_type="scam_database", read_preference=DASHBOARD_READ_PREFERENCE)
+    email_collection = get_collection("sent_emails", db_type="email_transactions", read_preference=DASHBOARD_READ_PREFERENCE)
     search_query = request.args.get('search', '').strip()
     
-    query = {"classification": {"$in": ["scammer", "scammer_image", "scammer_voice"]}}
-    if search_query:
-        query["$or"] = [
-            {"user": search_query},
-            {"upi_ids": search_query},
-            {"phones": search_query},
-            {"account_numbers": search_query},
-            {"socials": search_query}
-        ]
-    
-    scammers = []
-    for doc in collection.find(query).sort("datetime", -1).limit(10000):
-        risk_score = 0
-        for field in ["upi_ids", "phones", "account_numbers", "socials"]:
-            for item in doc.get(field, []):
-                risk_score += calculate_risk_score(collection, item, field)
-        
-        dt = parse_datetime(doc.get("datetime", datetime.now()))
-        
-        scammers.append({
-            "user": doc.get("user", "Unknown"),
-            "text": doc.get("text", ""),
-            "upi_ids": doc.get("upi_ids", []),
-            "phones": doc.get("phones", []),
-            "account_numbers": doc.get("account_numbers", []),
-            "socials": doc.get("socials", []),
-            "datetime": dt.strftime("%Y-%m-%d %H:%M:%S"),
-            "risk_score": risk_score
-        })
+    query = scammer_query(search_query, {"$in": SCAMMER_CLASSIFICATIONS})
+    docs = collection.find(query).sort("datetime", -1).limit(10000)
+    scammers = [serialize_scammer(doc, risk_score) for doc, risk_score in score_in_batches(collection, docs)]
     
-    emails = []
-    for doc in email_collection.find().sort("sent_at", -1).limit(10000):
-        dt = parse_datetime(doc.get("sent_at", datetime.now()))
-        emails.append({
-            "_id": str(doc.get("_id")),
-            "scam_report_id": doc.get("scam_report_id", "Unknown"),
-            "category": doc.get("category", "Unknown"),
-            "to_email": doc.get("to_email", "Unknown"),
-            "subject": doc.get("subject", ""),
-            "status": doc.get("status", "Unknown"),
-            "sent_at": dt.strftime("%Y-%m-%d %H:%M:%S")
-        })
+    emails = [serialize_email(doc) for doc in email_collection.find({}, {"body": 0}).sort("sent_at", -1).limit(10000)]
     
     return render_template('dashboard.html', scammers=scammers, emails=emails, search_query=search_query)
 
@@ -119,38 +293,12 @@ def dashboard():
 def all_scammers():
     if not session.get('logged_in'):
         return redirect('/login')
-    collection = get_collection("contacts", db_type="scam_database")
+    collection = get_collection("contacts", db_type="scam_database", read_preference=DASHBOARD_READ_PREFERENCE)
     search_query = request.args.get('search', '').strip()
     
-    query = {"classification": "scammer"}
-    if search_query:
-        query["$or"] = [
-            {"user": search_query},
-            {"upi_ids": search_query},
-            {"phones": search_query},
-            {"account_numbers": search_query},
-            {"socials": search_query}
-        ]
-    
-    scammers = []
-    for doc in collection.find(query).sort("datetime", -1):
-        risk_score = 0
-        for field in ["upi_ids", "phones", "account_numbers", "socials"]:
-            for item in doc.get(field, []):
-                risk_score += calculate_risk_score(collection, item, field)
-        
-        dt = parse_datetime(doc.get("datetime", datetime.now()))
-        
-        scammers.append({
-            "user": doc.get("user", "Unknown"),
-            "text": doc.get("text", ""),
-            "upi_ids": doc.get("upi_ids", []),
-            "phones": doc.get("phones", []),
-            "account_numbers": doc.get("account_numbers", []),
-            "socials": doc.get("socials", []),
-            "datetime": dt.strftime("%Y-%m-%d %H:%M:%S"),
-            "risk_score": risk_score
-        })
+    query = scammer_query(search_query, {"$in": SCAMMER_CLASSIFICATIONS})
+    docs = collection.find(query).sort("datetime", -1)
+    scammers = [serialize_scammer(doc, risk_score) for doc, risk_score in score_in_batches(collection, docs)]
     
     return render_template('all_scammers.html', scammers=scammers, search_query=search_query)
 
@@ -158,98 +306,152 @@ def all_scammers():
 def all_emails():
     if not session.get('logged_in'):
         return redirect('/login')
-    email_collection = get_collection("sent_emails", db_type="email_transactions")
+    email_collection = get_collection("sent_emails", db_type="email_transactions", read_preference=DASHBOARD_READ_PREFERENCE)
     search_query = request.args.get('search', '').strip()
     
-    query = {}
-    if search_query:
-        query["$or"] = [
-            {"scam_report_id": search_query},
-            {"to_email": search_query},
-            {"subject": search_query},
-            {"category": search_query}
-        ]
-    
-    emails = []
-    for doc in email_collection.find(query).sort("sent_at", -1):
-        dt = parse_datetime(doc.get("sent_at", datetime.now()))
-        emails.append({
-            "_id": str(doc.get("_id")),
-            "scam_report_id": doc.get("scam_report_id", "Unknown"),
-            "category": doc.get("category", "Unknown"),
-            "to_email": doc.get("to_email", "Unknown"),
-            "subject": doc.get("subject", ""),
-            "status": doc.get("status", "Unknown"),
-            "sent_at": dt.strftime("%Y-%m-%d %H:%M:%S")
-        })
+    query = email_query(search_query)
+    emails = [serialize_email(doc) for doc in email_collection.find(query, {"body": 0}).sort("sent_at", -1)]
     
     return render_template('all_emails.html', emails=emails, search_query=search_query)
 
 @app.route('/api/scammers', methods=['GET'])
 def api_scammers():
-    collection = get_collection("contacts", db_type="scam_database")
+    try:
+        limit, fields, cursor = page_args(SCAMMER_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    collection = get_collection("contacts", db_type="scam_database", read_preference=DASHBOARD_READ_PREFERENCE)
     search_query = request.args.get('search', '').strip()
     
-    query = {"classification": {"$in": ["scammer", "scammer_image", "scammer_voice"]}}
-    if search_query:
-        query["$or"] = [
-            {"user": search_query},
-            {"upi_ids": search_query},
-            {"phones": search_query},
-            {"account_numbers": search_query},
-            {"socials": search_query}
-        ]
+    query = scammer_query(search_query, {"$in": SCAMMER_CLASSIFICATIONS})
+    try:
+        docs, next_cursor = fetch_page(collection, query, "datetime", scammer_projection(fields), limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
+    if "risk_score" in fields:
+        scored = score_documents(collection, docs)
+    else:
+        scored = [(doc, None) for doc in docs]
     scammers = []
-    for doc in collection.find(query).sort("datetime", -1):
-        risk_score = 0
-        for field in ["upi_ids", "phones", "account_numbers", "socials"]:
-            for item in doc.get(field, []):
-                risk_score += calculate_risk_score(collection, item, field)
-        
-        dt = parse_datetime(doc.get("datetime", datetime.now()))
-        
-        scammers.append({
-            "user": doc.get("user", "Unknown"),
-            "text": doc.get("text", ""),
-            "upi_ids": doc.get("upi_ids", []),
-            "phones": doc.get("phones", []),
-            "account_numbers": doc.get("account_numbers", []),
-            "socials": doc.get("socials", []),
-            "datetime": dt.strftime("%Y-%m-%d %H:%M:%S"),
-            "risk_score": risk_score
-        })
+    for doc, risk_score in scored:
+        row = serialize_scammer(doc, risk_score)
+        scammers.append({f: row[f] for f in fields})
     
-    return jsonify(scammers)
+    return jsonify({"items": scammers, "next_cursor": next_cursor, "limit": limit})
 
 @app.route('/api/emails', methods=['GET'])
 def api_emails():
-    email_collection = get_collection("sent_emails", db_type="email_transactions")
+    try:
+        limit, fields, cursor = page_args(EMAIL_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    email_collection = get_collection("sent_emails", db_type="email_transactions", read_preference=DASHBOARD_READ_PREFERENCE)
     search_query = request.args.get('search', '').strip()
     
-    query = {}
-    if search_query:
-        query["$or"] = [
-            {"scam_report_id": search_query},
-            {"to_email": search_query},
-            {"subject": search_query},
-            {"category": search_query}
-        ]
+    query = email_query(search_query)
+    try:
+        docs, next_cursor = fetch_page(email_collection, query, "sent_at", {f: 1 for f in fields}, limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     emails = []
-    for doc in email_collection.find(query).sort("sent_at", -1):
-        dt = parse_datetime(doc.get("sent_at", datetime.now()))
-        emails.append({
-            "_id": str(doc.get("_id")),
-            "scam_report_id": doc.get("scam_report_id", "Unknown"),
-            "category": doc.get("category", "Unknown"),
-            "to_email": doc.get("to_email", "Unknown"),
-            "subject": doc.get("subject", ""),
-            "status": doc.get("status", "Unknown"),
-            "sent_at": dt.strftime("%Y-%m-%d %H:%M:%S")
-        })
+    for doc in docs:
+        row = serialize_email(doc)
+        emails.append({f: row[f] for f in fields})
+    
+    return jsonify({"items": emails, "next_cursor": next_cursor, "limit": limit})
+
+@app.route('/api/overview', methods=['GET'])
+def api_overview():
+    """Dashboard totals, so the page does not have to walk the paginated listings."""
+    if not session.get('logged_in'):
+        return redirect('/login')
+    collection = get_collection("contacts", db_type="scam_database", read_preference=DASHBOARD_READ_PREFERENCE)
+    counters = get_collection("stats", db_type="scam_database", read_preference=DASHBOARD_READ_PREFERENCE)
+    email_collection = get_collection("sent_emails", db_type="email_transactions", read_preference=DASHBOARD_READ_PREFERENCE)
+    
+    by_classification = read_counters(counters)["by_classification"]
+    recent_since = datetime.utcnow() - timedelta(days=RECENT_DAYS)
+    return jsonify({
+        "total_scammers": sum(by_classification.get(c, 0) for c in SCAMMER_CLASSIFICATIONS),
+        **risk_summary(collection, {"classification": {"$in": SCAMMER_CLASSIFICATIONS}}),
+        "high_risk_threshold": HIGH_RISK_SCORE,
+        "total_emails": email_collection.estimated_document_count(),
+        "recent_emails": email_collection.count_documents({"sent_at": {"$gte": recent_since}})
+    })
+
+@app.route('/api/pool_stats', methods=['GET'])
+def api_pool_stats():
+    if not session.get('logged_in'):
+        return redirect('/login')
+    return jsonify(pool_stats())
+
+@app.route('/api/export/scammers', methods=['GET'])
+def export_scammers():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        fields = requested_fields(SCAMMER_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    collection = get_collection("contacts", db_type="scam_database", read_preference=DASHBOARD_READ_PREFERENCE)
+    search_query = request.args.get('search', '').strip()
     
-    return jsonify(emails)
+    query = scammer_query(search_query, {"$in": SCAMMER_CLASSIFICATIONS})
+    return export_response(iter_scammer_rows(collection, query, fields), fields, export_format, "scammers")
+
+@app.route('/api/export/emails', methods=['GET'])
+def export_emails():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        fields = requested_fields(EMAIL_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    email_collection = get_collection("sent_emails", db_type="email_transactions", read_preference=DASHBOARD_READ_PREFERENCE)
+    search_query = request.args.get('search', '').strip()
+    
+    query = email_query(search_query)
+    return export_response(iter_email_rows(email_collection, query, fields), fields, export_format, "emails")
+
+def scammer_report_rows(collection, query):
+    cursor = collection.find(query).sort("datetime", -1).batch_size(EXPORT_BATCH_SIZE)
+    for batch in iter_batches(cursor, EXPORT_BATCH_SIZE):
+        for doc, risk_score in score_documents(collection, batch):
+            dt = parse_timestamp(doc.get("datetime", datetime.utcnow()))
+            yield [
+                doc.get("user", "Unknown"),
+                doc.get("text", "")[:30],  # Truncate to fit
+                str(risk_score),
+                ", ".join(doc.get("upi_ids", []) or ["None"])[:30],
+                ", ".join(doc.get("phones", []) or ["None"])[:30],
+                ", ".join(doc.get("account_numbers", []) or ["None"])[:30],
+                ", ".join(doc.get("socials", []) or ["None"])[:30],
+                dt.strftime("%Y-%m-%d %H:%M")
+            ]
+
+def email_report_rows(collection, query):
+    for doc in collection.find(query, {"body": 0}).sort("sent_at", -1).batch_size(EXPORT_BATCH_SIZE):
+        dt = parse_timestamp(doc.get("sent_at", datetime.utcnow()))
+        yield [
+            str(doc.get("_id"))[:15],
+            doc.get("scam_report_id", "Unknown")[:15],
+            doc.get("category", "Unknown"),
+            doc.get("to_email", "Unknown")[:20],
+            doc.get("subject", "")[:30],
+            doc.get("status", "Unknown"),
+            dt.strftime("%Y-%m-%d %H:%M")
+        ]
+
+def report_job_response(job, status=200):
+    body = {k: job[k] for k in ("job_id", "type", "status", "error")}
+    body["status_url"] = url_for('report_status', job_id=job["job_id"])
+    if job["status"] == "done":
+        body["download_url"] = url_for('report_download', job_id=job["job_id"])
+    return jsonify(body), status
 
 @app.route('/generate_report', methods=['GET'])
 def generate_report():
@@ -260,100 +462,51 @@ def generate_report():
     if report_type not in ['scammers', 'emails']:
         return "Invalid report type", 400
     
-    # Fetch data
     if report_type == 'scammers':
-        collection = get_collection("contacts", db_type="scam_database")
-        query = {"classification": "scammer"}
-        data = []
-        for doc in collection.find(query).sort("datetime", -1):
-            risk_score = 0
-            for field in ["upi_ids", "phones", "account_numbers", "socials"]:
-                for item in doc.get(field, []):
-                    risk_score += calculate_risk_score(collection, item, field)
-            dt = parse_datetime(doc.get("datetime", datetime.now()))
-            data.append({
-                "user": doc.get("user", "Unknown"),
-                "text": doc.get("text", "")[:30],  # Truncate to fit
-                "risk_score": str(risk_score),
-                "upi_ids": ", ".join(doc.get("upi_ids", []) or ["None"])[:30],
-                "phones": ", ".join(doc.get("phones", []) or ["None"])[:30],
-                "account_numbers": ", ".join(doc.get("account_numbers", []) or ["None"])[:30],
-                "socials": ", ".join(doc.get("socials", []) or ["None"])[:30],
-                "datetime": dt.strftime("%Y-%m-%d %H:%M")
-            })
+        collection = get_collection("contacts", db_type="scam_database", read_preference=DASHBOARD_READ_PREFERENCE)
+        query = {"classification": {"$in": SCAMMER_CLASSIFICATIONS}}
         title = "Found Scammers Report"
         headers = ["User", "Text", "Risk Score", "UPI IDs", "Phones", "Account Numbers", "Socials", "Date"]
-        table_data = [headers] + [[d["user"], d["text"], d["risk_score"], d["upi_ids"], d["phones"], d["account_numbers"], d["socials"], d["datetime"]] for d in data]
+        rows_factory = lambda: scammer_report_rows(collection, query)
     else:
-        collection = get_collection("sent_emails", db_type="email_transactions")
-        data = []
-        for doc in collection.find().sort("sent_at", -1):
-            dt = parse_datetime(doc.get("sent_at", datetime.now()))
-            data.append({
-                "_id": str(doc.get("_id"))[:15],
-                "scam_report_id": doc.get("scam_report_id", "Unknown")[:15],
-                "category": doc.get("category", "Unknown"),
-                "to_email": doc.get("to_email", "Unknown")[:20],
-                "subject": doc.get("subject", "")[:30],
-                "status": doc.get("status", "Unknown"),
-                "sent_at": dt.strftime("%Y-%m-%d %H:%M")
-            })
+        collection = get_collection("sent_emails", db_type="email_transactions", read_preference=DASHBOARD_READ_PREFERENCE)
+        query = {}
         title = "Email Statistics Report"
         headers = ["Email ID", "Scam Report ID", "Category", "To Email", "Subject", "Status", "Sent At"]
-        table_data = [headers] + [[d["_id"], d["scam_report_id"], d["category"], d["to_email"], d["subject"], d["status"], d["sent_at"]] for d in data]
-    
-    # Generate PDF with ReportLab
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, title=title, leftMargin=20, rightMargin=20, topMargin=20, bottomMargin=30)
-    elements = []
-
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = styles['Heading1']
-    title_style.alignment = 1  # Center
-    title_style.fontSize = 12
-    normal_style = styles['Normal']
-    normal_style.fontSize = 5
-
-    # Header
-    elements.append(Paragraph(title, title_style))
-    elements.append(Paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}", normal_style))
-    elements.append(Spacer(1, 6))
-
-    # Table
-    table = Table(table_data, colWidths=[A4[0] / len(headers) * 0.95 for _ in headers])  # Dynamic column width
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495E')),  # Header background
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),  # Header text
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f9f9f9')),  # Alternating row background
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),  # Thinner grid
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('LEADING', (0, 0), (-1, -1), 8),  # Reduce row height
-    ]))
-    elements.append(table)
-
-    # Footer
-    def add_footer(canvas, doc):
-        canvas.saveState()
-        canvas.setFont('Helvetica', 6)
-        canvas.setFillColor(colors.HexColor('#333333'))
-        canvas.drawCentredString(A4[0]/2, 15, "© 2025 Powered by Team Strategic Boosted Algorithms, contact at +91 9949284184")
-        canvas.restoreState()
-
-    # Build PDF
-    doc.build(elements, onFirstPage=add_footer, onLaterPages=add_footer)
-
-    # Create response
-    buffer.seek(0)
-    response = make_response(buffer.read())
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'attachment; filename={report_type}_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
+        rows_factory = lambda: email_report_rows(collection, query)
     
-    return response
+    version = collection_version(collection, query)
+    job = submit_report(report_type, version, title, headers, rows_factory)
+    return report_job_response(job, 200 if job["status"] == "done" else 202)
+
+@app.route('/report_status/<job_id>', methods=['GET'])
+def report_status(job_id):
+    if not session.get('logged_in'):
+        return redirect('/login')
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"error": "Unknown report job"}), 404
+    return report_job_response(job)
+
+@app.route('/report_download/<job_id>', methods=['GET'])
+def report_download(job_id):
+    if not session.get('logged_in'):
+        return redirect('/login')
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"error": "Unknown report job"}), 404
+    if job["status"] != "done":
+        return report_job_response(job, 409)
+    try:
+        return send_file(
+            job["path"],
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=f'{job["type"]}_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
+        )
+    except FileNotFoundError:
+        return jsonify({"error": "Report expired, generate it again"}), 410
 
 if __name__ == '__main__':
+    ensure_indexes()
     app.run(debug=True, port=5000)
@@ -0,0 +1,102 @@
+"""
+Prompt size (and optionally latency) per turn of the human persona DM chat.
+
+Replays a synthetic scammer conversation and compares, turn by turn, the
+prompt the legacy handler sent (whole history plus instructions) with the
+token-budgeted prompt from services.dm_history. Token counts are estimates;
+pass --base-url/--api-key/--model to also time real completions and read the
+provider's prompt_tokens.
+
+    python -m benchmarks.bench_dm_history --turns 16
+    python -m benchmarks.bench_dm_history --base-url https://openrouter.ai/api/v1 --api-key KEY --model MODEL
+"""
+import argparse
+import asyncio
+import random
+import time
+from services.dm_history import DM_PROMPT_TOKEN_BUDGET, build_messages, compact_history, prompt_tokens
+
+SYSTEM_PROMPT = (
+    "You are a real person who is skeptical but hopeful. You've lost money to scams before. "
+    "You're chatting privately with someone who claims to have received money. "
+    "Try to get concrete proof or details (such as UPI, bank, or social) before trusting. "
+    "Use natural, informal language, and never admit you are a bot or AI."
+)
+INSTRUCTIONS = (
+    "Continue acting like a real, informal, slightly emotional, skeptical human. "
+    "Ask for more details or proof if you haven't received it yet. "
+    "Do not repeat yourself word for word. Never reveal you are not human. "
+    "If the conversation seems stuck or repetitive, politely end it. "
+    "Use casual, natural language and try to sound different each time."
+)
+SCAMMER_LINES = [
+    "Bro trust me I got 50k last week from this scheme, the admin is very genuine and pays on time every single day.",
+    "You just need to invest 2000 first and then you get 10x returns within 24 hours, I have done it 5 times already.",
+    "Why you need proof yaar, everyone in the group is earning, just check the messages, so many people are posting.",
+    "Ok I will send screenshot later, my phone storage is full right now and I am travelling, network is also bad here.",
+    "Admin told me only limited slots are left today so you need to hurry up otherwise you will miss this chance.",
+    "I am not a scammer, I am helping you only because you seem like a nice person, otherwise why would I waste time.",
+]
+PERSONA_LINES = [
+    "Hmm idk, I've been burned before. Can you show me a payment screenshot or something?",
+    "That sounds too good tbh. What's the UPI you got paid from?",
+    "I really want to believe you but I need something concrete first, like bank details or a receipt.",
+    "Ok but who is this admin? Do they have an insta or something I can check?",
+]
+
+async def timed_completion(client, model, messages):
+    start = time.perf_counter()
+    reply = await client.chat.completions.create(model=model, messages=messages, max_tokens=80)
+    usage = getattr(reply, "usage", None)
+    return time.perf_counter() - start, usage.prompt_tokens if usage else None
+
+async def run(args):
+    client = None
+    if args.base_url:
+        from openai import AsyncOpenAI
+        client = AsyncOpenAI(base_url=args.base_url, api_key=args.api_key)
+
+    rng = random.Random(args.seed)
+    system = {"role": "system", "content": SYSTEM_PROMPT}
+    full = [system]
+    compacted, summary = [system], ""
+    totals = {"legacy": 0, "budgeted": 0}
+    print(f"{'turn':>4} {'legacy tok':>10} {'budgeted tok':>12}" + (f" {'legacy s':>9} {'budgeted s':>10}" if client else ""))
+    for turn in range(1, args.turns + 1):
+        user = {"role": "user", "content": rng.choice(SCAMMER_LINES)}
+        full.append(user)
+        compacted.append(user)
+        compacted, summary = compact_history(compacted, summary, INSTRUCTIONS, budget=args.budget)
+
+        legacy_messages = full + [{"role": "system", "content": INSTRUCTIONS}]
+        budgeted_messages = build_messages(compacted, summary, INSTRUCTIONS)
+        legacy_tokens, budgeted_tokens = prompt_tokens(legacy_messages), prompt_tokens(budgeted_messages)
+        line = f"{turn:>4} {legacy_tokens:>10} {budgeted_tokens:>12}"
+        if client:
+            legacy_s, legacy_reported = await timed_completion(client, args.model, legacy_messages)
+            budgeted_s, budgeted_reported = await timed_completion(client, args.model, budgeted_messages)
+            legacy_tokens = legacy_reported or legacy_tokens
+            budgeted_tokens = budgeted_reported or budgeted_tokens
+            line += f" {legacy_s:>9.2f} {budgeted_s:>10.2f}"
+        totals["legacy"] += legacy_tokens
+        totals["budgeted"] += budgeted_tokens
+        print(line)
+
+        reply = {"role": "assistant", "content": rng.choice(PERSONA_LINES)}
+        full.append(reply)
+        compacted.append(reply)
+    print(f"total prompt tokens: legacy {totals['legacy']}, budgeted {totals['budgeted']} "
+          f"({1 - totals['budgeted'] / totals['legacy']:.0%} fewer)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--budget", type=int, default=DM_PROMPT_TOKEN_BUDGET)
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--base-url")
+    parser.add_argument("--api-key", default="none")
+    parser.add_argument("--model", default="google/gemma-3n-e4b-it:free")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
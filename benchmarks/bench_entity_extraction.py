@@ -0,0 +1,87 @@
+"""
+Microbenchmark for identifier extraction in the bot handlers.
+
+Compares the legacy per-handler regex calls (extract_sensitive_info plus
+extract_urls, and the decoy path's extra extract_upi_or_bank /
+extract_social_or_phone calls) with utils.entity_extractor over a synthetic
+corpus of group-chat messages and long OCR / voice transcripts.
+
+    python -m benchmarks.bench_entity_extraction
+"""
+import argparse
+import random
+import re
+import timeit
+from utils.entity_extractor import extract_entities
+
+CHAT_TEMPLATES = [
+    "Contact me for your reward: {upi}",
+    "Send 500 to {upi} and get 5000 back in 2 hours!!",
+    "I have won 10 lakhs, thank you so much! 🙏",
+    "Is this group legit?",
+    "My bank account is {account}, send money here.",
+    "Call {phone} or DM insta @{handle} for the task",
+    "Register here {url} and follow fb: {handle}",
+    "What do you want as proof?",
+    "Pay via {phone}@paytm or {account} (IFSC SBIN0001234)",
+    "Join https://t.me/{handle} for daily profit, WhatsApp {phone}",
+]
+OCR_TEMPLATE = (
+    "Payment Successful\nTransaction ID: T{account}\nPaid to {upi}\nUPI Ref No: {account}\n"
+    "From: XXXXXX{short}\nBank Reference: {account}\nSupport: {phone}\nVisit {url}\n"
+)
+
+def legacy_extract(text, decoy=False):
+    upi_ids = re.findall(r"\b\w+@[a-z]+\b", text)
+    phones = re.findall(r"\b[6-9]\d{9}\b", text)
+    account_numbers = re.findall(r"\b\d{9,18}\b", text)
+    socials = re.findall(r"(facebook\.com/\S+|instagram\.com/\S+|insta:? ?@?\w+|fb:? ?@?\w+)", text, re.I)
+    urls = re.compile(r'(https?://[^\s]+)').findall(text)
+    if decoy:
+        re.findall(r"\b\w+@[a-z]+\b", text)
+        re.findall(r"\b\d{9,18}\b", text)
+        re.findall(r"\b[6-9]\d{9}\b", text)
+        re.findall(r"(instagram\.com/\S+|facebook\.com/\S+|insta:? ?@?\w+|fb:? ?@?\w+)", text, re.I)
+        re.findall(r"\b\w+@[a-z]+\b", text)
+        re.findall(r"\b\d{9,18}\b", text)
+    return upi_ids, phones, account_numbers, socials, urls
+
+def build_corpus(n_chat, n_ocr, seed=7):
+    rng = random.Random(seed)
+
+    def fill(template):
+        return template.format(
+            upi=f"{rng.choice(['rahul', 'pay', 'win', str(rng.randint(6000000000, 9999999999))])}@{rng.choice(['ybl', 'okaxis', 'paytm'])}",
+            account=str(rng.randint(10 ** 10, 10 ** 14)),
+            phone=str(rng.randint(6000000000, 9999999999)),
+            short=str(rng.randint(1000, 9999)),
+            handle=f"user{rng.randint(1, 9999)}",
+            url=rng.choice(["https://bit.ly/3xYz", "http://reward-claim.in/form?id=42", "https://instagram.com/promo"]),
+        )
+
+    chats = [fill(rng.choice(CHAT_TEMPLATES)) for _ in range(n_chat)]
+    ocr = ["".join(fill(OCR_TEMPLATE) for _ in range(rng.randint(5, 20))) for _ in range(n_ocr)]
+    return chats, ocr
+
+def bench(label, fn, texts, repeat):
+    best = min(timeit.repeat(lambda: [fn(t) for t in texts], number=1, repeat=repeat))
+    print(f"{label:<28} {best * 1e6 / len(texts):9.2f} µs/text")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chat", type=int, default=5000, help="number of chat messages")
+    parser.add_argument("--ocr", type=int, default=200, help="number of OCR/transcript texts")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    chats, ocr = build_corpus(args.chat, args.ocr)
+    for name, texts in (("chat messages", chats), ("OCR / transcripts", ocr)):
+        print(f"== {name} ({len(texts)} texts, avg {sum(map(len, texts)) // len(texts)} chars)")
+        legacy = bench("legacy handler path", legacy_extract, texts, args.repeat)
+        legacy_decoy = bench("legacy decoy path", lambda t: legacy_extract(t, decoy=True), texts, args.repeat)
+        single = bench("extract_entities", extract_entities, texts, args.repeat)
+        print(f"speedup: {legacy / single:.2f}x (handler), {legacy_decoy / single:.2f}x (decoy)")
+
+if __name__ == "__main__":
+    main()
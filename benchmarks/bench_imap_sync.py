@@ -0,0 +1,80 @@
+"""
+Bytes and commands per nodal inbox check, before and after incremental sync.
+
+Fills the local IMAP stand-in with a mailbox where --nodal-share of the mail
+comes from nodal addresses, then runs --polls checks with --arrivals new
+messages landing between them:
+
+- legacy: log in, SEARCH ALL, FETCH RFC822 of the last 30 messages one by one
+- incremental: NodalInbox.sync() on one kept-open session
+
+    python -m benchmarks.bench_imap_sync --messages 2000 --polls 10 --arrivals 20
+"""
+import argparse
+import email
+import imaplib
+import random
+import time
+from benchmarks.imap_standin import Mailbox, NODAL_ADDRESSES, make_message, serve
+from services.email_service import NodalInbox, sender
+
+def legacy_check(config, nodal_emails, handled):
+    mail = imaplib.IMAP4(config["imap_server"], config["imap_port"])
+    mail.login(config["user"], config["pass"])
+    mail.select("inbox")
+    result, data = mail.search(None, "ALL")
+    for email_id in reversed(data[0].split()[-30:]):
+        result, message_data = mail.fetch(email_id, "(RFC822)")
+        msg = email.message_from_bytes(message_data[0][1])
+        if sender(msg) in nodal_emails:
+            handled.append(msg["Message-ID"] or msg["Subject"])
+    mail.logout()
+
+def run(name, check, mailbox, polls, arrivals, nodal_share, attachment_kb, seed):
+    rng = random.Random(seed)
+    mailbox.reset_counters()
+    latencies = []
+    for _ in range(polls):
+        start = time.perf_counter()
+        check()
+        latencies.append(time.perf_counter() - start)
+        for _ in range(arrivals):
+            address = rng.choice(NODAL_ADDRESSES) if rng.random() < nodal_share else f"user{rng.randint(1, 10**6)}@mail.example"
+            mailbox.append(make_message(rng, address, attachment_kb))
+    latencies.sort()
+    print(f"{name:<12} {mailbox.commands / polls:>9.1f} {mailbox.bytes_sent / polls / 1024:>12.1f} "
+          f"{latencies[len(latencies) // 2] * 1000:>9.1f} {latencies[-1] * 1000:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark nodal inbox checks")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--polls", type=int, default=10)
+    parser.add_argument("--arrivals", type=int, default=20, help="new messages between polls")
+    parser.add_argument("--nodal-share", type=float, default=0.1)
+    parser.add_argument("--attachment-kb", type=int, default=64)
+    parser.add_argument("--port", type=int, default=1143)
+    args = parser.parse_args()
+
+    config = {"imap_server": "127.0.0.1", "imap_port": args.port, "imap_ssl": False,
+              "user": "monitor@domain.com", "pass": "secret"}
+    nodal_emails = set(NODAL_ADDRESSES)
+    print(f"{'strategy':<12} {'cmds/poll':>9} {'KiB sent/poll':>12} {'p50 ms':>9} {'max ms':>9}")
+    for name in ("legacy", "incremental"):
+        mailbox = Mailbox()
+        mailbox.fill(args.messages, args.nodal_share, args.attachment_kb)
+        server, _ = serve(port=args.port, mailbox=mailbox)
+        handled = []
+        if name == "legacy":
+            check = lambda: legacy_check(config, nodal_emails, handled)
+        else:
+            inbox = NodalInbox(lambda msg: handled.append(msg["Subject"]), nodal_emails=nodal_emails, config=config)
+            check = inbox.sync
+        try:
+            run(name, check, mailbox, args.polls, args.arrivals, args.nodal_share, args.attachment_kb, seed=11)
+        finally:
+            server.shutdown()
+            server.server_close()
+        print(f"{'':<12} handled {len(handled)} nodal messages")
+
+if __name__ == "__main__":
+    main()
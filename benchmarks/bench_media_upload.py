@@ -0,0 +1,97 @@
+"""
+Bytes uploaded and per-image latency for OCR before and after media shrinking.
+
+Renders synthetic payment screenshots at the sizes Telegram offers for a
+photo (longest side 90, 320, 800, 1280 and 2560 px), then uploads them to the
+local stand-in OCR endpoint:
+
+- legacy: the largest size, as downloaded
+- prepared: choose_photo_size() plus prepare_image_for_ocr()
+
+    python -m benchmarks.bench_media_upload --images 50 --uplink-kbps 2000
+
+Latency is measured against the stand-in on localhost; --uplink-kbps adds an
+estimate of the transfer time on a constrained link.
+"""
+import argparse
+import asyncio
+import io
+import random
+import time
+from collections import namedtuple
+import httpx
+from PIL import Image, ImageDraw
+from benchmarks.media_standin import serve
+from services.media_prep import choose_photo_size, prepare_image_for_ocr
+from services.media_service import ocr_image
+
+TELEGRAM_SIDES = (90, 320, 800, 1280, 2560)
+PhotoSize = namedtuple("PhotoSize", "width height data")
+
+def render_screenshot(rng, width=1080, height=2400):
+    img = Image.new("RGB", (width, height), (rng.randint(230, 255),) * 3)
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, width, 220), fill=(rng.randint(0, 80), 120, rng.randint(150, 255)))
+    for y in range(300, height - 100, 90):
+        line = f"Paid to user{rng.randint(10, 99999)}@ybl  Ref {rng.randint(10**11, 10**12 - 1)}"
+        draw.text((60, y), line, fill=(20, 20, 20))
+    for _ in range(40):  # Icons and avatars
+        x, y = rng.randint(0, width - 80), rng.randint(0, height - 80)
+        draw.ellipse((x, y, x + 80, y + 80), fill=tuple(rng.randint(0, 255) for _ in range(3)))
+    return img
+
+def telegram_sizes(img):
+    sizes = []
+    for side in TELEGRAM_SIDES:
+        copy = img.copy()
+        copy.thumbnail((side, side), Image.LANCZOS)
+        out = io.BytesIO()
+        copy.save(out, format="JPEG", quality=87)
+        sizes.append(PhotoSize(copy.width, copy.height, out.getvalue()))
+    return sizes
+
+async def upload_all(url, payloads):
+    latencies = []
+    async with httpx.AsyncClient() as http:
+        for prepare in payloads:
+            start = time.perf_counter()
+            data = prepare()
+            await ocr_image(http, data, "benchmark", url=url)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+def report(name, state, latencies, uploaded, kbps):
+    avg = sum(latencies) / len(latencies)
+    transfer = uploaded / len(latencies) * 8 / (kbps * 1000) if kbps else 0.0
+    print(f"{name:<9} uploaded {uploaded / 1024:>9.1f} KiB ({state.bytes_received / 1024:.1f} KiB on the wire), "
+          f"avg {avg * 1000:6.1f} ms/image local, ~{(avg + transfer) * 1000:7.1f} ms at {kbps} kbps")
+    return uploaded
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--uplink-kbps", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    photos = [telegram_sizes(render_screenshot(rng)) for _ in range(args.images)]
+    results = {}
+    for name, pick in (
+        ("legacy", lambda sizes: lambda: sizes[-1].data),
+        ("prepared", lambda sizes: lambda: prepare_image_for_ocr(choose_photo_size(sizes).data)),
+    ):
+        server, state = serve("127.0.0.1", 0, processing_seconds=0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/parse/image"
+            payloads = [pick(sizes) for sizes in photos]
+            uploaded = sum(len(p()) for p in payloads)
+            state.bytes_received = 0
+            latencies = asyncio.run(upload_all(url, payloads))
+        finally:
+            server.shutdown()
+        results[name] = report(name, state, latencies, uploaded, args.uplink_kbps)
+    print(f"bytes uploaded reduced {results['legacy'] / results['prepared']:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Round-trip benchmark for scammer risk scoring.
+
+Seeds a scratch database with synthetic scammer rows, then scores the same
+result set with the legacy per-identifier count_documents loop and with
+services.risk_service, counting the commands sent to the server with a
+pymongo CommandListener.
+
+    python -m benchmarks.bench_risk_scores --rows 10000
+"""
+import argparse
+import random
+import time
+from pymongo import MongoClient, monitoring
+from config1.config import CONFIG
+from services.risk_service import RISK_FIELDS, score_documents
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+def legacy_scores(collection, docs):
+    scores = []
+    for doc in docs:
+        risk_score = 0
+        for field in RISK_FIELDS:
+            for item in doc.get(field, []):
+                risk_score += collection.count_documents({field: item})
+        scores.append(risk_score)
+    return scores
+
+def seed(collection, rows):
+    rng = random.Random(42)
+    upis = [f"user{i}@ybl" for i in range(rows // 4 or 1)]
+    phones = [str(rng.randint(6000000000, 9999999999)) for _ in range(rows // 4 or 1)]
+    accounts = [str(rng.randint(10 ** 10, 10 ** 12)) for _ in range(rows // 4 or 1)]
+    socials = [f"insta @handle{i}" for i in range(rows // 8 or 1)]
+    docs = []
+    for _ in range(rows):
+        docs.append({
+            "user": f"scammer{rng.randint(0, rows)}",
+            "text": "Contact me for your reward",
+            "classification": "scammer",
+            "upi_ids": rng.sample(upis, 1),
+            "phones": rng.sample(phones, 1),
+            "account_numbers": rng.sample(accounts, rng.randint(0, 1)),
+            "socials": rng.sample(socials, rng.randint(0, 1)),
+        })
+    collection.insert_many(docs, ordered=False)
+
+def measure(label, counter, fn):
+    before = counter.count
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} round trips={counter.count - before:>7}  time={elapsed:8.3f}s")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--uri", default=CONFIG["mongo_uri"])
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    client = MongoClient(args.uri, event_listeners=[counter])
+    db = client["risk_score_benchmark"]
+    collection = db["contacts"]
+    collection.drop()
+    try:
+        seed(collection, args.rows)
+        docs = list(collection.find({"classification": "scammer"}))
+        print(f"Scoring {len(docs)} rows")
+        legacy = measure("legacy", counter, lambda: legacy_scores(collection, docs))
+        batched = measure("aggregated", counter, lambda: [score for _, score in score_documents(collection, docs)])
+        print("Scores identical:", legacy == batched)
+    finally:
+        client.drop_database(db.name)
+        client.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Nodal officer email throughput, before and after SMTP session pooling.
+
+Sends --reports reports' worth of officer emails (--officers per report)
+through the local SMTP stand-in, whose --handshake-ms stands in for the
+connect/TLS/LOGIN round trips of a remote server:
+
+- legacy: a new connection and LOGIN per email, one email at a time
+- pooled: SMTPPool sessions, each report's emails sent concurrently
+
+    python -m benchmarks.bench_smtp_send --reports 50 --handshake-ms 150
+
+--pause-every/--pause-seconds insert quiet periods longer than the stand-in's
+--idle-timeout, so the pooled run also exercises reconnects.
+"""
+import argparse
+import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+from benchmarks.smtp_standin import serve
+from services.email_service import SMTPPool
+
+def make_email(report, officer):
+    msg = MIMEText(f"Details requested for scam report {report}.\n" * 40, "plain")
+    msg["From"] = "monitor@domain.com"
+    msg["To"] = f"officer{officer}@domain.com"
+    msg["Subject"] = f"Request for details - report {report}"
+    return msg
+
+def legacy_send(config, msg):
+    with smtplib.SMTP(config["host"], config["port"]) as server:
+        server.login(config["user"], config["pass"])
+        server.send_message(msg)
+
+def run(name, send_report, args):
+    latencies = []
+    start = time.perf_counter()
+    for report in range(args.reports):
+        if args.pause_every and report and report % args.pause_every == 0:
+            time.sleep(args.pause_seconds)
+            start += args.pause_seconds
+        report_start = time.perf_counter()
+        send_report([make_email(report, officer) for officer in range(args.officers)])
+        latencies.append(time.perf_counter() - report_start)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    emails = args.reports * args.officers
+    print(f"{name:<8} {emails / elapsed:>9.1f} {latencies[len(latencies) // 2] * 1000:>13.1f} "
+          f"{latencies[int(len(latencies) * 0.95)] * 1000:>13.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark nodal officer email sending")
+    parser.add_argument("--reports", type=int, default=50)
+    parser.add_argument("--officers", type=int, default=4)
+    parser.add_argument("--handshake-ms", type=float, default=150)
+    parser.add_argument("--idle-timeout", type=float, default=2.0)
+    parser.add_argument("--pause-every", type=int, default=0, help="pause after this many reports")
+    parser.add_argument("--pause-seconds", type=float, default=3.0)
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+
+    config = {"host": "127.0.0.1", "port": args.port, "starttls": False, "user": "monitor@domain.com", "pass": "secret"}
+    print(f"{'strategy':<8} {'emails/s':>9} {'report p50 ms':>13} {'report p95 ms':>13}")
+    for name in ("legacy", "pooled"):
+        server, state = serve(port=args.port, handshake_seconds=args.handshake_ms / 1000, idle_timeout=args.idle_timeout)
+        pool = None
+        try:
+            if name == "legacy":
+                run(name, lambda msgs: [legacy_send(config, msg) for msg in msgs], args)
+            else:
+                pool = SMTPPool(size=args.officers, idle_check_seconds=args.idle_timeout / 2, config=config)
+                with ThreadPoolExecutor(max_workers=args.officers) as executor:
+                    run(name, lambda msgs: list(executor.map(pool.send_message, msgs)), args)
+                pool.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+        print(f"{'':<8} server: {state.connections} connections, {state.logins} logins, {state.messages} messages, "
+              f"{state.idle_closed} closed idle")
+        if pool is not None:
+            print(f"{'':<8} pool: {pool.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Local stand-in for the IMAP server the monitor reads nodal replies from.
+
+    python -m benchmarks.imap_standin --port 1143 --messages 500 --nodal-share 0.1
+
+then point the monitor at it:
+
+    IMAP_SERVER=127.0.0.1 IMAP_PORT=1143 IMAP_SSL=false
+
+Speaks just enough IMAP4rev1 for imaplib: LOGIN, SELECT, NOOP, LOGOUT,
+SEARCH and FETCH, plain and UID. SEARCH understands ALL, FROM, OR, UID and
+sequence sets; FETCH returns UID, header fields, RFC822 or BODY[]. Commands
+and bytes sent are counted so benchmarks can compare sync strategies.
+"""
+import argparse
+import random
+import re
+import socketserver
+import threading
+from email.message import EmailMessage
+
+NODAL_ADDRESSES = ("dot.nodal@domain.com", "bank.nodal@domain.com", "meta.nodal@domain.com", "payments.nodal@domain.com")
+TOKEN = re.compile(r'"((?:[^"\\]|\\.)*)"|([^\s()]+)')
+LITERAL_ITEM = re.compile(r"BODY(?:\.PEEK)?\[([^\]]*)\]|RFC822(?:\.HEADER)?")
+
+def make_message(rng, sender, attachment_kb=0):
+    msg = EmailMessage()
+    msg["From"] = sender
+    msg["To"] = "monitor@domain.com"
+    msg["Subject"] = f"Re: Request for details {rng.randint(1000, 9999)}"
+    msg.set_content("Please find the requested details attached.\n")
+    if attachment_kb:
+        msg.add_attachment(rng.randbytes(attachment_kb * 1024), maintype="application",
+                           subtype="vnd.openxmlformats-officedocument.spreadsheetml.sheet", filename="details.xlsx")
+    return msg.as_bytes()
+
+class Mailbox:
+    def __init__(self, uidvalidity=1):
+        self.uidvalidity = uidvalidity
+        self.messages = []  # (uid, raw bytes, lowercased From header)
+        self.uidnext = 1
+        self.commands = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+
+    def append(self, raw):
+        sender = re.search(rb"^From: (.*)$", raw, re.M | re.I).group(1).decode().strip().lower()
+        with self.lock:
+            self.messages.append((self.uidnext, raw, sender))
+            self.uidnext += 1
+
+    def fill(self, count, nodal_share=0.1, attachment_kb=64, seed=7):
+        rng = random.Random(seed)
+        for _ in range(count):
+            if rng.random() < nodal_share:
+                self.append(make_message(rng, rng.choice(NODAL_ADDRESSES), attachment_kb))
+            else:
+                self.append(make_message(rng, f"user{rng.randint(1, 10**6)}@mail.example", attachment_kb))
+
+    def reset_counters(self):
+        with self.lock:
+            self.commands = 0
+            self.bytes_sent = 0
+
+def parse_set(text, highest):
+    """Numbers in an IMAP sequence/UID set such as "1:3,7,9:*"; "*" is highest."""
+    numbers = set()
+    for part in text.split(","):
+        low, _, high = part.partition(":")
+        low = highest if low == "*" else int(low)
+        high = low if not high else (highest if high == "*" else int(high))
+        numbers.update(range(min(low, high), max(low, high) + 1))
+    return numbers
+
+class IMAPStandInHandler(socketserver.StreamRequestHandler):
+    mailbox = None
+    disable_nagle_algorithm = True
+
+    def send(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self.wfile.write(data)
+        with self.mailbox.lock:
+            self.mailbox.bytes_sent += len(data)
+
+    def handle(self):
+        self.send("* OK IMAP4rev1 stand-in ready\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            tag, _, rest = line.decode().rstrip("\r\n").partition(" ")
+            command, _, args = rest.partition(" ")
+            command = command.upper()
+            with self.mailbox.lock:
+                self.mailbox.commands += 1
+            uid = command == "UID"
+            if uid:
+                command, _, args = args.partition(" ")
+                command = command.upper()
+            if command == "CAPABILITY":
+                self.send("* CAPABILITY IMAP4rev1\r\n")
+            elif command == "SELECT":
+                with self.mailbox.lock:
+                    exists, uidnext = len(self.mailbox.messages), self.mailbox.uidnext
+                self.send(f"* {exists} EXISTS\r\n* 0 RECENT\r\n"
+                          f"* OK [UIDVALIDITY {self.mailbox.uidvalidity}] UIDs valid\r\n"
+                          f"* OK [UIDNEXT {uidnext}] Predicted next UID\r\n")
+                self.send(f"{tag} OK [READ-WRITE] SELECT completed\r\n")
+                continue
+            elif command == "NOOP":
+                with self.mailbox.lock:
+                    exists = len(self.mailbox.messages)
+                self.send(f"* {exists} EXISTS\r\n")
+            elif command == "LOGOUT":
+                self.send(f"* BYE logging out\r\n{tag} OK LOGOUT completed\r\n")
+                return
+            elif command == "SEARCH":
+                found = self.search(args, uid)
+                self.send(f"* SEARCH {' '.join(map(str, found))}".rstrip() + "\r\n")
+            elif command == "FETCH":
+                self.fetch(args, uid)
+            elif command != "LOGIN":
+                self.send(f"{tag} BAD unsupported command {command}\r\n")
+                continue
+            self.send(f"{tag} OK {command} completed\r\n")
+
+    def _numbered(self):
+        with self.mailbox.lock:
+            return [(seq, *message) for seq, message in enumerate(self.mailbox.messages, start=1)]
+
+    def search(self, args, uid):
+        tokens = [quoted if quoted else bare for quoted, bare in TOKEN.findall(args)]
+        if tokens and tokens[0].upper() == "CHARSET":
+            tokens = tokens[2:]
+        messages = self._numbered()
+        highest_seq = len(messages)
+        highest_uid = messages[-1][1] if messages else 0
+
+        def matcher():
+            key = tokens.pop(0)
+            upper = key.upper()
+            if upper == "ALL":
+                return lambda m: True
+            if upper == "FROM":
+                needle = tokens.pop(0).lower()
+                return lambda m: needle in m[3]
+            if upper == "OR":
+                left, right = matcher(), matcher()
+                return lambda m: left(m) or right(m)
+            if upper == "UID":
+                uids = parse_set(tokens.pop(0), highest_uid)
+                return lambda m: m[1] in uids
+            seqs = parse_set(key, highest_seq)
+            return lambda m: m[0] in seqs
+
+        tests = []
+        while tokens:
+            tests.append(matcher())
+        return [m[1] if uid else m[0] for m in messages if all(test(m) for test in tests)]
+
+    def fetch(self, args, uid):
+        which, _, items = args.partition(" ")
+        messages = self._numbered()
+        if uid:
+            wanted = parse_set(which, messages[-1][1] if messages else 0)
+            selected = [m for m in messages if m[1] in wanted]
+        else:
+            wanted = parse_set(which, len(messages))
+            selected = [m for m in messages if m[0] in wanted]
+        for seq, message_uid, raw, _ in selected:
+            parts = [f"UID {message_uid}"]
+            literals = []
+            for match in LITERAL_ITEM.finditer(items):
+                section = match.group(1)
+                if section is None:
+                    name, payload = "RFC822", raw
+                elif section.upper().startswith("HEADER.FIELDS"):
+                    fields = section[section.index("(") + 1:section.index(")")].split()
+                    name = f"BODY[{section}]"
+                    headers = raw.split(b"\r\n\r\n", 1)[0].split(b"\n\n", 1)[0].splitlines()
+                    payload = b"".join(
+                        h.rstrip(b"\r") + b"\r\n" for h in headers
+                        if h.split(b":", 1)[0].decode().upper() in {f.upper() for f in fields}
+                    ) + b"\r\n"
+                else:
+                    name, payload = f"BODY[{section}]", raw
+                literals.append((name, payload))
+            head = f"* {seq} FETCH ({' '.join(parts)}"
+            if not literals:
+                self.send(head + ")\r\n")
+                continue
+            for name, payload in literals:
+                self.send(f"{head} {name} {{{len(payload)}}}\r\n".encode() + payload)
+                head = ""
+            self.send(")\r\n")
+
+class ThreadingIMAPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+def serve(host="127.0.0.1", port=1143, mailbox=None):
+    """Start the stand-in on a background thread; returns (server, mailbox)."""
+    mailbox = mailbox or Mailbox()
+    handler = type("BoundIMAPStandInHandler", (IMAPStandInHandler,), {"mailbox": mailbox})
+    server = ThreadingIMAPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, mailbox
+
+def main():
+    parser = argparse.ArgumentParser(description="IMAP stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1143)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--nodal-share", type=float, default=0.1)
+    parser.add_argument("--attachment-kb", type=int, default=64)
+    args = parser.parse_args()
+    mailbox = Mailbox()
+    mailbox.fill(args.messages, args.nodal_share, args.attachment_kb)
+    server, _ = serve(args.host, args.port, mailbox)
+    print(f"IMAP stand-in listening on {args.host}:{args.port} with {args.messages} messages")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
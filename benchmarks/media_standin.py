@@ -0,0 +1,118 @@
+"""
+Local stand-in for the AssemblyAI and OCR.space endpoints the bot calls.
+
+    python -m benchmarks.media_standin --port 8765 --processing-seconds 3
+
+then point the bot at it:
+
+    ASSEMBLYAI_BASE_URL=http://127.0.0.1:8765/v2
+    OCR_SPACE_URL=http://127.0.0.1:8765/parse/image
+
+Transcripts report "processing" until --processing-seconds after creation,
+then "completed". Every request body is counted so benchmarks can report
+bytes uploaded.
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRANSCRIPT_TEXT = "Send 500 to rahul@ybl or call 9876543210 to claim your reward"
+OCR_TEXT = "Payment Successful\nPaid to rahul@ybl\nUPI Ref No: 412345678901\n"
+
+class StandInState:
+    def __init__(self, processing_seconds=2.0):
+        self.processing_seconds = processing_seconds
+        self.transcripts = {}
+        self.requests = 0
+        self.bytes_received = 0
+        self.lock = threading.Lock()
+
+class StandInHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            body = self.rfile.read(length)
+        elif self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().strip() or b"0", 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            body = b"".join(chunks)
+        else:
+            body = b""
+        with self.state.lock:
+            self.state.requests += 1
+            self.state.bytes_received += len(body)
+        return body
+
+    def _json(self, payload, status=200):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = self._read_body()
+        if self.path == "/v2/upload":
+            self._json({"upload_url": f"http://{self.headers['Host']}/files/{uuid.uuid4().hex}"})
+        elif self.path == "/v2/transcript":
+            transcript_id = uuid.uuid4().hex
+            with self.state.lock:
+                self.state.transcripts[transcript_id] = time.monotonic()
+            self._json({"id": transcript_id, "status": "queued", "audio_url": json.loads(body)["audio_url"]})
+        elif self.path == "/parse/image":
+            self._json({"ParsedResults": [{"ParsedText": OCR_TEXT}], "OCRExitCode": 1, "ReceivedBytes": len(body)})
+        else:
+            self._json({"error": "not found"}, 404)
+
+    def do_GET(self):
+        self._read_body()
+        if self.path.startswith("/v2/transcript/"):
+            transcript_id = self.path.rsplit("/", 1)[-1]
+            created = self.state.transcripts.get(transcript_id)
+            if created is None:
+                self._json({"error": "transcript not found"}, 404)
+            elif time.monotonic() - created < self.state.processing_seconds:
+                self._json({"id": transcript_id, "status": "processing"})
+            else:
+                self._json({"id": transcript_id, "status": "completed", "text": TRANSCRIPT_TEXT})
+        else:
+            self._json({"error": "not found"}, 404)
+
+def serve(host="127.0.0.1", port=8765, processing_seconds=2.0):
+    """Start the stand-in on a background thread; returns (server, state)."""
+    state = StandInState(processing_seconds=processing_seconds)
+    handler = type("BoundStandInHandler", (StandInHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+def main():
+    parser = argparse.ArgumentParser(description="AssemblyAI / OCR.space stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--processing-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+    server, _ = serve(args.host, args.port, args.processing_seconds)
+    print(f"Stand-in listening on http://{args.host}:{args.port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
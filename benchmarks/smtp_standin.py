@@ -0,0 +1,107 @@
+"""
+Local stand-in for the SMTP server nodal officer emails go through.
+
+    python -m benchmarks.smtp_standin --port 8025 --handshake-ms 150 --idle-timeout 10
+
+then point the monitor at it:
+
+    EMAIL_HOST=127.0.0.1 EMAIL_PORT=8025 EMAIL_STARTTLS=false
+
+Accepts EHLO/HELO, AUTH PLAIN, MAIL, RCPT, DATA, NOOP, RSET and QUIT and
+discards the mail. --handshake-ms delays the greeting and AUTH replies to
+stand in for the TCP/TLS/LOGIN round trips of a remote server, and
+--idle-timeout closes sessions that stay quiet, like real servers do.
+Connections, logins and messages are counted.
+"""
+import argparse
+import socket
+import socketserver
+import threading
+import time
+
+class StandInState:
+    def __init__(self, handshake_seconds=0.0, idle_timeout=None):
+        self.handshake_seconds = handshake_seconds
+        self.idle_timeout = idle_timeout
+        self.connections = 0
+        self.logins = 0
+        self.messages = 0
+        self.idle_closed = 0
+        self.lock = threading.Lock()
+
+    def count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    state = None
+    disable_nagle_algorithm = True
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.state.count("connections")
+        self.connection.settimeout(self.state.idle_timeout)
+        time.sleep(self.state.handshake_seconds / 2)
+        self.reply("220 stand-in ESMTP ready")
+        while True:
+            try:
+                line = self.rfile.readline()
+            except socket.timeout:
+                self.state.count("idle_closed")
+                self.reply("421 idle timeout, closing connection")
+                return
+            if not line:
+                return
+            verb = line.decode(errors="replace").strip().split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-stand-in")
+                self.reply("250-8BITMIME")
+                self.reply("250 AUTH PLAIN")
+            elif verb == "AUTH":
+                time.sleep(self.state.handshake_seconds / 2)
+                self.state.count("logins")
+                self.reply("235 authenticated")
+            elif verb in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 end data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                self.state.count("messages")
+                self.reply("250 OK queued")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 command not implemented")
+
+class ThreadingSMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+def serve(host="127.0.0.1", port=8025, handshake_seconds=0.0, idle_timeout=None):
+    """Start the stand-in on a background thread; returns (server, state)."""
+    state = StandInState(handshake_seconds=handshake_seconds, idle_timeout=idle_timeout)
+    handler = type("BoundSMTPStandInHandler", (SMTPStandInHandler,), {"state": state})
+    server = ThreadingSMTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+def main():
+    parser = argparse.ArgumentParser(description="SMTP stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--handshake-ms", type=float, default=150)
+    parser.add_argument("--idle-timeout", type=float, default=None, help="seconds before a quiet session is closed")
+    args = parser.parse_args()
+    server, _ = serve(args.host, args.port, args.handshake_ms / 1000, args.idle_timeout)
+    print(f"SMTP stand-in listening on {args.host}:{args.port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Soak test for the recent-detections ring buffer.
+
+Feeds synthetic detection documents (with a long tail of distinct
+identifiers, as a long-running bot sees) into RecentDetections and samples
+traced memory with tracemalloc. Fails when memory keeps growing once the
+buffer is full, or when it exceeds --ceiling-kib.
+
+    python -m benchmarks.soak_recent_detections --detections 1000000 --capacity 1000
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from services.recent_detections import RecentDetections
+
+def synthetic_detection(rng, i):
+    doc = {
+        "user": f"user{rng.randint(1, 50000)}",
+        "text": "x" * rng.randint(20, 400),
+        "classification": rng.choice(["scammer", "decoy", "decoy-lured", "decoy followup"]),
+        "upi_ids": [f"payee{i}@ybl"] if rng.random() < 0.6 else [],
+        "phones": [str(rng.randint(6000000000, 9999999999))] if rng.random() < 0.4 else [],
+        "account_numbers": [str(rng.randint(10**9, 10**14))] if rng.random() < 0.3 else [],
+        "socials": [f"instagram.com/handle{i}"] if rng.random() < 0.2 else [],
+    }
+    if rng.random() < 0.1:  # Recurring scammer identifiers
+        doc["upi_ids"].append(f"repeat{rng.randint(1, 20)}@paytm")
+    return doc
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--detections", type=int, default=1000000)
+    parser.add_argument("--capacity", type=int, default=1000)
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--ceiling-kib", type=float, default=2048, help="maximum traced memory once full")
+    parser.add_argument("--growth-kib", type=float, default=64, help="allowed growth after the buffer is full")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    recent = RecentDetections(capacity=args.capacity)
+    every = max(1, args.detections // args.samples)
+    full_at = None
+    peak_after_full = 0
+    start = time.perf_counter()
+    for i in range(args.detections):
+        recent.add(synthetic_detection(rng, i))
+        recent.seen(f"repeat{rng.randint(1, 20)}@paytm")
+        if (i + 1) % every == 0:
+            current = tracemalloc.get_traced_memory()[0] - baseline
+            if full_at is None and len(recent) == args.capacity:
+                full_at = current
+            if full_at is not None:
+                peak_after_full = max(peak_after_full, current)
+            print(f"{i + 1:>10} detections  {current / 1024:>9.1f} KiB  {recent.stats()}")
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+
+    print(f"{args.detections / elapsed:,.0f} detections/s")
+    if full_at is None:
+        print("Buffer never filled; increase --detections")
+        sys.exit(1)
+    growth = (peak_after_full - full_at) / 1024
+    print(f"Memory when full: {full_at / 1024:.1f} KiB, peak after: {peak_after_full / 1024:.1f} KiB, growth {growth:.1f} KiB")
+    if peak_after_full / 1024 > args.ceiling_kib or growth > args.growth_kib:
+        print("FAIL: memory above ceiling or still growing")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
@@ -6,12 +6,22 @@ load_dotenv()
 CONFIG = {
     "mongo_uri": os.getenv("MONGO_URI", "MONGO_URI"),
     "email_transactions_mongo_uri": os.getenv("EMAIL_TRANSACTIONS_MONGO_URI", "MONGO_URI"),
+    "mongo_pool": {
+        "max_pool_size": int(os.getenv("MONGO_MAX_POOL_SIZE", 50)),
+        "min_pool_size": int(os.getenv("MONGO_MIN_POOL_SIZE", 0)),
+        "max_idle_time_ms": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000)),
+        "wait_queue_timeout_ms": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000))
+    },
+    "dashboard_read_preference": os.getenv("MONGO_DASHBOARD_READ_PREFERENCE", "primary"),
     "email": {
         "host": os.getenv("EMAIL_HOST", "smtp.gmail.com"),
         "port": int(os.getenv("EMAIL_PORT", 587)),
+        "starttls": os.getenv("EMAIL_STARTTLS", "true").lower() != "false",
         "user": os.getenv("EMAIL_USER", "isronasaesa@gmail.com"),
         "pass": os.getenv("EMAIL_PASS", "abcd#### aaka"),
-        "imap_server": os.getenv("IMAP_SERVER", "imap.gmail.com")
+        "imap_server": os.getenv("IMAP_SERVER", "imap.gmail.com"),
+        "imap_port": int(os.getenv("IMAP_PORT", 993)),
+        "imap_ssl": os.getenv("IMAP_SSL", "true").lower() != "false"
     },
     "nodal_officers": {
         "dot": os.getenv("DOT_EMAIL", "dot.nodal@domain.com"),
@@ -5,17 +5,20 @@ from services.monitor_service import start_monitoring
 from utils.logger import logger
 
 def main():
-    try:
-        # Initialize MongoDB connection
-        connect_db()
-        # Start monitoring for new scam reports and nodal officer responses
-        start_monitoring()
-        logger.info("Application started successfully")
-    except Exception as e:
-        logger.error(f"Application startup error: {e}")
-        # Attempt to reconnect after a delay in case of failure
-        time.sleep(5)
-        main()
+    delay = 5
+    while True:
+        try:
+            # Initialize MongoDB connection
+            connect_db()
+            logger.info("Application started successfully")
+            # Monitor new scam reports and nodal officer responses until stopped
+            start_monitoring()
+            return
+        except Exception as e:
+            logger.error(f"Application startup error: {e}")
+            # Retry with backoff instead of recursing, so a long outage cannot exhaust the stack
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
 
 if __name__ == "__main__":
     main()
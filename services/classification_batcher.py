@@ -0,0 +1,71 @@
+import asyncio
+from utils.logger import logger
+
+class ClassificationBatcher:
+    """
+    Collects texts for a short window and classifies them with one call.
+
+    classify() waits until the batch holding its text is resolved. A batch is
+    sent when max_batch texts are waiting or window_ms after its first text,
+    whichever comes first. classify_batch receives the list of texts and must
+    return one label per text, in order.
+    """
+
+    def __init__(self, classify_batch, window_ms=100, max_batch=20):
+        self.classify_batch = classify_batch
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.batches_sent = 0
+        self.texts_classified = 0
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def classify(self, text):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        # Handlers that were cancelled while waiting don't need a label
+        batch = [(text, future) for text, future in batch if not future.done()]
+        if not batch:
+            return
+        try:
+            labels = await self.classify_batch([text for text, _ in batch])
+            if len(labels) != len(batch):
+                raise ValueError(f"Expected {len(batch)} labels, got {len(labels)}")
+        except Exception as e:
+            logger.error(f"Batch classification of {len(batch)} messages failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches_sent += 1
+        self.texts_classified += len(batch)
+        for (_, future), label in zip(batch, labels):
+            if not future.done():
+                future.set_result(label)
+
+    def stats(self):
+        return {
+            "batches_sent": self.batches_sent,
+            "texts_classified": self.texts_classified,
+            "avg_batch_size": round(self.texts_classified / self.batches_sent, 2) if self.batches_sent else 0.0,
+            "pending": len(self._pending),
+        }
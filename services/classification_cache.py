@@ -0,0 +1,112 @@
+import asyncio
+import hashlib
+import re
+import unicodedata
+from datetime import datetime, timedelta
+from utils.entity_extractor import extract_entities
+from utils.logger import logger
+from utils.ttl_cache import TTLCache
+
+CACHEABLE_LABELS = {"scammer", "decoy", "innocent"}
+PLACEHOLDERS = {
+    "upi_ids": "<upi>",
+    "phones": "<phone>",
+    "account_numbers": "<number>",
+    "socials": "<social>",
+    "urls": "<url>",
+}
+REPEATED_PUNCTUATION_RE = re.compile(r"([^\w\s])\1+")
+WHITESPACE_RE = re.compile(r"\s+")
+
+def _is_decoration(ch):
+    # Emoji, pictographs, skin-tone modifiers, ZWJ and variation selectors
+    return unicodedata.category(ch) in ("So", "Sk", "Cf") or "\ufe00" <= ch <= "\ufe0f"
+
+def normalize_message(text):
+    """
+    Reduce a message to the form scam campaigns vary least: identifiers become
+    placeholders, emoji are dropped, case and whitespace are folded and runs of
+    the same punctuation collapse to one.
+    """
+    spans = sorted(extract_entities(text)["spans"], key=lambda s: (s[1], -s[2]))
+    parts = []
+    pos = 0
+    for kind, start, end, _ in spans:
+        if start < pos:  # Nested in an identifier already replaced (e.g. a phone inside a UPI ID)
+            continue
+        parts.append(text[pos:start])
+        parts.append(PLACEHOLDERS[kind])
+        pos = end
+    parts.append(text[pos:])
+    normalized = "".join(ch for ch in "".join(parts) if not _is_decoration(ch)).lower()
+    normalized = REPEATED_PUNCTUATION_RE.sub(r"\1", normalized)
+    return WHITESPACE_RE.sub(" ", normalized).strip()
+
+def cache_key(normalized):
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+class ClassificationCache:
+    """
+    LRU+TTL cache of message classifications keyed on normalize_message(text).
+
+    When a Mongo collection is given, entries are also persisted there (with a
+    TTL index on expires_at) so they survive restarts; Mongo is consulted on a
+    local miss and its hits are promoted into the in-process cache.
+    """
+
+    def __init__(self, maxsize=50000, ttl=6 * 3600, collection=None):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl
+        self.collection = collection
+        self.persistent_hits = 0
+
+    def ensure_indexes(self):
+        if self.collection is not None:
+            self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get(self, text):
+        key = cache_key(normalize_message(text))
+        label = self.memory.get(key)
+        if label is not None or self.collection is None:
+            return label
+        try:
+            doc = await asyncio.to_thread(
+                self.collection.find_one,
+                {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+                {"classification": 1}
+            )
+        except Exception as e:
+            logger.error(f"Classification cache lookup failed: {e}")
+            return None
+        if doc:
+            self.persistent_hits += 1
+            self.memory.set(key, doc["classification"])
+            return doc["classification"]
+        return None
+
+    async def set(self, text, label):
+        if label not in CACHEABLE_LABELS:
+            return
+        normalized = normalize_message(text)
+        key = cache_key(normalized)
+        self.memory.set(key, label)
+        if self.collection is None:
+            return
+        try:
+            await asyncio.to_thread(
+                self.collection.update_one,
+                {"_id": key},
+                {"$set": {
+                    "normalized": normalized,
+                    "classification": label,
+                    "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Classification cache write failed: {e}")
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats["persistent_hits"] = self.persistent_hits
+        return stats
@@ -0,0 +1,90 @@
+"""
+Convert timestamps stored as strings into BSON dates, in place.
+
+Walks the documents whose field is still a string in _id order, a batch at
+a time, and records the last _id handled in the migrations collection, so
+an interrupted run resumes where it stopped. A document is only updated if
+its value is still the string that was read, so it is safe to run while
+the bot is writing.
+
+    python -m services.datetime_backfill --collection contacts --field datetime --utc-offset-minutes 330
+"""
+import argparse
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from services.mongodb_service import get_collection
+from utils.datetimes import is_legacy_timestamp, parse_timestamp
+from utils.logger import logger
+
+MIGRATIONS_COLLECTION = "migrations"
+DEFAULT_BATCH_SIZE = 1000
+
+def checkpoint_id(collection, field):
+    return f"datetime_backfill:{collection.name}.{field}"
+
+def backfill(collection, field, migrations, batch_size=DEFAULT_BATCH_SIZE, utc_offset=timedelta(0), restart=False):
+    """
+    Convert string values of field to datetimes. Legacy bot strings were
+    written in the bot host's local time and are shifted by -utc_offset;
+    ISO strings are taken as they are. Returns the checkpoint document with
+    converted/unparseable counts.
+    """
+    key = checkpoint_id(collection, field)
+    state = None if restart else migrations.find_one({"_id": key})
+    state = state or {"_id": key, "last_id": None, "converted": 0, "unparseable": 0}
+
+    while True:
+        query = {field: {"$type": "string"}}
+        if state["last_id"] is not None:
+            query["_id"] = {"$gt": state["last_id"]}
+        batch = list(collection.find(query, {field: 1}).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+
+        updates = []
+        for doc in batch:
+            try:
+                value = parse_timestamp(doc[field])
+                if is_legacy_timestamp(doc[field]):
+                    value -= utc_offset
+            except ValueError:
+                state["unparseable"] += 1
+                logger.warning(f"{collection.name} {doc['_id']}: cannot parse {field}={doc[field]!r}")
+                continue
+            updates.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: value}}))
+        if updates:
+            state["converted"] += collection.bulk_write(updates, ordered=False).modified_count
+
+        state["last_id"] = batch[-1]["_id"]
+        state["updated_at"] = datetime.utcnow()
+        migrations.replace_one({"_id": key}, state, upsert=True)
+        logger.info(f"Backfilled {collection.name}.{field} up to {state['last_id']}: "
+                    f"{state['converted']} converted, {state['unparseable']} unparseable")
+
+    state["finished_at"] = datetime.utcnow()
+    migrations.replace_one({"_id": key}, state, upsert=True)
+    return state
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert string timestamps to BSON dates")
+    parser.add_argument("--collection", default="contacts")
+    parser.add_argument("--field", default="datetime")
+    parser.add_argument("--db-type", default="scam_database", choices=["scam_database", "email_transactions"])
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--utc-offset-minutes", type=int, default=0,
+                        help="UTC offset of the bot host that wrote legacy dd-mm-YYYY strings, e.g. 330 for IST")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    args = parser.parse_args()
+
+    state = backfill(
+        get_collection(args.collection, db_type=args.db_type),
+        args.field,
+        get_collection(MIGRATIONS_COLLECTION, db_type=args.db_type),
+        batch_size=args.batch_size,
+        utc_offset=timedelta(minutes=args.utc_offset_minutes),
+        restart=args.restart
+    )
+    print(f"Done: {state['converted']} converted, {state['unparseable']} left as strings")
+
+if __name__ == "__main__":
+    main()
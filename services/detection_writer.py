@@ -0,0 +1,196 @@
+import asyncio
+import os
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError
+from services.stats_service import count_classifications, increment_counters
+from utils.logger import logger
+
+DETECTION_BATCH_SIZE = int(os.getenv("DETECTION_BATCH_SIZE", 100))
+DETECTION_FLUSH_SECONDS = float(os.getenv("DETECTION_FLUSH_SECONDS", 1.0))
+DETECTION_QUEUE_SIZE = int(os.getenv("DETECTION_QUEUE_SIZE", 10000))
+DETECTION_SPOOL_PATH = os.getenv("DETECTION_SPOOL_PATH", os.path.join("spool", "detections.jsonl"))
+SPOOL_RETRY_SECONDS = 30
+DUPLICATE_KEY = 11000
+
+class DetectionWriter:
+    """
+    Write-behind buffer for detection documents.
+
+    write() only queues the document (waiting when the bounded queue is full);
+    a background task inserts queued documents with unordered insert_many once
+    batch_size are waiting or flush_seconds after the first one arrived.
+    Batches that cannot be written are appended to a JSON-lines spool file and
+    retried every SPOOL_RETRY_SECONDS. Each document gets its _id when queued,
+    so a batch retried after a partial write only adds what is missing.
+
+    When counters is given, the classification counts of every inserted
+    document are added to it (see services.stats_service).
+    """
+
+    def __init__(self, collection=None, counters=None, batch_size=DETECTION_BATCH_SIZE, flush_seconds=DETECTION_FLUSH_SECONDS,
+                 queue_size=DETECTION_QUEUE_SIZE, spool_path=DETECTION_SPOOL_PATH):
+        self.collection = collection
+        self.counters = counters
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.spool_path = spool_path
+        self.written = 0
+        self.batches = 0
+        self.spooled = 0
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._task = None
+        self._next_spool_retry = 0.0
+
+    async def start(self):
+        await self._safe_replay()  # Left over from a previous run
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Detection writer started (batch {self.batch_size}, every {self.flush_seconds}s)")
+
+    async def stop(self):
+        """Flush everything queued, then stop the background task."""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await self._safe_replay()
+
+    async def write(self, doc):
+        doc = dict(doc)  # insert_many runs on another thread; handlers keep their own copy
+        doc.setdefault("_id", ObjectId())
+        await self._queue.put(doc)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                first = await asyncio.wait_for(self._queue.get(), SPOOL_RETRY_SECONDS)
+            except asyncio.TimeoutError:
+                await self._safe_replay()
+                continue
+            batch = [first]
+            flush_at = loop.time() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                remaining = flush_at - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._flush(batch)
+                if loop.time() >= self._next_spool_retry:
+                    await self._safe_replay()
+            except Exception as e:
+                # Keep the task alive: write() and stop() wait on it
+                logger.error(f"Detection batch of {len(batch)} lost: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _insert(self, batch):
+        """Insert batch; returns True when every document is stored (duplicates included)."""
+        if self.collection is None:
+            return False
+        failed = set()
+        try:
+            await asyncio.to_thread(self.collection.insert_many, batch, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            failed = {err["index"] for err in errors}
+            if any(err.get("code") != DUPLICATE_KEY for err in errors):
+                logger.error(f"Detection batch partially failed: {len(errors)} errors")
+                await self._count([doc for i, doc in enumerate(batch) if i not in failed])
+                return False
+        except Exception as e:
+            logger.error(f"Detection batch of {len(batch)} not written: {e}")
+            return False
+        await self._count([doc for i, doc in enumerate(batch) if i not in failed])
+        self.batches += 1
+        return True
+
+    async def _count(self, inserted):
+        self.written += len(inserted)
+        if self.counters is None or not inserted:
+            return
+        try:
+            await asyncio.to_thread(increment_counters, self.counters, count_classifications(inserted))
+        except Exception as e:
+            logger.error(f"Detection counters not updated for {len(inserted)} documents: {e}")
+
+    async def _flush(self, batch):
+        if await self._insert(batch):
+            logger.info(f"[MongoDB] Wrote {len(batch)} detections")
+            return
+        await asyncio.to_thread(self._append_spool, batch)
+        self.spooled += len(batch)
+        logger.warning(f"Spooled {len(batch)} detections to {self.spool_path}")
+
+    def _append_spool(self, batch):
+        os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+        with open(self.spool_path, "a", encoding="utf-8") as f:
+            for doc in batch:
+                f.write(json_util.dumps(doc) + "\n")
+
+    def _take_spool(self):
+        """
+        Move the spool aside and return its documents, so new failures append
+        to a fresh file. A .replaying file left by a run that stopped
+        mid-replay is picked up too; lines that do not parse (a crash during
+        an append leaves a partial one) are moved to a .corrupt file.
+        """
+        replaying = self.spool_path + ".replaying"
+        if os.path.exists(self.spool_path):
+            if os.path.exists(replaying):
+                with open(self.spool_path, encoding="utf-8") as src, open(replaying, "a", encoding="utf-8") as dst:
+                    dst.write(src.read())
+                os.remove(self.spool_path)
+            else:
+                os.replace(self.spool_path, replaying)
+        elif not os.path.exists(replaying):
+            return []
+        docs, corrupt = [], []
+        with open(replaying, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    docs.append(json_util.loads(line))
+                except Exception:
+                    corrupt.append(line if line.endswith("\n") else line + "\n")
+        if corrupt:
+            with open(self.spool_path + ".corrupt", "a", encoding="utf-8") as f:
+                f.writelines(corrupt)
+            logger.error(f"Skipped {len(corrupt)} unreadable spool lines, kept in {self.spool_path}.corrupt")
+        os.remove(replaying)
+        return docs
+
+    async def _safe_replay(self):
+        try:
+            await self._replay_spool()
+        except Exception as e:
+            logger.error(f"Could not replay detection spool {self.spool_path}: {e}")
+
+    async def _replay_spool(self):
+        self._next_spool_retry = asyncio.get_running_loop().time() + SPOOL_RETRY_SECONDS
+        if self.collection is None or not (os.path.exists(self.spool_path) or os.path.exists(self.spool_path + ".replaying")):
+            return
+        docs = await asyncio.to_thread(self._take_spool)
+        for start in range(0, len(docs), self.batch_size):
+            if not await self._insert(docs[start:start + self.batch_size]):
+                await asyncio.to_thread(self._append_spool, docs[start:])
+                self.spooled = len(docs) - start
+                return
+        if docs:
+            logger.info(f"Replayed {len(docs)} spooled detections")
+        self.spooled = 0
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "spooled": self.spooled,
+        }
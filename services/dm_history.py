@@ -0,0 +1,57 @@
+"""
+Token-budgeted prompt history for the human persona DM conversation.
+
+The system prompt and the most recent turns are sent verbatim; turns that no
+longer fit the budget are folded into a short running summary sent as one
+system message, so the prompt stops growing with the conversation.
+"""
+import math
+
+DM_PROMPT_TOKEN_BUDGET = 400
+DM_SUMMARY_TOKEN_BUDGET = 120
+DM_MIN_RECENT_MESSAGES = 4
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separators the chat format adds per message
+SUMMARY_FRAGMENT_CHARS = 100
+SPEAKERS = {"user": "They", "assistant": "You"}
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English chat)."""
+    return math.ceil(len(text) / 4)
+
+def prompt_tokens(messages):
+    return sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+def summary_message(summary):
+    return {"role": "system", "content": f"Earlier in this chat: {summary}"}
+
+def fold_into_summary(summary, message, max_tokens=DM_SUMMARY_TOKEN_BUDGET):
+    """Append a one-line gist of message to summary, dropping the oldest gists past max_tokens."""
+    text = " ".join(message["content"].split())
+    if len(text) > SUMMARY_FRAGMENT_CHARS:
+        text = text[:SUMMARY_FRAGMENT_CHARS - 3].rstrip() + "..."
+    fragments = (summary.split(" | ") if summary else []) + [f"{SPEAKERS.get(message['role'], message['role'])}: {text}"]
+    while len(fragments) > 1 and estimate_tokens(" | ".join(fragments)) > max_tokens:
+        fragments.pop(0)
+    return " | ".join(fragments)
+
+def compact_history(history, summary, instructions=None, budget=DM_PROMPT_TOKEN_BUDGET,
+                    min_recent=DM_MIN_RECENT_MESSAGES):
+    """
+    Fold the oldest turns of history (history[0] being the system prompt) into
+    summary until the prompt fits budget or only min_recent turns are left.
+    Returns the new (history, summary).
+    """
+    history = list(history)
+    while len(history) - 1 > min_recent and prompt_tokens(build_messages(history, summary, instructions)) > budget:
+        summary = fold_into_summary(summary, history.pop(1))
+    return history, summary
+
+def build_messages(history, summary, instructions=None):
+    """The messages to send: system prompt, summary, recent turns, then instructions."""
+    messages = history[:1]
+    if summary:
+        messages.append(summary_message(summary))
+    messages.extend(history[1:])
+    if instructions:
+        messages.append({"role": "system", "content": instructions})
+    return messages
@@ -0,0 +1,276 @@
+"""
+Durable outbox for nodal officer emails, in the email_transactions database.
+
+The report monitor only enqueues one job per officer email; an
+OutboxDispatcher sends them. Each job's _id is "<report id>:<officer>", so
+a report seen twice (e.g. replayed from the change stream after a restart)
+does not queue a second email. Failed sends are retried with exponential
+backoff and, after OUTBOX_MAX_ATTEMPTS, left with status "dead".
+
+Job status: pending -> sending -> sent, or back to pending with a later
+next_attempt_at, or dead. A job is claimed by setting it to sending with
+next_attempt_at pushed OUTBOX_LEASE_SECONDS ahead; if its dispatcher dies
+mid-send, the job becomes claimable again when the lease runs out.
+
+The monitor runs a dispatcher; more can run on their own to add throughput:
+
+    python -m services.email_outbox run --concurrency 8
+    python -m services.email_outbox stats
+    python -m services.email_outbox retry-dead
+"""
+import argparse
+import os
+import random
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from services.email_service import build_message, nodal_emails, record_email, smtp_pool
+from utils.logger import logger
+
+OUTBOX_COLLECTION = "email_outbox"
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", 4))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+OUTBOX_BASE_DELAY_SECONDS = 30
+OUTBOX_MAX_DELAY_SECONDS = 3600
+OUTBOX_LEASE_SECONDS = 300
+OUTBOX_POLL_SECONDS = 2.0
+LAG_WINDOW = 1000
+DUPLICATE_KEY = 11000
+
+class LagTracker:
+    """Seconds from a report's insert to some later step, over the last LAG_WINDOW samples."""
+
+    def __init__(self, window=LAG_WINDOW):
+        self.lock = threading.Lock()
+        self.samples = deque(maxlen=window)
+        self.total = 0
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+            self.total += 1
+
+    def stats(self):
+        with self.lock:
+            samples = sorted(self.samples)
+            total = self.total
+        if not samples:
+            return {"count": total}
+        return {
+            "count": total,
+            "avg": round(sum(samples) / len(samples), 3),
+            "p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+            "max": round(samples[-1], 3),
+        }
+
+def job_id(report_id, officer):
+    return f"{report_id}:{officer}"
+
+def backoff_seconds(attempts):
+    """Delay before retry number attempts + 1: doubling from the base, capped, with jitter."""
+    delay = min(OUTBOX_BASE_DELAY_SECONDS * 2 ** (attempts - 1), OUTBOX_MAX_DELAY_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+def report_time(data):
+    """When a report was inserted: its ObjectId's creation time, else its datetime field."""
+    if isinstance(data.get("_id"), ObjectId):
+        return data["_id"].generation_time.replace(tzinfo=None)
+    return data.get("datetime") if isinstance(data.get("datetime"), datetime) else datetime.utcnow()
+
+def enqueue(outbox, emails, reported_at=None):
+    """
+    Queue emails (dicts as returned by nodal_emails()); returns how many
+    were new. Jobs already in the outbox are left as they are. reported_at
+    is the report's insert time, kept on the job to measure delivery lag.
+    """
+    if not emails:
+        return 0
+    now = datetime.utcnow()
+    jobs = [{
+        "_id": job_id(e["scam_report_id"], e["officer"]),
+        **e,
+        "reported_at": reported_at or now,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now
+    } for e in emails]
+    try:
+        return len(outbox.insert_many(jobs, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        # Anything but "already queued", including a write concern failure, means jobs may be missing
+        if e.details.get("writeConcernErrors") or any(err.get("code") != DUPLICATE_KEY for err in errors):
+            raise
+        return e.details.get("nInserted", 0)
+
+def send_job(job):
+    """Send one outbox job over the pooled SMTP sessions."""
+    smtp_pool().send_message(build_message(job["to_email"], job["subject"], job["body"]))
+
+def record_job(job, status, error=None):
+    """Add the job's outcome to sent_emails; a failure here is logged, never retried as a send."""
+    try:
+        record_email(job["to_email"], job["subject"], job["body"], job["scam_report_id"], status, error=error)
+    except Exception as e:
+        logger.error(f"Could not record email {job['_id']} as {status} in sent_emails: {e}")
+
+class OutboxDispatcher:
+    """
+    Sends outbox jobs on concurrency threads, each claiming the job that is
+    due soonest with find_one_and_update. Any number of dispatchers, in any
+    number of processes, can drain the same outbox.
+    """
+
+    def __init__(self, outbox, send=send_job, concurrency=OUTBOX_CONCURRENCY, max_attempts=OUTBOX_MAX_ATTEMPTS,
+                 poll_seconds=OUTBOX_POLL_SECONDS):
+        self.outbox = outbox
+        self.send = send
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.lock = threading.Lock()
+        self.counters = {"sent": 0, "retried": 0, "dead": 0}
+        self.lag = LagTracker()  # Report insert to email sent
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        from services.index_service import INDEXES
+        self.outbox.create_indexes(INDEXES[("email_transactions", OUTBOX_COLLECTION)])
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"outbox-{i}", daemon=True) for i in range(self.concurrency)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Outbox dispatcher started with {self.concurrency} senders")
+
+    def stop(self):
+        """Let in-flight sends finish, then stop; unsent jobs stay in the outbox."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def claim(self):
+        now = datetime.utcnow()
+        return self.outbox.find_one_and_update(
+            {"status": {"$in": ["pending", "sending"]}, "next_attempt_at": {"$lte": now}},
+            {"$set": {"status": "sending", "next_attempt_at": now + timedelta(seconds=OUTBOX_LEASE_SECONDS),
+                      "claimed_at": now},
+             "$inc": {"attempts": 1}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def deliver(self, job):
+        # Only the holder of this attempt may settle the job, in case its lease ran out meanwhile
+        claimed = {"_id": job["_id"], "attempts": job["attempts"]}
+        try:
+            self.send(job)
+        except Exception as e:
+            if job["attempts"] >= self.max_attempts:
+                self.outbox.update_one(claimed, {"$set": {"status": "dead", "dead_at": datetime.utcnow(), "error": str(e)}})
+                record_job(job, "failed", error=str(e))
+                self._count("dead")
+                logger.error(f"Giving up on email {job['_id']} after {job['attempts']} attempts: {e}")
+            else:
+                delay = backoff_seconds(job["attempts"])
+                self.outbox.update_one(claimed, {"$set": {
+                    "status": "pending",
+                    "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay),
+                    "error": str(e)
+                }})
+                self._count("retried")
+                logger.warning(f"Email {job['_id']} failed (attempt {job['attempts']}), retrying in {delay:.0f}s: {e}")
+            return
+        # Settle the job first: once the officer has the email, nothing below may cause a resend
+        sent_at = datetime.utcnow()
+        try:
+            self.outbox.update_one(claimed, {"$set": {"status": "sent", "sent_at": sent_at}, "$unset": {"error": ""}})
+        except Exception as e:
+            logger.error(f"Email {job['_id']} was sent but could not be marked sent; it may go out again: {e}")
+        self._count("sent")
+        if job.get("reported_at"):
+            self.lag.record((sent_at - job["reported_at"]).total_seconds())
+        record_job(job, "sent")
+        logger.info(f"Email {job['_id']} sent to {job['to_email']}")
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job = self.claim()
+            except Exception as e:
+                logger.error(f"Could not claim outbox job: {e}")
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_seconds)
+                continue
+            try:
+                self.deliver(job)
+            except Exception as e:
+                # The job keeps its lease and is picked up again when it expires
+                logger.error(f"Could not settle outbox job {job['_id']}: {e}")
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+        return {**counters, "report_to_sent_seconds": self.lag.stats()}
+
+def outbox_counts(outbox):
+    """Number of jobs by status, plus how many are due now."""
+    counts = {row["_id"]: row["count"] for row in outbox.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}])}
+    counts["due"] = outbox.count_documents({"status": "pending", "next_attempt_at": {"$lte": datetime.utcnow()}})
+    return counts
+
+def enqueue_report(data, outbox=None):
+    """
+    Monitor handler: queue the officer emails for a new scam report.
+
+    Any failure to reach or write the outbox is raised, never logged and
+    dropped: the monitor retries the report and only acknowledges it once
+    its jobs are stored. Retrying is safe, since jobs already queued count
+    as duplicates.
+    """
+    if outbox is None:
+        from services.mongodb_service import get_collection
+        outbox = get_collection(OUTBOX_COLLECTION, db_type="email_transactions")
+    emails = nodal_emails(data)
+    queued = enqueue(outbox, emails, reported_at=report_time(data))
+    logger.info(f"Queued {queued} of {len(emails)} emails for scam report {data['_id']}")
+    return queued
+
+def main():
+    parser = argparse.ArgumentParser(description="Send and inspect queued nodal officer emails")
+    parser.add_argument("command", choices=["run", "stats", "retry-dead"])
+    parser.add_argument("--concurrency", type=int, default=OUTBOX_CONCURRENCY)
+    args = parser.parse_args()
+
+    from services.mongodb_service import get_collection
+    outbox = get_collection(OUTBOX_COLLECTION, db_type="email_transactions")
+    if args.command == "retry-dead":
+        result = outbox.update_many(
+            {"status": "dead"},
+            {"$set": {"status": "pending", "attempts": 0, "next_attempt_at": datetime.utcnow()}, "$unset": {"dead_at": ""}}
+        )
+        print(f"Requeued {result.modified_count} dead jobs")
+    elif args.command == "run":
+        dispatcher = OutboxDispatcher(outbox, concurrency=args.concurrency)
+        dispatcher.start()
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            dispatcher.stop()
+            print(dispatcher.stats())
+    print(outbox_counts(outbox))
+
+if __name__ == "__main__":
+    main()
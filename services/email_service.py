@@ -1,11 +1,17 @@
 
+import os
+import re
 import smtplib
 import imaplib
 import email
+import queue
+import threading
+import time
 import pandas as pd
 import tempfile
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from collections import deque
 from openai import OpenAI
 from datetime import datetime
 from config1.config import CONFIG
@@ -13,81 +19,381 @@ from utils.email_templates import get_email_template
 from utils.logger import logger
 from services.mongodb_service import get_collection
 
-def send_email(to_email, subject, body, scam_report_id):
-    try:
-        logger.debug(f"Preparing to send email to {to_email} with subject: {subject}")
-        msg = MIMEMultipart()
-        msg["From"] = CONFIG["email"]["user"]
-        msg["To"] = to_email
-        msg["Subject"] = subject
-        msg.attach(MIMEText(body, "plain"))
-
-        with smtplib.SMTP(CONFIG["email"]["host"], CONFIG["email"]["port"]) as server:
-            server.starttls()
-            server.login(CONFIG["email"]["user"], CONFIG["email"]["pass"])
-            server.send_message(msg)
-        
-        # Store email sent status in sent_emails collection
-        get_collection("sent_emails", db_type="email_transactions").insert_one({
-            "scam_report_id": scam_report_id,
-            "category": get_category_from_email(to_email),
-            "to_email": to_email,
-            "subject": subject,
-            "body": body,
-            "sent_at": datetime.utcnow(),
-            "status": "sent"
-        })
-        logger.info(f"Email sent to {to_email} for scam report {scam_report_id}")
-    except Exception as e:
-        # Store failed email attempt in sent_emails collection
-        get_collection("sent_emails", db_type="email_transactions").insert_one({
-            "scam_report_id": scam_report_id,
-            "category": get_category_from_email(to_email),
-            "to_email": to_email,
-            "subject": subject,
-            "body": body,
-            "sent_at": datetime.utcnow(),
-            "status": "failed",
-            "error": str(e)
-        })
-        logger.error(f"Error sending email to {to_email} for scam report {scam_report_id}: {e}")
+IMAP_STATE_COLLECTION = "imap_state"
+IMAP_INITIAL_MESSAGES = 30  # Looked at on the first sync, or after UIDVALIDITY changes
+IMAP_FETCH_BATCH = 200
+HEADER_FIELDS = "(UID BODY.PEEK[HEADER.FIELDS (FROM SUBJECT)])"
+FETCH_UID = re.compile(rb"UID (\d+)")
 
-def check_nodal_responses():
-    try:
-        logger.debug("Connecting to IMAP server to check for nodal responses")
-        mail = imaplib.IMAP4_SSL(CONFIG["email"]["imap_server"])
-        mail.login(CONFIG["email"]["user"], CONFIG["email"]["pass"])
-        mail.select("inbox")
+NODAL_CATEGORIES = {
+    "phones": ("dot", "Request for Phone Number Details"),
+    "account_numbers": ("bank", "Request for Account Holder Details and Transaction History – Suspected Involvement in Online Scam Activity"),
+    "socials": ("meta", "Request for Social Media Account Details and Login Metadata"),
+    "upi_ids": ("payments", "Request for Merchant and Transaction Details – Suspected Online Scam Activity")
+}
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 4))
+SMTP_IDLE_CHECK_SECONDS = 30  # Sessions idle longer than this are checked with NOOP before reuse
+SMTP_TIMEOUT = 30
+SMTP_LATENCY_WINDOW = 1000
+
+_nodal_inbox = None
+_inbox_lock = threading.Lock()
+_smtp_pool = None
+_smtp_lock = threading.Lock()
+
+class SMTPPool:
+    """
+    Logged-in SMTP sessions reused across sends, at most size open at once.
 
-        result, data = mail.search(None, "ALL")
-        email_ids = data[0].split()
-        logger.debug(f"Found {len(email_ids[-30:])} recent emails to check")
+    A session that has been idle for idle_check_seconds is checked with NOOP
+    before reuse and replaced if the server has timed it out. A send that
+    finds its connection dropped is retried once on a new session.
+    """
 
-        nodal_emails = set(CONFIG["nodal_officers"].values())
+    def __init__(self, size=SMTP_POOL_SIZE, idle_check_seconds=SMTP_IDLE_CHECK_SECONDS, config=None):
+        self.config = config or CONFIG["email"]
+        self.idle_check_seconds = idle_check_seconds
+        self._idle = queue.LifoQueue()  # (session, last used); most recently used first
+        self._slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=SMTP_LATENCY_WINDOW)
+        self.counters = {"sent": 0, "failed": 0, "connects": 0, "reconnects": 0}
 
-        for email_id in reversed(email_ids[-30:]):
-            result, message_data = mail.fetch(email_id, "(RFC822)")
-            raw_email = message_data[0][1]
-            msg = email.message_from_bytes(raw_email)
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
 
-            from_email = email.utils.parseaddr(msg.get("From"))[1].lower()
-            if from_email not in nodal_emails:
-                logger.debug(f"Skipping email from {from_email} (not a nodal officer)")
+    def _connect(self):
+        server = smtplib.SMTP(self.config["host"], self.config["port"], timeout=SMTP_TIMEOUT)
+        try:
+            if self.config.get("starttls", True):
+                server.starttls()
+            if self.config.get("pass"):
+                server.login(self.config["user"], self.config["pass"])
+        except Exception:
+            server.close()
+            raise
+        self._count("connects")
+        return server
+
+    def _discard(self, server):
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    server, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if time.monotonic() - last_used < self.idle_check_seconds:
+                    return server
+                try:
+                    if server.noop()[0] == 250:
+                        return server
+                except (smtplib.SMTPException, OSError):
+                    pass
+                self._discard(server)
+                self._count("reconnects")
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, server, reusable=True):
+        if reusable:
+            self._idle.put((server, time.monotonic()))
+        else:
+            self._discard(server)
+        self._slots.release()
+
+    def send_message(self, msg):
+        start = time.perf_counter()
+        for attempt in (1, 2):
+            server = self._acquire()
+            try:
+                server.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                self._release(server, reusable=False)
+                if attempt == 2:
+                    self._count("failed")
+                    raise
+                logger.info(f"SMTP session dropped ({e}), retrying on a new one")
+                self._count("reconnects")
                 continue
+            except smtplib.SMTPResponseException:
+                # The server refused this message; the session itself is fine
+                self._release(server)
+                self._count("failed")
+                raise
+            except Exception:
+                self._release(server, reusable=False)
+                self._count("failed")
+                raise
+            self._release(server)
+            with self.lock:
+                self.counters["sent"] += 1
+                self.latencies.append(time.perf_counter() - start)
+            return
 
-            logger.debug(f"Processing email from {from_email} with subject: {msg['Subject']}")
-            for part in msg.walk():
-                if "attachment" in str(part.get("Content-Disposition", "")) and part.get_filename().endswith(".xlsx"):
-                    logger.debug(f"Found Excel attachment: {part.get_filename()}")
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-                        tmp.write(part.get_payload(decode=True))
-                        tmp_path = tmp.name
-                    process_attachment(tmp_path, from_email, msg["Subject"])
-                    os.remove(tmp_path)
-
-        mail.logout()
-    except Exception as e:
-        logger.error(f"Error checking nodal responses: {e}")
+    def close(self):
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(server)
+
+    def stats(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            stats = dict(self.counters)
+        stats["idle_sessions"] = self._idle.qsize()
+        if latencies:
+            stats["latency_p50_ms"] = round(latencies[len(latencies) // 2] * 1000, 1)
+            stats["latency_p95_ms"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1)
+            stats["latency_max_ms"] = round(latencies[-1] * 1000, 1)
+        return stats
+
+def smtp_pool():
+    global _smtp_pool
+    with _smtp_lock:
+        if _smtp_pool is None:
+            _smtp_pool = SMTPPool()
+        return _smtp_pool
+
+def smtp_stats():
+    return _smtp_pool.stats() if _smtp_pool is not None else {}
+
+def close_smtp_pool():
+    global _smtp_pool
+    with _smtp_lock:
+        if _smtp_pool is not None:
+            _smtp_pool.close()
+        _smtp_pool = None
+
+def build_message(to_email, subject, body):
+    msg = MIMEMultipart()
+    msg["From"] = CONFIG["email"]["user"]
+    msg["To"] = to_email
+    msg["Subject"] = subject
+    msg.attach(MIMEText(body, "plain"))
+    return msg
+
+def record_email(to_email, subject, body, scam_report_id, status, error=None):
+    """Store the outcome of an email in the sent_emails collection."""
+    record = {
+        "scam_report_id": scam_report_id,
+        "category": get_category_from_email(to_email),
+        "to_email": to_email,
+        "subject": subject,
+        "body": body,
+        "sent_at": datetime.utcnow(),
+        "status": status
+    }
+    if error is not None:
+        record["error"] = error
+    get_collection("sent_emails", db_type="email_transactions").insert_one(record)
+
+def message_set(uids):
+    """IMAP message set for sorted uids, with runs collapsed: [1, 2, 3, 7] -> "1:3,7"."""
+    ranges = []
+    start = prev = uids[0]
+    for uid in uids[1:] + [None]:
+        if uid is not None and uid == prev + 1:
+            prev = uid
+            continue
+        ranges.append(str(start) if start == prev else f"{start}:{prev}")
+        start = prev = uid
+    return ",".join(ranges)
+
+def from_any(addresses):
+    """SEARCH key matching mail from any of addresses; IMAP's OR takes exactly two keys."""
+    keys = [f'FROM "{address}"' for address in sorted(addresses)]
+    while len(keys) > 1:
+        keys = [f"OR {a} {b}" for a, b in zip(keys[::2], keys[1::2])] + keys[len(keys) - len(keys) % 2:]
+    return keys[0]
+
+def fetched(data):
+    """(uid, payload) for each message in a UID FETCH response."""
+    for item in data:
+        if isinstance(item, tuple):
+            match = FETCH_UID.search(item[0])
+            if match:
+                yield int(match.group(1)), item[1]
+
+def sender(msg):
+    return email.utils.parseaddr(msg.get("From"))[1].lower()
+
+class NodalInbox:
+    """
+    Incremental sync of nodal officer replies over one long-lived IMAP session.
+
+    The mailbox UIDVALIDITY and the last UID handled are kept in state (a
+    collection, or in memory when state is None), so each sync only searches
+    newer mail from the nodal addresses. Headers of the hits are fetched in
+    one command and full messages only for those whose From really is a
+    nodal address, since SEARCH FROM is a substring match. The session is
+    checked with NOOP before each sync and reopened if the server dropped it.
+    """
+
+    def __init__(self, handler, state=None, nodal_emails=None, mailbox="INBOX", config=None):
+        self.config = config or CONFIG["email"]
+        self.handler = handler
+        self.state = state
+        self.mailbox = mailbox
+        self.nodal_emails = {address.lower() for address in (nodal_emails or CONFIG["nodal_officers"].values())}
+        self.state_id = f"{self.config['user']}:{mailbox}"
+        self.mail = None
+        self.uidvalidity = None
+        self.last_uid = None
+        self.exists = 0
+        self.uidnext = None
+        self.counters = {"syncs": 0, "connects": 0, "reconnects": 0, "headers_fetched": 0, "messages_fetched": 0}
+
+    def _connect(self):
+        use_ssl = self.config.get("imap_ssl", True)
+        port = self.config.get("imap_port") or (993 if use_ssl else 143)
+        mail = (imaplib.IMAP4_SSL if use_ssl else imaplib.IMAP4)(self.config["imap_server"], port)
+        mail.login(self.config["user"], self.config["pass"])
+        typ, data = mail.select(self.mailbox)
+        if typ != "OK":
+            raise imaplib.IMAP4.error(f"Cannot select {self.mailbox}: {data}")
+        self.exists = int(data[0])
+        uidnext = mail.response("UIDNEXT")[1][0]
+        self.uidnext = int(uidnext) if uidnext else None
+        self.mail = mail
+        self.counters["connects"] += 1
+        self._load_state(int(mail.response("UIDVALIDITY")[1][0]))
+
+    def _load_state(self, uidvalidity):
+        if self.uidvalidity is None and self.state is not None:
+            doc = self.state.find_one({"_id": self.state_id}) or {}
+            self.uidvalidity, self.last_uid = doc.get("uidvalidity"), doc.get("last_uid")
+        if self.uidvalidity != uidvalidity:
+            if self.uidvalidity is not None:
+                logger.warning(f"UIDVALIDITY of {self.mailbox} changed, rescanning its latest {IMAP_INITIAL_MESSAGES} messages")
+            self.uidvalidity, self.last_uid = uidvalidity, None
+
+    def _save_state(self):
+        if self.state is not None:
+            self.state.update_one(
+                {"_id": self.state_id},
+                {"$set": {"uidvalidity": self.uidvalidity, "last_uid": self.last_uid, "synced_at": datetime.utcnow()}},
+                upsert=True
+            )
+
+    def _session(self):
+        if self.mail is not None:
+            try:
+                typ, _ = self.mail.noop()
+                if typ == "OK":
+                    exists = self.mail.response("EXISTS")[1]
+                    if exists[-1]:
+                        self.exists = int(exists[-1])
+                    return self.mail
+            except (imaplib.IMAP4.abort, imaplib.IMAP4.error, OSError) as e:
+                logger.info(f"IMAP session lost ({e}), reconnecting")
+            self.close()
+            self.counters["reconnects"] += 1
+        self._connect()
+        return self.mail
+
+    def sync(self):
+        """Hand every new message from a nodal address to handler; returns how many were handled."""
+        mail = self._session()
+        self.counters["syncs"] += 1
+        if self.last_uid is None:
+            if not self.exists:
+                self.last_uid = (self.uidnext or 1) - 1
+                self._save_state()
+                return 0
+            # First sync of this mailbox: look only at the most recent messages
+            window = f"{max(1, self.exists - IMAP_INITIAL_MESSAGES + 1)}:*"
+        else:
+            window = f"UID {self.last_uid + 1}:*"
+        typ, data = mail.uid("SEARCH", window, from_any(self.nodal_emails))
+        if typ != "OK":
+            raise imaplib.IMAP4.error(f"UID SEARCH failed: {data}")
+        # "n:*" always includes the newest message, even when its UID is below n
+        uids = sorted(uid for uid in map(int, data[0].split()) if self.last_uid is None or uid > self.last_uid)
+        logger.debug(f"Found {len(uids)} new emails from nodal addresses")
+
+        handled = 0
+        for i in range(0, len(uids), IMAP_FETCH_BATCH):
+            batch = uids[i:i + IMAP_FETCH_BATCH]
+            typ, data = mail.uid("FETCH", message_set(batch), HEADER_FIELDS)
+            matches = []
+            for uid, header in fetched(data):
+                self.counters["headers_fetched"] += 1
+                from_email = sender(email.message_from_bytes(header))
+                if from_email in self.nodal_emails:
+                    matches.append(uid)
+                else:
+                    logger.debug(f"Skipping email from {from_email} (not a nodal officer)")
+            if matches:
+                typ, data = mail.uid("FETCH", message_set(matches), "(UID RFC822)")
+                for uid, raw_email in fetched(data):
+                    self.counters["messages_fetched"] += 1
+                    self.handler(email.message_from_bytes(raw_email))
+                    handled += 1
+            self.last_uid = batch[-1]
+            self._save_state()
+
+        if self.uidnext and (self.last_uid is None or self.last_uid < self.uidnext - 1):
+            self.last_uid = self.uidnext - 1
+            self._save_state()
+        return handled
+
+    def close(self):
+        if self.mail is not None:
+            try:
+                self.mail.logout()
+            except (imaplib.IMAP4.error, OSError):
+                pass
+            self.mail = None
+
+    def stats(self):
+        return {**self.counters, "uidvalidity": self.uidvalidity, "last_uid": self.last_uid}
+
+def handle_nodal_message(msg):
+    from_email = sender(msg)
+    logger.debug(f"Processing email from {from_email} with subject: {msg['Subject']}")
+    for part in msg.walk():
+        filename = part.get_filename() or ""
+        if "attachment" in str(part.get("Content-Disposition", "")) and filename.endswith(".xlsx"):
+            logger.debug(f"Found Excel attachment: {filename}")
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
+                tmp.write(part.get_payload(decode=True))
+                tmp_path = tmp.name
+            try:
+                process_attachment(tmp_path, from_email, msg["Subject"])
+            finally:
+                os.remove(tmp_path)
+
+def check_nodal_responses():
+    global _nodal_inbox
+    with _inbox_lock:
+        try:
+            if _nodal_inbox is None:
+                _nodal_inbox = NodalInbox(
+                    handle_nodal_message,
+                    state=get_collection(IMAP_STATE_COLLECTION, db_type="email_transactions")
+                )
+            handled = _nodal_inbox.sync()
+            logger.debug(f"Handled {handled} nodal responses: {_nodal_inbox.stats()}")
+        except Exception as e:
+            logger.error(f"Error checking nodal responses: {e}")
+            if _nodal_inbox is not None:
+                _nodal_inbox.close()  # Start from a fresh session next time
+
+def close_nodal_inbox():
+    with _inbox_lock:
+        if _nodal_inbox is not None:
+            _nodal_inbox.close()
 
 def process_attachment(filepath, source_email, email_subject):
     try:
@@ -129,26 +435,23 @@ def get_category_from_email(email):
             return category
     return "unknown"
 
-def send_email_to_nodal_officers(data):
+def nodal_emails(data):
+    """The emails a scam report calls for: one per officer whose field has suspects."""
     logger.debug(f"Processing scam report data: {data}")
-    categories = {
-        "phones": ("dot", "Request for Phone Number Details"),
-        "account_numbers": ("bank", "Request for Account Holder Details and Transaction History – Suspected Involvement in Online Scam Activity"),
-        "socials": ("meta", "Request for Social Media Account Details and Login Metadata"),
-        "upi_ids": ("payments", "Request for Merchant and Transaction Details – Suspected Online Scam Activity")
-    }
-
-    for field, (officer, subject) in categories.items():
+    emails = []
+    for field, (officer, subject) in NODAL_CATEGORIES.items():
         suspects = data.get(field, [])
         logger.debug(f"Checking field {field} for officer {officer}: {suspects}")
         if suspects:
             email_body = get_email_template(officer, data)
             logger.debug(f"Generated email body for {officer}: {email_body[:100]}...")
-            send_email(
-                to_email=CONFIG["nodal_officers"][officer],
-                subject=subject,
-                body=email_body,
-                scam_report_id=str(data["_id"])
-            )
+            emails.append({
+                "officer": officer,
+                "to_email": CONFIG["nodal_officers"][officer],
+                "subject": subject,
+                "body": email_body,
+                "scam_report_id": str(data["_id"])
+            })
         else:
             logger.debug(f"No suspects found in field {field}, skipping email for {officer}")
+    return emails
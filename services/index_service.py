@@ -0,0 +1,133 @@
+"""
+Indexes behind the dashboard and API queries, and a query-plan check.
+
+ensure_indexes() is idempotent and runs when app.py starts; both steps can
+also be run by hand:
+
+    python -m services.index_service ensure
+    python -m services.index_service check   # exits 1 if any query would scan a whole collection
+"""
+import argparse
+import sys
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from services.mongodb_service import get_collection
+from utils.logger import logger
+
+INDEXES = {
+    ("scam_database", "contacts"): [
+        # Listings filter on classification and page through datetime, _id
+        IndexModel([("classification", ASCENDING), ("datetime", DESCENDING), ("_id", DESCENDING)],
+                   name="classification_datetime_id"),
+        # One per $or branch of the search; the identifier fields are arrays (multikey)
+        IndexModel([("user", ASCENDING)], name="user"),
+        IndexModel([("upi_ids", ASCENDING)], name="upi_ids"),
+        IndexModel([("phones", ASCENDING)], name="phones"),
+        IndexModel([("account_numbers", ASCENDING)], name="account_numbers"),
+        IndexModel([("socials", ASCENDING)], name="socials"),
+    ],
+    ("email_transactions", "sent_emails"): [
+        IndexModel([("sent_at", DESCENDING), ("_id", DESCENDING)], name="sent_at_id"),
+        IndexModel([("scam_report_id", ASCENDING)], name="scam_report_id"),
+        IndexModel([("to_email", ASCENDING)], name="to_email"),
+        IndexModel([("subject", ASCENDING)], name="subject"),
+        IndexModel([("category", ASCENDING)], name="category"),
+    ],
+    ("email_transactions", "email_outbox"): [
+        # Dispatchers claim the due job with the earliest next_attempt_at
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt_at"),
+    ],
+}
+
+def ensure_indexes():
+    """Create every declared index that is missing; existing ones are left as they are."""
+    for (db_type, name), models in INDEXES.items():
+        try:
+            created = get_collection(name, db_type=db_type).create_indexes(models)
+            logger.info(f"Indexes on {name}: {', '.join(created)}")
+        except OperationFailure as e:
+            # Usually an index of the same name with different keys, created by hand
+            logger.error(f"Could not create indexes on {name}: {e}")
+
+def query_shapes():
+    """
+    (label, db_type, collection, command) for each query app.py runs, where
+    command is the find or aggregate command to explain. Built with app.py's
+    own filter builders so the check follows the queries as they change.
+    """
+    from app import SCAMMER_CLASSIFICATIONS, email_query, encode_cursor, keyset_filter, scammer_query
+    from services.risk_service import RISK_FIELDS
+
+    search = "probe@upi"
+    scammers = {"$in": SCAMMER_CLASSIFICATIONS}
+    datetime_cursor = encode_cursor({"datetime": datetime.utcnow(), "_id": ObjectId()}, "datetime")
+    sent_at_cursor = encode_cursor({"sent_at": datetime.utcnow(), "_id": ObjectId()}, "sent_at")
+    by_datetime = {"datetime": -1, "_id": -1}
+    by_sent_at = {"sent_at": -1, "_id": -1}
+
+    def find(query, sort, limit=101):
+        return {"filter": query, "sort": sort, "limit": limit}
+
+    return [
+        ("scammer listing", "scam_database", "contacts", find(scammer_query("", scammers), by_datetime)),
+        ("scammer search", "scam_database", "contacts", find(scammer_query(search, scammers), by_datetime)),
+        ("scammer next page", "scam_database", "contacts",
+         find({"$and": [scammer_query("", scammers), keyset_filter("datetime", datetime_cursor)]}, by_datetime)),
+        ("all scammers", "scam_database", "contacts", find(scammer_query(search, scammers), {"datetime": -1}, 0)),
+        ("report version", "scam_database", "contacts", find({"classification": scammers}, {"_id": -1}, 1)),
+        ("risk frequencies", "scam_database", "contacts", {"pipeline": [
+            {"$match": {"$or": [{field: {"$in": [search]}} for field in RISK_FIELDS]}}
+        ]}),
+        ("email listing", "email_transactions", "sent_emails", find(email_query(""), by_sent_at)),
+        ("email search", "email_transactions", "sent_emails", find(email_query(search), by_sent_at)),
+        ("email next page", "email_transactions", "sent_emails",
+         find({"$and": [email_query(""), keyset_filter("sent_at", sent_at_cursor)]}, by_sent_at)),
+    ]
+
+def plan_stages(explain):
+    """Every stage name anywhere in an explain() result."""
+    stages = set()
+    if isinstance(explain, dict):
+        if isinstance(explain.get("stage"), str):
+            stages.add(explain["stage"])
+        for value in explain.values():
+            stages |= plan_stages(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            stages |= plan_stages(value)
+    return stages
+
+def explain(collection, command):
+    if "pipeline" in command:
+        body = {"aggregate": collection.name, "pipeline": command["pipeline"], "cursor": {}}
+    else:
+        body = {"find": collection.name, **{k: v for k, v in command.items() if v}}
+    return collection.database.command("explain", body, verbosity="queryPlanner")
+
+def check_query_plans():
+    """Explain every query shape; returns [(label, stages, ok)] where ok means no COLLSCAN."""
+    results = []
+    for label, db_type, name, command in query_shapes():
+        stages = plan_stages(explain(get_collection(name, db_type=db_type), command))
+        results.append((label, sorted(stages), "COLLSCAN" not in stages))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Create indexes and verify query plans")
+    parser.add_argument("command", choices=["ensure", "check"])
+    args = parser.parse_args()
+
+    if args.command == "ensure":
+        ensure_indexes()
+        return
+    results = check_query_plans()
+    for label, stages, ok in results:
+        print(f"{'ok  ' if ok else 'SCAN'} {label:<20} {', '.join(stages)}")
+    if not all(ok for _, _, ok in results):
+        print("Some queries scan a whole collection; run 'python -m services.index_service ensure'")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Local naive Bayes classifier that answers confident cases before the LLM.
+
+Trained offline from labelled messages in Mongo: the classified_messages log
+of past LLM verdicts, plus scammer detections from contacts:
+
+    python -m services.local_classifier train --out models/local_classifier.npz
+    python -m services.local_classifier evaluate --threshold 0.95
+"""
+import argparse
+import os
+import random
+import re
+import sys
+from collections import Counter
+import numpy as np
+from services.classification_cache import normalize_message
+from utils.logger import logger
+
+DEFAULT_MODEL_PATH = os.getenv("LOCAL_CLASSIFIER_PATH", os.path.join("models", "local_classifier.npz"))
+DEFAULT_THRESHOLD = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", 0.95))
+LABELS = ("scammer", "decoy", "innocent")
+TOKEN_RE = re.compile(r"<\w+>|\w+")
+MAX_FEATURES = 20000
+MIN_DF = 2
+
+def tokenize(text):
+    """Unigrams and bigrams of the normalized message."""
+    words = TOKEN_RE.findall(normalize_message(text))
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+class LocalClassifier:
+    """TF-IDF weighted multinomial naive Bayes over NumPy arrays."""
+
+    def __init__(self, vocabulary, idf, feature_log_prob, class_log_prior, classes):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.feature_log_prob = feature_log_prob
+        self.class_log_prior = class_log_prior
+        self.classes = list(classes)
+
+    @classmethod
+    def train(cls, samples, max_features=MAX_FEATURES, min_df=MIN_DF, alpha=0.1):
+        """Fit on (text, label) pairs; labels must be in LABELS."""
+        tokenized = [(Counter(tokenize(text)), label) for text, label in samples]
+        classes = [label for label in LABELS if any(l == label for _, l in tokenized)]
+        if len(classes) < 2:
+            raise ValueError(f"Need samples of at least two classes, got {classes}")
+
+        df = Counter()
+        for counts, _ in tokenized:
+            df.update(counts.keys())
+        terms = [t for t, n in df.most_common(max_features) if n >= min_df]
+        vocabulary = {t: i for i, t in enumerate(terms)}
+        n_docs = len(tokenized)
+        idf = np.log((1 + n_docs) / (1 + np.array([df[t] for t in terms], dtype=np.float64))) + 1
+
+        class_index = {label: i for i, label in enumerate(classes)}
+        feature_weight = np.zeros((len(classes), len(terms)))
+        class_count = np.zeros(len(classes))
+        for counts, label in tokenized:
+            c = class_index[label]
+            class_count[c] += 1
+            idx = [vocabulary[t] for t in counts if t in vocabulary]
+            if idx:
+                tf = np.array([counts[terms[i]] for i in idx], dtype=np.float64)
+                weights = (1 + np.log(tf)) * idf[idx]
+                weights /= np.linalg.norm(weights)
+                np.add.at(feature_weight[c], idx, weights)
+
+        smoothed = feature_weight + alpha
+        feature_log_prob = np.log(smoothed / smoothed.sum(axis=1, keepdims=True))
+        class_log_prior = np.log(class_count / class_count.sum())
+        return cls(vocabulary, idf, feature_log_prob, class_log_prior, classes)
+
+    def predict(self, text):
+        """Return (label, confidence) where confidence is the posterior of label."""
+        counts = Counter(tokenize(text))
+        idx = [self.vocabulary[t] for t in counts if t in self.vocabulary]
+        scores = self.class_log_prior.copy()
+        if idx:
+            tf = np.array([counts[t] for t in counts if t in self.vocabulary], dtype=np.float64)
+            weights = (1 + np.log(tf)) * self.idf[idx]
+            weights /= np.linalg.norm(weights)
+            scores += self.feature_log_prob[:, idx] @ weights
+        probs = np.exp(scores - scores.max())
+        probs /= probs.sum()
+        best = int(probs.argmax())
+        return self.classes[best], float(probs[best])
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                terms=np.array(terms, dtype=object),
+                idf=self.idf,
+                feature_log_prob=self.feature_log_prob,
+                class_log_prior=self.class_log_prior,
+                classes=np.array(self.classes, dtype=object)
+            )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=True) as data:
+            terms = list(data["terms"])
+            return cls(
+                {t: i for i, t in enumerate(terms)},
+                data["idf"],
+                data["feature_log_prob"],
+                data["class_log_prior"],
+                list(data["classes"])
+            )
+
+def load_model(path=DEFAULT_MODEL_PATH):
+    """Load a trained model, or return None when none has been trained yet."""
+    if not os.path.exists(path):
+        logger.info(f"No local classifier at {path}; every message goes to the LLM")
+        return None
+    try:
+        return LocalClassifier.load(path)
+    except Exception as e:
+        logger.error(f"Could not load local classifier from {path}: {e}")
+        return None
+
+def load_samples():
+    """(text, label) pairs from the LLM verdict log and scammer detections."""
+    from services.mongodb_service import get_collection
+
+    samples = []
+    sources = [
+        ("classified_messages", {"classification": {"$in": list(LABELS)}}),
+        # The decoy labels in contacts are stored with the scammer's later replies,
+        # not the message that was judged a decoy, so only scammer detections count
+        ("contacts", {"classification": "scammer"}),
+    ]
+    for name, query in sources:
+        for doc in get_collection(name).find(query, {"text": 1, "classification": 1}):
+            text = doc.get("text")
+            if isinstance(text, str) and text.strip():
+                samples.append((text, doc["classification"]))
+    return samples
+
+def evaluate(samples, threshold=DEFAULT_THRESHOLD, holdout=0.2, seed=42):
+    """Train on a split of samples and report precision/recall and LLM calls avoided on the rest."""
+    samples = list(samples)
+    random.Random(seed).shuffle(samples)
+    split = int(len(samples) * (1 - holdout))
+    train, test = samples[:split], samples[split:]
+    model = LocalClassifier.train(train)
+
+    predictions = [(label, *model.predict(text)) for text, label in test]
+    confident = [(truth, pred) for truth, pred, conf in predictions if conf >= threshold]
+    report = {
+        "train": len(train),
+        "test": len(test),
+        "threshold": threshold,
+        "llm_calls_avoided": len(confident),
+        "llm_calls_avoided_ratio": len(confident) / len(test) if test else 0.0,
+        "confident_accuracy": sum(t == p for t, p in confident) / len(confident) if confident else 0.0,
+        "classes": {}
+    }
+    for label in model.classes:
+        # Messages below the threshold go to the LLM, so they count as misses for recall
+        tp = sum(t == label and p == label for t, p in confident)
+        predicted = sum(p == label for _, p in confident)
+        actual = sum(t == label for t, _ in test)
+        answered = sum(t == label for t, _ in confident)
+        report["classes"][label] = {
+            "precision": tp / predicted if predicted else 0.0,
+            "recall": tp / actual if actual else 0.0,
+            "coverage": answered / actual if actual else 0.0,
+            "support": actual
+        }
+    return report
+
+def print_report(report):
+    print(f"Trained on {report['train']} samples, evaluated on {report['test']} (threshold {report['threshold']})")
+    print(f"LLM calls avoided: {report['llm_calls_avoided']} ({report['llm_calls_avoided_ratio']:.1%}), "
+          f"accuracy on those: {report['confident_accuracy']:.1%}")
+    print(f"{'class':<10} {'precision':>9} {'recall':>7} {'coverage':>8} {'support':>8}")
+    for label, metrics in report["classes"].items():
+        print(f"{label:<10} {metrics['precision']:>9.3f} {metrics['recall']:>7.3f} "
+              f"{metrics['coverage']:>8.3f} {metrics['support']:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or evaluate the local message classifier")
+    parser.add_argument("command", choices=["train", "evaluate"])
+    parser.add_argument("--out", default=DEFAULT_MODEL_PATH, help="model path (train)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    samples = load_samples()
+    counts = Counter(label for _, label in samples)
+    print(f"Loaded {len(samples)} labelled samples: {dict(counts)}")
+    missing = [label for label in LABELS if not counts[label]]
+
+    if args.command == "evaluate":
+        print_report(evaluate(samples, threshold=args.threshold))
+    else:
+        if missing:
+            # A model that has never seen a label answers confidently with the others
+            print(f"ERROR: no {', '.join(missing)} samples yet; not saving a model until the verdict log has some")
+            sys.exit(1)
+        print_report(evaluate(samples, threshold=args.threshold))
+        LocalClassifier.train(samples).save(args.out)
+        print(f"Model trained on all samples and saved to {args.out}")
+
+if __name__ == "__main__":
+    main()
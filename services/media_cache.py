@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import io
+from datetime import datetime
+from utils.logger import logger
+from utils.ttl_cache import TTLCache
+
+try:
+    from PIL import Image
+except ImportError:  # Perceptual hashing is optional; exact hashes still work
+    Image = None
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def image_hashes(data):
+    """
+    (phash, pixels) for an image, or None if it cannot be decoded.
+
+    phash is a 64-bit difference hash of a 9x8 thumbnail: cheap to index, but
+    two screenshots of the same payment-app screen with different UPI IDs
+    share it, so it only shortlists candidates. pixels is the SHA-256 of the
+    dimensions and decoded RGB pixels, which confirms a match: the same
+    picture in a different file (metadata stripped, lossless re-save).
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            rgb = img.convert("RGB")
+            thumb = list(rgb.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+            digest = hashlib.sha256(f"{rgb.width}x{rgb.height}:".encode())
+            digest.update(rgb.tobytes())
+    except Exception as e:
+        logger.debug(f"Could not hash image: {e}")
+        return None
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (thumb[row * 9 + col] > thumb[row * 9 + col + 1])
+    return f"{bits:016x}", digest.hexdigest()
+
+def _entry(doc):
+    return {"text": doc["text"], "entities": doc.get("entities"), "sha256": doc["_id"]}
+
+def _keys(kind, file_unique_id, sha256, image):
+    return [
+        f"{kind}:uid:{file_unique_id}" if file_unique_id else None,
+        f"{kind}:sha:{sha256}",
+        f"{kind}:pix:{image[1]}" if image else None
+    ]
+
+class MediaResultCache:
+    """
+    Extracted text of media already processed, keyed by Telegram's
+    file_unique_id, by SHA-256 of the content and, for images, by the hash of
+    their decoded pixels (see image_hashes).
+
+    Each entry holds the extracted text and its entities. Entries live in an
+    in-process LRU and, when a collection is given, in Mongo (one document per
+    content hash listing every file_unique_id seen for it).
+    """
+
+    def __init__(self, collection=None, maxsize=5000, ttl=7 * 24 * 3600):
+        self.collection = collection
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.remote_calls_saved = 0
+
+    def ensure_indexes(self):
+        if self.collection is not None:
+            self.collection.create_index("file_unique_ids")
+            self.collection.create_index("phash", sparse=True)
+
+    async def _find_one(self, query):
+        if self.collection is None:
+            return None
+        try:
+            return await asyncio.to_thread(self.collection.find_one, query, {"text": 1, "entities": 1})
+        except Exception as e:
+            logger.error(f"Media cache lookup failed: {e}")
+            return None
+
+    def _remember(self, keys, entry):
+        for key in keys:
+            if key:
+                self.memory.set(key, entry)
+
+    async def lookup_unique_id(self, kind, file_unique_id):
+        """Cached entry for a Telegram file already seen, without downloading it."""
+        if not file_unique_id:
+            return None
+        key = f"{kind}:uid:{file_unique_id}"
+        entry = self.memory.get(key)
+        if entry is None:
+            doc = await self._find_one({"kind": kind, "file_unique_ids": file_unique_id})
+            if doc:
+                entry = _entry(doc)
+                self._remember([key], entry)
+        if entry is not None:
+            self.remote_calls_saved += 1
+        return entry
+
+    async def lookup_content(self, kind, file_unique_id, data):
+        """
+        Cached entry for identical content or, for images, identical pixels.
+        Returns (sha256, image, entry); pass sha256 and image on to store().
+        """
+        # Hashing a large file, and decoding an image, would stall the event loop
+        sha256 = await asyncio.to_thread(content_hash, data)
+        image = await asyncio.to_thread(image_hashes, data) if kind == "ocr" else None
+        entry = self.memory.get(f"{kind}:sha:{sha256}")
+        if entry is None and image:
+            entry = self.memory.get(f"{kind}:pix:{image[1]}")
+        if entry is None:
+            doc = await self._find_one({"kind": kind, "_id": sha256})
+            if doc is None and image:
+                # The phash index narrows the search; only equal pixels count as a match
+                doc = await self._find_one({"kind": kind, "phash": image[0], "pixels": image[1]})
+            if doc:
+                entry = _entry(doc)
+        if entry is None:
+            return sha256, image, None
+
+        self.remote_calls_saved += 1
+        self._remember(_keys(kind, file_unique_id, sha256, image), entry)
+        await self._add_unique_id(entry["sha256"], file_unique_id)
+        return sha256, image, entry
+
+    async def store(self, kind, file_unique_id, sha256, image, text, entities):
+        entry = {"text": text, "entities": entities, "sha256": sha256}
+        self._remember(_keys(kind, file_unique_id, sha256, image), entry)
+        if self.collection is None:
+            return
+        fields = {"kind": kind, "text": text, "entities": entities, "created_at": datetime.utcnow()}
+        if image:
+            fields["phash"], fields["pixels"] = image
+        update = {"$setOnInsert": fields}
+        if file_unique_id:
+            update["$addToSet"] = {"file_unique_ids": file_unique_id}
+        try:
+            await asyncio.to_thread(self.collection.update_one, {"_id": sha256}, update, upsert=True)
+        except Exception as e:
+            logger.error(f"Media cache write failed: {e}")
+
+    async def _add_unique_id(self, sha256, file_unique_id):
+        if self.collection is None or not file_unique_id:
+            return
+        try:
+            await asyncio.to_thread(
+                self.collection.update_one, {"_id": sha256}, {"$addToSet": {"file_unique_ids": file_unique_id}}
+            )
+        except Exception as e:
+            logger.error(f"Media cache update failed: {e}")
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats["remote_calls_saved"] = self.remote_calls_saved
+        return stats
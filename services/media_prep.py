@@ -0,0 +1,57 @@
+import io
+import os
+from utils.logger import logger
+
+try:
+    from PIL import Image
+except ImportError:  # Without Pillow images are uploaded as downloaded
+    Image = None
+
+OCR_MIN_SIDE = int(os.getenv("OCR_MIN_SIDE", 1280))  # Smallest longest-side that keeps screenshot text legible
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", 1600))
+OCR_JPEG_QUALITY = int(os.getenv("OCR_JPEG_QUALITY", 80))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+def choose_photo_size(sizes, min_side=OCR_MIN_SIDE):
+    """
+    Smallest Telegram PhotoSize whose longest side is at least min_side, or the
+    largest one when none is big enough.
+    """
+    ordered = sorted(sizes, key=lambda s: s.width * s.height)
+    for size in ordered:
+        if max(size.width, size.height) >= min_side:
+            return size
+    return ordered[-1]
+
+def prepare_image_for_ocr(data, max_side=OCR_MAX_SIDE, quality=OCR_JPEG_QUALITY):
+    """
+    Greyscale, downscale to max_side and re-encode as JPEG; returns bytes.
+    The original is kept when it is already smaller than the re-encoded image.
+    """
+    if Image is None:
+        return bytes(data)
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img = img.convert("L")
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
+            out = io.BytesIO()
+            img.save(out, format="JPEG", quality=quality, optimize=True)
+    except Exception as e:
+        logger.warning(f"Could not re-encode image for OCR, uploading original: {e}")
+        return bytes(data)
+    if out.tell() >= len(data):
+        return bytes(data)
+    return out.getvalue()
+
+async def iter_chunks(data, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Async chunks of a bytes-like object for streaming uploads, copying one chunk at a time."""
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield bytes(view[start:start + chunk_size])
+
+async def download_telegram_file(bot, file_id):
+    """Download a Telegram file into a single buffer and return a memoryview of it."""
+    file = await bot.get_file(file_id)
+    buffer = io.BytesIO()
+    await file.download_to_memory(buffer)
+    return buffer.getbuffer()
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime
+import httpx
+from services.media_prep import iter_chunks
+from utils.logger import logger
+
+ASSEMBLYAI_BASE_URL = os.getenv("ASSEMBLYAI_BASE_URL", "https://api.assemblyai.com/v2")
+OCR_SPACE_URL = os.getenv("OCR_SPACE_URL", "https://api.ocr.space/parse/image")
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", 4))
+MEDIA_QUEUE_SIZE = int(os.getenv("MEDIA_QUEUE_SIZE", 100))
+TRANSCRIPTION_DEADLINE_SECONDS = 300
+POLL_INITIAL_DELAY = 1.0
+POLL_MAX_DELAY = 15.0
+
+class MediaJobFailed(Exception):
+    pass
+
+async def transcribe_audio(http, audio_bytes, api_key, base_url=ASSEMBLYAI_BASE_URL,
+                           deadline=TRANSCRIPTION_DEADLINE_SECONDS):
+    """
+    Upload audio to AssemblyAI and wait for its transcript.
+
+    Polls with exponential backoff (POLL_INITIAL_DELAY doubling up to
+    POLL_MAX_DELAY) and gives up once deadline seconds have passed in total.
+    """
+    loop = asyncio.get_running_loop()
+    give_up_at = loop.time() + deadline
+    headers = {'authorization': api_key}
+
+    upload_response = await http.post(f"{base_url}/upload", headers=headers, content=iter_chunks(audio_bytes))
+    upload_response.raise_for_status()
+    upload_url = upload_response.json()['upload_url']
+
+    transcript_response = await http.post(f"{base_url}/transcript", headers=headers, json={'audio_url': upload_url})
+    transcript_response.raise_for_status()
+    transcript_id = transcript_response.json()['id']
+
+    delay = POLL_INITIAL_DELAY
+    while True:
+        polling = await http.get(f"{base_url}/transcript/{transcript_id}", headers=headers)
+        polling.raise_for_status()
+        result = polling.json()
+        if result['status'] == "completed":
+            return result.get('text') or ""
+        if result['status'] == "error" or result['status'] == "failed":
+            raise MediaJobFailed(f"Transcription {transcript_id} failed: {result.get('error', 'unknown error')}")
+        remaining = give_up_at - loop.time()
+        if remaining <= 0:
+            raise MediaJobFailed(f"Transcription {transcript_id} not ready after {deadline}s")
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, POLL_MAX_DELAY)
+
+async def ocr_image(http, image_bytes, api_key, url=OCR_SPACE_URL):
+    payload = {
+        'isOverlayRequired': 'false',
+        'OCREngine': '2',
+    }
+    files = {
+        'filename': ('image.jpg', bytes(image_bytes), 'image/jpeg')
+    }
+    response = await http.post(url, files=files, data=payload, headers={'apikey': api_key})
+    response.raise_for_status()
+    result = response.json()
+    return result['ParsedResults'][0]['ParsedText'] if result.get('ParsedResults') else ""
+
+class MediaPipeline:
+    """
+    Worker pool for OCR and transcription jobs on a shared async HTTP client.
+
+    submit() queues a job (waiting when the bounded queue is full) and returns
+    its extracted text once a worker has finished it. Every job is recorded in
+    jobs_collection, when given, with its status, timings and result.
+    """
+
+    def __init__(self, workers=MEDIA_WORKERS, queue_size=MEDIA_QUEUE_SIZE, jobs_collection=None,
+                 timeout=httpx.Timeout(30.0, connect=10.0)):
+        self.workers = workers
+        self.jobs_collection = jobs_collection
+        self.timeout = timeout
+        self.http = None
+        self.bytes_uploaded = 0
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._tasks = []
+
+    async def start(self):
+        self.http = httpx.AsyncClient(timeout=self.timeout)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Media pipeline started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
+
+    async def submit(self, kind, data, api_key, meta=None):
+        """Run an "ocr" or "transcription" job and return its text; raises MediaJobFailed."""
+        if kind not in ("ocr", "transcription"):
+            raise ValueError(f"Unknown media job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        await self._record(job_id, {
+            "kind": kind,
+            "status": "queued",
+            "size": len(data),
+            "meta": meta or {},
+            "created_at": datetime.utcnow()
+        }, insert=True)
+        await self._queue.put((job_id, kind, data, api_key, future))
+        return await future
+
+    async def _worker(self, number):
+        while True:
+            job_id, kind, data, api_key, future = await self._queue.get()
+            try:
+                if future.done():  # Submitter gave up
+                    continue
+                await self._record(job_id, {"status": "running", "started_at": datetime.utcnow()})
+                self.bytes_uploaded += len(data)
+                if kind == "ocr":
+                    text = await ocr_image(self.http, data, api_key)
+                else:
+                    text = await transcribe_audio(self.http, data, api_key)
+                await self._record(job_id, {"status": "done", "text": text, "finished_at": datetime.utcnow()})
+                if not future.done():
+                    future.set_result(text)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"Media job {job_id} ({kind}) failed: {e}")
+                await self._record(job_id, {"status": "failed", "error": str(e), "finished_at": datetime.utcnow()})
+                if not future.done():
+                    future.set_exception(e if isinstance(e, MediaJobFailed) else MediaJobFailed(str(e)))
+            finally:
+                self._queue.task_done()
+
+    async def _record(self, job_id, fields, insert=False):
+        if self.jobs_collection is None:
+            return
+        try:
+            if insert:
+                await asyncio.to_thread(self.jobs_collection.insert_one, {"_id": job_id, **fields})
+            else:
+                await asyncio.to_thread(self.jobs_collection.update_one, {"_id": job_id}, {"$set": fields})
+        except Exception as e:
+            logger.error(f"Media job record {job_id} not saved: {e}")
+
+    def stats(self):
+        return {"workers": len(self._tasks), "queued": self._queue.qsize(), "bytes_uploaded": self.bytes_uploaded}
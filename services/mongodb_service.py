@@ -1,22 +1,133 @@
-
-from pymongo import MongoClient
+import threading
+from pymongo import MongoClient, ReadPreference, monitoring
 from config1.config import CONFIG
 from utils.logger import logger
 
+DATABASES = {
+    "scam_database": ("mongo_uri", "Phantom-Protocol"),
+    "email_transactions": ("email_transactions_mongo_uri", "email_transactions"),
+}
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
 client = None
 db = None
 email_transactions_client = None
 email_transactions_db = None
 
+_clients = {}
+_pool_listeners = {}
+_collections = {}
+_known_collections = {}
+_lock = threading.Lock()
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters of one client, kept from pymongo's pool events."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.check_out_failed = 0
+        self.in_use = 0
+        self.pools_cleared = 0
+
+    def _add(self, **deltas):
+        with self.lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._add(pools_cleared=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add(created=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add(closed=1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._add(check_out_failed=1)
+
+    def connection_checked_out(self, event):
+        self._add(checked_out=1, in_use=1)
+
+    def connection_checked_in(self, event):
+        self._add(in_use=-1)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "open": self.created - self.closed,
+                "in_use": self.in_use,
+                "created": self.created,
+                "closed": self.closed,
+                "checked_out": self.checked_out,
+                "check_out_failed": self.check_out_failed,
+                "pools_cleared": self.pools_cleared,
+            }
+
+def pool_options():
+    pool = CONFIG["mongo_pool"]
+    return {
+        "maxPoolSize": pool["max_pool_size"],
+        "minPoolSize": pool["min_pool_size"],
+        "maxIdleTimeMS": pool["max_idle_time_ms"],
+        "waitQueueTimeoutMS": pool["wait_queue_timeout_ms"],
+    }
+
+# Dashboard and monitor clients fail fast; the bot keeps pymongo's defaults
+SERVICE_TIMEOUTS = {"connectTimeoutMS": 5000, "socketTimeoutMS": 5000}
+
+def get_client(uri, **options):
+    """
+    The MongoClient shared by everything in this process that connects to uri.
+
+    options (on top of pool_options()) only apply when the client is created;
+    later callers get the existing client whatever they pass.
+    """
+    with _lock:
+        shared = _clients.get(uri)
+        if shared is None:
+            listener = PoolStats()
+            shared = MongoClient(uri, event_listeners=[listener], **{**pool_options(), **options})
+            _clients[uri] = shared
+            _pool_listeners[uri] = listener
+        return shared
+
+def resolve_read_preference(name):
+    """ReadPreference for a mode name such as "secondaryPreferred"; None for the client default."""
+    if not name:
+        return None
+    if name not in READ_PREFERENCES:
+        raise ValueError(f"Unknown read preference: {name}")
+    return READ_PREFERENCES[name]
+
 def connect_db():
     global client, db
     try:
-        client = MongoClient(
-            CONFIG["mongo_uri"],
-            maxPoolSize=50,  # Connection pooling
-            connectTimeoutMS=5000,
-            socketTimeoutMS=5000
-        )
+        client = get_client(CONFIG["mongo_uri"], **SERVICE_TIMEOUTS)
         db = client.get_database("Phantom-Protocol")
         client.admin.command('ping')  # Test connection
         logger.info("Connected to Phantom-Protocol MongoDB")
@@ -28,12 +139,7 @@ def connect_db():
 def connect_email_transactions_db():
     global email_transactions_client, email_transactions_db
     try:
-        email_transactions_client = MongoClient(
-            CONFIG["email_transactions_mongo_uri"],
-            maxPoolSize=50,
-            connectTimeoutMS=5000,
-            socketTimeoutMS=5000
-        )
+        email_transactions_client = get_client(CONFIG["email_transactions_mongo_uri"], **SERVICE_TIMEOUTS)
         email_transactions_db = email_transactions_client.get_database("email_transactions")
         email_transactions_client.admin.command('ping')  # Test connection
         logger.info("Connected to email_transactions MongoDB")
@@ -42,28 +148,48 @@ def connect_email_transactions_db():
         logger.error(f"email_transactions MongoDB connection error: {e}")
         raise
 
-def get_collection(collection_name, db_type="scam_database"):
+def _database(db_type):
+    if db_type == "scam_database":
+        return db if db is not None else connect_db()
+    return email_transactions_db if email_transactions_db is not None else connect_email_transactions_db()
+
+def get_collection(collection_name, db_type="scam_database", read_preference=None):
+    """
+    Collection handle, created and checked for existence once per process.
+
+    read_preference is a mode name (see READ_PREFERENCES), e.g. to send
+    dashboard reads to secondaries.
+    """
     if not collection_name:
         logger.error("Collection name cannot be empty")
         raise ValueError("Collection name cannot be empty")
-    if db_type not in ["scam_database", "email_transactions"]:
+    if db_type not in DATABASES:
         logger.error(f"Invalid db_type: {db_type}")
         raise ValueError(f"Invalid db_type: {db_type}")
-    
-    if db_type == "scam_database":
-        global db
-        if db is None:
-            connect_db()
-        if collection_name not in db.list_collection_names():
-            logger.warning(f"Collection {collection_name} not found in Phantom-Protocol")
-        return db[collection_name]
-    elif db_type == "email_transactions":
-        global email_transactions_db
-        if email_transactions_db is None:
-            connect_email_transactions_db()
-        if collection_name not in email_transactions_db.list_collection_names():
-            logger.warning(f"Collection {collection_name} not found in email_transactions")
-        return email_transactions_db[collection_name]
+
+    key = (db_type, collection_name, read_preference)
+    collection = _collections.get(key)
+    if collection is not None:
+        return collection
+
+    database = _database(db_type)
+    if db_type not in _known_collections:
+        _known_collections[db_type] = set(database.list_collection_names())
+    if collection_name not in _known_collections[db_type]:
+        logger.warning(f"Collection {collection_name} not found in {DATABASES[db_type][1]}")
+    collection = database.get_collection(collection_name, read_preference=resolve_read_preference(read_preference))
+    _collections[key] = collection
+    return collection
+
+def pool_stats():
+    """Pool configuration and counters of every shared client, keyed by the databases it serves."""
+    names = {}
+    for uri_key, name in DATABASES.values():
+        names.setdefault(CONFIG[uri_key], []).append(name)
+    return {
+        "config": pool_options(),
+        "pools": {", ".join(names.get(uri, ["other"])): listener.stats() for uri, listener in _pool_listeners.items()},
+    }
 
 def list_collections(db_type="scam_database"):
     """List available collections in the specified database."""
@@ -91,13 +217,19 @@ def list_collections(db_type="scam_database"):
 
 def close_connections():
     """Close MongoDB connections."""
-    global client, email_transactions_client
+    global client, db, email_transactions_client, email_transactions_db
     try:
+        with _lock:
+            for shared in _clients.values():
+                shared.close()
+            _clients.clear()
+            _pool_listeners.clear()
+            _collections.clear()
+            _known_collections.clear()
         if client:
-            client.close()
             logger.info("Closed Phantom-Protocol MongoDB connection")
         if email_transactions_client:
-            email_transactions_client.close()
             logger.info("Closed email_transactions MongoDB connection")
+        client = db = email_transactions_client = email_transactions_db = None
     except Exception as e:
         logger.error(f"Error closing MongoDB connections: {e}")
@@ -1,25 +1,232 @@
-
-from pymongo import MongoClient
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pymongo.errors import OperationFailure, PyMongoError
 from services.mongodb_service import get_collection
-from services.email_service import send_email_to_nodal_officers, check_nodal_responses
+from services.email_service import check_nodal_responses, close_nodal_inbox, close_smtp_pool, smtp_stats
+from services.email_outbox import OUTBOX_COLLECTION, LagTracker, OutboxDispatcher, enqueue_report
 from utils.logger import logger
-import time
+
+MONITOR_WORKERS = int(os.getenv("MONITOR_WORKERS", 4))
+MONITOR_QUEUE_SIZE = int(os.getenv("MONITOR_QUEUE_SIZE", 100))  # Per worker
+IMAP_POLL_SECONDS = int(os.getenv("IMAP_POLL_SECONDS", 300))
+MONITOR_STATE_COLLECTION = "monitor_state"
+STREAM_ID = "contacts_inserts"
+CHECKPOINT_SECONDS = 1.0
+METRICS_LOG_SECONDS = 60
+RECONNECT_MAX_DELAY = 60
+HISTORY_LOST_CODES = (136, 286)  # CappedPositionLost, ChangeStreamHistoryLost
+
+class ResumeCheckpoint:
+    """
+    Resume token of the newest change event whose predecessors have all been
+    handled, saved in Mongo so a restart neither skips nor loses reports.
+
+    The stream reader calls track() for each event in stream order; workers
+    call done() in whatever order they finish.
+    """
+
+    def __init__(self, collection, stream_id=STREAM_ID):
+        self.collection = collection
+        self.stream_id = stream_id
+        self.lock = threading.Lock()
+        self.token = None
+        self._next_seq = 0
+        self._handled = -1
+        self._pending = {}
+        self._finished = set()
+        self._dirty = False
+        self._saved_at = 0.0
+
+    def load(self):
+        doc = self.collection.find_one({"_id": self.stream_id})
+        self.token = doc["token"] if doc else None
+        return self.token
+
+    def reset(self):
+        with self.lock:
+            self.token = None
+            self._dirty = True
+
+    def track(self, token):
+        with self.lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._pending[seq] = token
+            return seq
+
+    def done(self, seq):
+        with self.lock:
+            self._finished.add(seq)
+            while self._handled + 1 in self._finished:
+                self._handled += 1
+                self._finished.remove(self._handled)
+                self.token = self._pending.pop(self._handled)
+                self._dirty = True
+
+    def save(self, force=False):
+        with self.lock:
+            if not self._dirty or (not force and time.monotonic() - self._saved_at < CHECKPOINT_SECONDS):
+                return
+            token, self._dirty = self.token, False
+            self._saved_at = time.monotonic()
+        try:
+            self.collection.update_one(
+                {"_id": self.stream_id},
+                {"$set": {"token": token, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except PyMongoError as e:
+            self._dirty = True
+            logger.error(f"Could not save change stream checkpoint: {e}")
+
+class ReportMonitor:
+    """
+    Watches contacts for new scam reports and hands each one to handler on a
+    bounded pool of worker threads; by default handler queues the report's
+    officer emails in the outbox, which dispatcher (if given) sends.
+
+    Reports are routed to a worker by _id, so events for one report are always
+    handled in order; a full worker queue pauses the stream reader. The
+    stream resumes from the saved checkpoint after errors and restarts, and
+    the nodal inbox is checked on its own schedule in a separate thread.
+    """
+
+    def __init__(self, handler=enqueue_report, dispatcher=None, workers=MONITOR_WORKERS, queue_size=MONITOR_QUEUE_SIZE,
+                 imap_poll_seconds=IMAP_POLL_SECONDS):
+        self.handler = handler
+        self.dispatcher = dispatcher
+        self.imap_poll_seconds = imap_poll_seconds
+        self.collection = get_collection("contacts", db_type="scam_database")
+        self.checkpoint = ResumeCheckpoint(get_collection(MONITOR_STATE_COLLECTION, db_type="scam_database"))
+        self.handled_lag = LagTracker()  # Report insert to handler done; delivery lag is the dispatcher's
+        self.failures = 0
+        self._stop = threading.Event()
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(workers)]
+        self._threads = []
+
+    def run(self):
+        """Run until stop() is called; the stream is read on the calling thread."""
+        self.checkpoint.load()
+        if self.dispatcher is not None:
+            self.dispatcher.start()
+        self._threads = [
+            threading.Thread(target=self._worker, args=(q,), name=f"monitor-worker-{i}", daemon=True)
+            for i, q in enumerate(self._queues)
+        ]
+        self._threads.append(threading.Thread(target=self._poll_inbox, name="monitor-imap", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Monitoring contacts with {len(self._queues)} workers, "
+                    f"resuming {'from checkpoint' if self.checkpoint.token else 'from now'}")
+        try:
+            self._read_stream()
+        finally:
+            self._shutdown()
+
+    def stop(self):
+        self._stop.set()
+
+    def _read_stream(self):
+        pipeline = [{"$match": {"operationType": "insert"}}]
+        delay = 1
+        logged_at = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                with self.collection.watch(pipeline, resume_after=self.checkpoint.token, max_await_time_ms=1000) as stream:
+                    delay = 1
+                    while not self._stop.is_set() and stream.alive:
+                        change = stream.try_next()
+                        if change is not None:
+                            self._dispatch(change)
+                        self.checkpoint.save()
+                        if time.monotonic() - logged_at >= METRICS_LOG_SECONDS:
+                            logger.info(f"Monitor stats: {self.stats()}")
+                            logged_at = time.monotonic()
+            except OperationFailure as e:
+                if e.code in HISTORY_LOST_CODES:
+                    logger.error(f"Change stream checkpoint is no longer in the oplog; reports inserted "
+                                 f"while the monitor was down must be resent by hand: {e}")
+                    self.checkpoint.reset()
+                    continue
+                logger.error(f"Change stream error, reconnecting in {delay}s: {e}")
+            except PyMongoError as e:
+                logger.error(f"Change stream error, reconnecting in {delay}s: {e}")
+            self._stop.wait(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def _dispatch(self, change):
+        document = change["fullDocument"]
+        logger.info(f"New scam report detected: {document['_id']}")
+        seq = self.checkpoint.track(change["_id"])
+        inserted_at = change["clusterTime"].time if change.get("clusterTime") else time.time()
+        worker_queue = self._queues[hash(str(document["_id"])) % len(self._queues)]
+        while not self._stop.is_set():
+            try:
+                worker_queue.put((seq, document, inserted_at), timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def _worker(self, work):
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            seq, document, inserted_at = item
+            if self._handle(document):
+                self.handled_lag.record(time.time() - inserted_at)
+                self.checkpoint.done(seq)
+
+    def _handle(self, document):
+        """
+        Run handler until it succeeds, backing off between attempts; the worker's
+        queue fills meanwhile and holds up the stream. Returns False if the monitor
+        stops first, leaving the report unacknowledged so a restart replays it.
+        """
+        delay = 1
+        while True:
+            try:
+                self.handler(document)
+                return True
+            except Exception as e:
+                self.failures += 1
+                if self._stop.is_set():
+                    logger.error(f"Scam report {document['_id']} not handled before shutdown, "
+                                 f"it will be replayed on restart: {e}")
+                    return False
+                logger.error(f"Handling scam report {document['_id']} failed, retrying in {delay}s: {e}")
+            self._stop.wait(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def _poll_inbox(self):
+        while not self._stop.is_set():
+            check_nodal_responses()
+            self._stop.wait(self.imap_poll_seconds)
+
+    def _shutdown(self):
+        self._stop.set()
+        for work in self._queues:
+            work.put(None)  # Workers finish what is queued first
+        for thread in self._threads:
+            thread.join()
+        self.checkpoint.save(force=True)
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+        close_nodal_inbox()
+        close_smtp_pool()
+        logger.info(f"Monitor stopped: {self.stats()}")
+
+    def stats(self):
+        return {"report_to_handled_seconds": self.handled_lag.stats(), "failures": self.failures,
+                "queued": [q.qsize() for q in self._queues],
+                "outbox": self.dispatcher.stats() if self.dispatcher else {}, "smtp": smtp_stats()}
 
 def start_monitoring():
-    collection = get_collection("contacts", db_type="scam_database")
-    
-    pipeline = [{"$match": {"operationType": "insert"}}]
+    monitor = ReportMonitor(dispatcher=OutboxDispatcher(get_collection(OUTBOX_COLLECTION, db_type="email_transactions")))
     try:
-        with collection.watch(pipeline) as stream:
-            for change in stream:
-                if change["operationType"] == "insert":
-                    new_document = change["fullDocument"]
-                    logger.info(f"New scam report detected: {new_document['_id']}")
-                    send_email_to_nodal_officers(new_document)
-                
-                # Check for nodal responses periodically
-                check_nodal_responses()
-    except Exception as e:
-        logger.error(f"Change stream error: {e}")
-        time.sleep(5)
-        start_monitoring()  # Reconnect on error
+        monitor.run()
+    except KeyboardInterrupt:
+        monitor.stop()
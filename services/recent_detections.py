@@ -0,0 +1,89 @@
+import time
+
+RECENT_DETECTIONS_CAPACITY = 1000
+IDENTIFIER_FIELDS = ("upi_ids", "phones", "account_numbers", "socials")
+MAX_IDENTIFIERS = 16  # Per detection; OCR of a long statement can list many more
+MAX_IDENTIFIER_LENGTH = 64
+
+class Detection:
+    """What is kept of a detection: no message text, only who, when and which identifiers."""
+    __slots__ = ("at", "user", "classification", "identifiers")
+
+    def __init__(self, at, user, classification, identifiers):
+        self.at = at
+        self.user = user
+        self.classification = classification
+        self.identifiers = identifiers
+
+def identifiers_of(doc):
+    """Normalized identifiers of a detection document, capped in number and length."""
+    seen = []
+    for field in IDENTIFIER_FIELDS:
+        for value in doc.get(field) or ():
+            value = str(value).strip().lower()[:MAX_IDENTIFIER_LENGTH]
+            if value and value not in seen:
+                seen.append(value)
+                if len(seen) == MAX_IDENTIFIERS:
+                    return tuple(seen)
+    return tuple(seen)
+
+class RecentDetections:
+    """
+    Fixed-capacity ring buffer of the latest detections.
+
+    Adding to a full buffer overwrites the oldest entry. A count per
+    identifier over the entries in the buffer answers seen() in O(1), so
+    memory stays proportional to capacity however long the bot runs.
+    """
+
+    def __init__(self, capacity=RECENT_DETECTIONS_CAPACITY, clock=time.time):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.clock = clock
+        self.total = 0
+        self._slots = [None] * capacity
+        self._next = 0
+        self._counts = {}
+
+    def add(self, doc):
+        """Record a detection document; returns its identifiers already in the buffer."""
+        identifiers = identifiers_of(doc)
+        repeated = [value for value in identifiers if value in self._counts]
+        old = self._slots[self._next]
+        if old is not None:
+            for value in old.identifiers:
+                remaining = self._counts[value] - 1
+                if remaining:
+                    self._counts[value] = remaining
+                else:
+                    del self._counts[value]
+        for value in identifiers:
+            self._counts[value] = self._counts.get(value, 0) + 1
+        user = doc.get("user")
+        self._slots[self._next] = Detection(self.clock(), str(user) if user is not None else None,
+                                            doc.get("classification"), identifiers)
+        self._next = (self._next + 1) % self.capacity
+        self.total += 1
+        return repeated
+
+    def seen(self, identifier):
+        """Whether identifier appears in any detection still in the buffer."""
+        return str(identifier).strip().lower()[:MAX_IDENTIFIER_LENGTH] in self._counts
+
+    def latest(self, n=None):
+        """Up to n detections, newest first."""
+        size = len(self)
+        n = size if n is None else min(n, size)
+        return [self._slots[(self._next - 1 - i) % self.capacity] for i in range(n)]
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def stats(self):
+        return {
+            "size": len(self),
+            "capacity": self.capacity,
+            "total": self.total,
+            "identifiers": len(self._counts),
+        }
@@ -0,0 +1,185 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.platypus import SimpleDocTemplate, LongTable, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet
+from utils.logger import logger
+
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "phantom_protocol_reports"))
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", 2))
+ROWS_PER_TABLE = 500  # Rows per LongTable chunk; keeps ReportLab's split work per chunk small
+MAX_TRACKED_JOBS = 100
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495E')),  # Header background
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),  # Header text
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f9f9f9')),  # Alternating row background
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),  # Thinner grid
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEADING', (0, 0), (-1, -1), 8),  # Reduce row height
+])
+
+_executor = ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix="report")
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+def collection_version(collection, query):
+    """
+    High-water mark for the rows a report covers: the matching document count
+    plus the newest _id. Inserts and deletes both change it; in-place updates
+    do not, since contacts and sent_emails carry no update time. The only such
+    writer is services.datetime_backfill, which rewrites timestamps; clear
+    REPORT_CACHE_DIR after running it so reports are rebuilt.
+    """
+    latest = next(collection.find(query, {"_id": 1}).sort("_id", -1).limit(1), None)
+    # An empty filter would make count_documents scan the collection; the metadata count is enough here
+    count = collection.count_documents(query) if query else collection.estimated_document_count()
+    return f"{count}-{latest['_id'] if latest else 'empty'}"
+
+def version_digest(report_type, version):
+    return hashlib.sha1(f"{report_type}:{version}".encode()).hexdigest()[:16]
+
+def cache_path(report_type, version, observed_ns):
+    """
+    PDF path for report_type at version: "<type>_<observed_ns>_<digest>.pdf",
+    where observed_ns is when the version was read, so files order by version age.
+    """
+    name = f"{report_type}_{observed_ns:020d}_{version_digest(report_type, version)}.pdf"
+    return os.path.join(REPORT_CACHE_DIR, name)
+
+def _cached_reports(report_type):
+    """(observed_ns, digest, path) of every cached PDF of report_type."""
+    reports = []
+    for name in os.listdir(REPORT_CACHE_DIR):
+        parts = name[:-len(".pdf")].split("_") if name.endswith(".pdf") else []
+        if len(parts) == 3 and parts[0] == report_type and parts[1].isdigit():
+            reports.append((int(parts[1]), parts[2], os.path.join(REPORT_CACHE_DIR, name)))
+    return reports
+
+def find_cached(report_type, version):
+    digest = version_digest(report_type, version)
+    return next((path for _, d, path in _cached_reports(report_type) if d == digest), None)
+
+def _add_footer(canvas, doc):
+    canvas.saveState()
+    canvas.setFont('Helvetica', 6)
+    canvas.setFillColor(colors.HexColor('#333333'))
+    canvas.drawCentredString(A4[0]/2, 15, "© 2025 Powered by Team Strategic Boosted Algorithms, contact at +91 9949284184")
+    canvas.restoreState()
+
+def _table_chunks(rows, headers):
+    """Yield LongTables of at most ROWS_PER_TABLE rows, each with its own header row."""
+    col_widths = [A4[0] / len(headers) * 0.95 for _ in headers]  # Dynamic column width
+    chunk = [headers]
+    emitted = False
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) > ROWS_PER_TABLE:
+            yield LongTable(chunk, colWidths=col_widths, repeatRows=1, style=TABLE_STYLE)
+            chunk = [headers]
+            emitted = True
+    if len(chunk) > 1 or not emitted:
+        yield LongTable(chunk, colWidths=col_widths, repeatRows=1, style=TABLE_STYLE)
+
+def build_pdf(path, title, headers, rows):
+    """Render rows into a PDF at path, writing to a temp file first so readers never see a partial file."""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    doc = SimpleDocTemplate(tmp_path, pagesize=A4, title=title, leftMargin=20, rightMargin=20, topMargin=20, bottomMargin=30)
+
+    # Styles
+    styles = getSampleStyleSheet()
+    title_style = styles['Heading1']
+    title_style.alignment = 1  # Center
+    title_style.fontSize = 12
+    normal_style = styles['Normal']
+    normal_style.fontSize = 5
+
+    elements = [
+        Paragraph(title, title_style),
+        Paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}", normal_style),
+        Spacer(1, 6)
+    ]
+    elements.extend(_table_chunks(rows, headers))
+    try:
+        doc.build(elements, onFirstPage=_add_footer, onLaterPages=_add_footer)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _remove_stale(report_type, observed_ns):
+    """Delete PDFs of versions read before observed_ns; a slow job for an old version never removes a newer one."""
+    for older_ns, _, path in _cached_reports(report_type):
+        if older_ns < observed_ns:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove stale report {path}: {e}")
+
+def _run_job(job_id, title, headers, rows_factory):
+    with _jobs_lock:
+        job = _jobs[job_id]
+        job["status"] = "running"
+    try:
+        build_pdf(job["path"], title, headers, rows_factory())
+        _remove_stale(job["type"], job["observed_ns"])
+        with _jobs_lock:
+            job["status"] = "done"
+            job["finished_at"] = datetime.utcnow().isoformat()
+        logger.info(f"Report {job_id} ({job['type']}) generated at {job['path']}")
+    except Exception as e:
+        with _jobs_lock:
+            job["status"] = "failed"
+            job["error"] = str(e)
+        logger.error(f"Report {job_id} ({job['type']}) failed: {e}")
+
+def submit_report(report_type, version, title, headers, rows_factory):
+    """
+    Return the job for report_type at version, starting one if needed.
+
+    A finished PDF for the same version is served from the cache, and a job
+    already queued or running for it is shared rather than duplicated.
+    rows_factory is called on the worker thread and must return an iterable of rows.
+    """
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    observed_ns = time.time_ns()
+    with _jobs_lock:
+        for job in _jobs.values():
+            if (job["type"], job["version"]) == (report_type, version) and job["status"] in ("queued", "running"):
+                return dict(job)
+        cached = find_cached(report_type, version)
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "type": report_type,
+            "version": version,
+            "observed_ns": observed_ns,
+            "path": cached or cache_path(report_type, version, observed_ns),
+            "status": "done" if cached else "queued",
+            "created_at": datetime.utcnow().isoformat(),
+            "error": None
+        }
+        _jobs[job_id] = job
+        finished = [jid for jid, j in _jobs.items() if j["status"] in ("done", "failed")]
+        for jid in finished[:max(0, len(_jobs) - MAX_TRACKED_JOBS)]:
+            del _jobs[jid]
+        snapshot = dict(job)
+    if snapshot["status"] == "queued":
+        _executor.submit(_run_job, job_id, title, headers, rows_factory)
+    return snapshot
+
+def get_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
@@ -0,0 +1,65 @@
+from utils.logger import logger
+
+RISK_FIELDS = ["upi_ids", "phones", "account_numbers", "socials"]
+
+def collect_identifiers(docs):
+    """Group the distinct identifiers found in docs by field."""
+    identifiers = {field: set() for field in RISK_FIELDS}
+    for doc in docs:
+        for field in RISK_FIELDS:
+            for item in doc.get(field, None) or []:
+                identifiers[field].add(item)
+    return identifiers
+
+def identifier_frequencies(collection, docs):
+    """
+    Count how many documents in the collection contain each identifier of docs.
+
+    All fields are resolved by a single aggregation ($facet per field), so a
+    result set costs one round trip instead of one count_documents per item.
+    Returns {field: {identifier: count}}.
+    """
+    identifiers = collect_identifiers(docs)
+    frequencies = {field: {} for field in RISK_FIELDS}
+    wanted = {field: sorted(values, key=str) for field, values in identifiers.items() if values}
+    if not wanted:
+        return frequencies
+
+    facets = {}
+    for field, values in wanted.items():
+        facets[field] = [
+            {"$match": {field: {"$in": values}}},
+            # Count each document once per identifier, matching count_documents semantics
+            {"$project": {"_id": 0, "value": {"$setIntersection": [
+                {"$cond": [{"$isArray": f"${field}"}, f"${field}", [f"${field}"]]},
+                values
+            ]}}},
+            {"$unwind": "$value"},
+            {"$group": {"_id": "$value", "count": {"$sum": 1}}}
+        ]
+    pipeline = [
+        {"$match": {"$or": [{field: {"$in": values}} for field, values in wanted.items()]}},
+        {"$facet": facets}
+    ]
+
+    result = next(collection.aggregate(pipeline, allowDiskUse=True), {})
+    for field in wanted:
+        for row in result.get(field, []):
+            frequencies[field][row["_id"]] = row["count"]
+    logger.debug(f"Resolved risk frequencies for {sum(len(v) for v in wanted.values())} identifiers in one aggregation")
+    return frequencies
+
+def risk_score(doc, frequencies):
+    """Sum the collection-wide frequency of every identifier in doc."""
+    score = 0
+    for field in RISK_FIELDS:
+        counts = frequencies.get(field, {})
+        for item in doc.get(field, None) or []:
+            score += counts.get(item, 0)
+    return score
+
+def score_documents(collection, docs):
+    """Return (doc, risk_score) pairs for docs using a single frequency lookup."""
+    docs = list(docs)
+    frequencies = identifier_frequencies(collection, docs)
+    return [(doc, risk_score(doc, frequencies)) for doc in docs]
@@ -0,0 +1,172 @@
+import time
+from collections import OrderedDict
+from services.state_backend import VersionConflict
+
+DECOY_IDLE_SECONDS = 3600
+DECOY_MAX_SESSIONS = 10000
+DM_IDLE_SECONDS = 3600
+DM_MAX_SESSIONS = 10000
+
+class Session:
+    """Base of the per-user session objects; FIELDS are what a state backend stores."""
+    __slots__ = ("user_id", "last_active", "version", "ended")
+    FIELDS = ()
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.last_active = 0.0
+        self.version = 0
+        self.ended = False
+
+    def state(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def restore(self, state, version):
+        for field in self.FIELDS:
+            if field in state:
+                setattr(self, field, state[field])
+        self.version = version
+
+class DecoySession(Session):
+    """State of one decoy conversation with a suspected scammer."""
+    __slots__ = ("history", "decoy_state", "tries")
+    FIELDS = __slots__
+
+    def __init__(self, user_id):
+        super().__init__(user_id)
+        self.history = []
+        self.decoy_state = None
+        self.tries = 0
+
+class DmSession(Session):
+    """
+    One private conversation in the human persona: recent messages, a summary
+    of older ones (see services.dm_history) and the number of exchanges so far.
+    """
+    __slots__ = ("history", "summary", "turns")
+    FIELDS = __slots__
+
+    def __init__(self, user_id, history=None):
+        super().__init__(user_id)
+        self.history = history if history is not None else []
+        self.summary = ""
+        self.turns = 0
+
+class SessionStore:
+    """
+    Sessions keyed by user id, expiring idle_timeout seconds after last use.
+
+    Without a backend, sessions are kept in this process in an OrderedDict in
+    order of last use, so the oldest is always first: expiry pops from the
+    front until it reaches a live session, and when more than maxsize are live
+    the least recently used is evicted. Every operation is O(1) amortised,
+    however many sessions are live.
+
+    With a backend (see services.state_backend) sessions are loaded from and
+    saved to it under namespace instead, so several workers can share them and
+    they survive restarts. save() raises VersionConflict when another worker
+    saved the same session since it was loaded.
+    """
+
+    def __init__(self, factory, idle_timeout=3600, maxsize=10000, clock=time.time, backend=None, namespace="sessions"):
+        self.factory = factory
+        self.idle_timeout = idle_timeout
+        self.maxsize = maxsize
+        self.clock = clock
+        self.backend = backend
+        self.namespace = namespace
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+        self.ended = 0
+        self.conflicts = 0
+        self._sessions = OrderedDict()
+
+    def expire(self):
+        cutoff = self.clock() - self.idle_timeout
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_active > cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    async def count(self):
+        """Number of live sessions."""
+        if self.backend is not None:
+            return await self.backend.count(self.namespace)
+        self.expire()
+        return len(self._sessions)
+
+    async def get(self, user_id):
+        """Live session of user_id, or None."""
+        if self.backend is not None:
+            state, version = await self.backend.get(self.namespace, str(user_id))
+            if state is None:
+                return None
+            session = self.factory(user_id)
+            session.restore(state, version)
+            return session
+        self.expire()
+        session = self._sessions.get(user_id)
+        if session is not None:
+            self._touch(session)
+        return session
+
+    async def active(self, user_id):
+        return await self.get(user_id) is not None
+
+    def create(self, user_id):
+        """New session for user_id; it is kept once saved."""
+        session = self.factory(user_id)
+        self.created += 1
+        if self.backend is None:
+            self._sessions[user_id] = session
+            self._touch(session)
+            while len(self._sessions) > self.maxsize:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+        return session
+
+    async def get_or_create(self, user_id):
+        session = await self.get(user_id)
+        return session if session is not None else self.create(user_id)
+
+    async def save(self, session):
+        """Keep session after a change; ended sessions are left ended."""
+        if session.ended:
+            return
+        if self.backend is None:
+            if self._sessions.get(session.user_id) is session:
+                self._touch(session)
+            return
+        try:
+            session.version = await self.backend.put(
+                self.namespace, str(session.user_id), session.state(), session.version, ttl=self.idle_timeout
+            )
+        except VersionConflict:
+            self.conflicts += 1
+            raise
+
+    def _touch(self, session):
+        session.last_active = self.clock()
+        self._sessions.move_to_end(session.user_id)
+
+    async def end(self, session):
+        session.ended = True
+        self.ended += 1
+        if self.backend is not None:
+            await self.backend.delete(self.namespace, str(session.user_id))
+        elif self._sessions.get(session.user_id) is session:
+            del self._sessions[session.user_id]
+
+    def stats(self):
+        return {
+            "live": len(self._sessions) if self.backend is None else None,
+            "maxsize": self.maxsize,
+            "created": self.created,
+            "ended": self.ended,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "conflicts": self.conflicts,
+        }
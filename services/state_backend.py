@@ -0,0 +1,102 @@
+"""
+Shared conversation state for bot workers.
+
+Values are dicts stored under (namespace, key) with a version number. put()
+only succeeds when the caller passes the version it read (0 for a key that
+does not exist yet) and raises VersionConflict otherwise, so two workers
+handling messages from the same user cannot silently overwrite each other.
+"""
+import asyncio
+import copy
+import time
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+
+class VersionConflict(Exception):
+    pass
+
+class MemoryStateBackend:
+    """State held in this process, copied in and out like a remote store; for a single worker and for tests."""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._data = {}
+
+    async def get(self, namespace, key):
+        """Return (value, version), or (None, 0) when the key does not exist."""
+        entry = self._data.get((namespace, key))
+        if entry is None:
+            return None, 0
+        value, version, expires_at = entry
+        if expires_at is not None and expires_at <= self.clock():
+            del self._data[(namespace, key)]
+            return None, 0
+        return copy.deepcopy(value), version
+
+    async def put(self, namespace, key, value, version, ttl=None):
+        """Store value if key is still at version; returns the new version."""
+        _, current = await self.get(namespace, key)
+        if current != version:
+            raise VersionConflict(f"{namespace}:{key} is at version {current}, not {version}")
+        expires_at = self.clock() + ttl if ttl else None
+        self._data[(namespace, key)] = (copy.deepcopy(value), version + 1, expires_at)
+        return version + 1
+
+    async def delete(self, namespace, key):
+        self._data.pop((namespace, key), None)
+
+    async def count(self, namespace):
+        now = self.clock()
+        return sum(
+            1 for (ns, _), (_, _, expires_at) in self._data.items()
+            if ns == namespace and (expires_at is None or expires_at > now)
+        )
+
+class MongoStateBackend:
+    """
+    State in a Mongo collection shared by every worker, one document per key.
+
+    Expired documents are removed by a TTL index on expires_at and ignored
+    until then.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def ensure_indexes(self):
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get(self, namespace, key):
+        doc = await asyncio.to_thread(self.collection.find_one, {"_id": f"{namespace}:{key}"})
+        if doc is None or (doc.get("expires_at") and doc["expires_at"] <= datetime.utcnow()):
+            return None, 0
+        return doc["value"], doc["version"]
+
+    async def put(self, namespace, key, value, version, ttl=None):
+        now = datetime.utcnow()
+        fields = {
+            "namespace": namespace,
+            "value": value,
+            "version": version + 1,
+            "expires_at": now + timedelta(seconds=ttl) if ttl else None,
+            "updated_at": now
+        }
+        if version == 0:
+            # Only an expired document may be replaced; a live one makes the upsert collide on _id
+            query = {"_id": f"{namespace}:{key}", "expires_at": {"$lte": now}}
+        else:
+            query = {"_id": f"{namespace}:{key}", "version": version}
+        try:
+            result = await asyncio.to_thread(self.collection.update_one, query, {"$set": fields}, upsert=version == 0)
+        except DuplicateKeyError:
+            raise VersionConflict(f"{namespace}:{key} already exists")
+        if version and result.matched_count == 0:
+            raise VersionConflict(f"{namespace}:{key} changed since version {version}")
+        return version + 1
+
+    async def delete(self, namespace, key):
+        await asyncio.to_thread(self.collection.delete_one, {"_id": f"{namespace}:{key}"})
+
+    async def count(self, namespace):
+        query = {"namespace": namespace, "$or": [{"expires_at": None}, {"expires_at": {"$gt": datetime.utcnow()}}]}
+        return await asyncio.to_thread(self.collection.count_documents, query)
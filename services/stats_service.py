@@ -0,0 +1,71 @@
+"""
+Detection counters kept in one document, so /stats costs one lookup.
+
+The detection writer increments the counters for every batch it inserts.
+Counters for an existing collection, or after drift, are rebuilt with one
+aggregation:
+
+    python -m services.stats_service rebuild
+"""
+import argparse
+from collections import Counter
+from datetime import datetime
+from utils.logger import logger
+
+COUNTERS_ID = "contacts"
+
+def count_classifications(docs):
+    return Counter(doc.get("classification") or "unknown" for doc in docs)
+
+def increment_counters(counters, counts):
+    """Add counts (classification -> number of new documents) to the counters document."""
+    if not counts:
+        return
+    inc = {f"by_classification.{label}": n for label, n in counts.items()}
+    inc["total"] = sum(counts.values())
+    counters.update_one(
+        {"_id": COUNTERS_ID},
+        {"$inc": inc, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+def rebuild_counters(collection, counters):
+    """Recount collection by classification and replace the counters document."""
+    by_classification = {
+        (row["_id"] or "unknown"): row["count"]
+        for row in collection.aggregate([{"$group": {"_id": "$classification", "count": {"$sum": 1}}}])
+    }
+    doc = {
+        "_id": COUNTERS_ID,
+        "total": sum(by_classification.values()),
+        "by_classification": by_classification,
+        "updated_at": datetime.utcnow()
+    }
+    counters.replace_one({"_id": COUNTERS_ID}, doc, upsert=True)
+    logger.info(f"Rebuilt detection counters: {by_classification}")
+    return doc
+
+def ensure_counters(collection, counters):
+    """Build the counters document if it does not exist yet."""
+    if counters.find_one({"_id": COUNTERS_ID}, {"_id": 1}) is None:
+        rebuild_counters(collection, counters)
+
+def read_counters(counters):
+    doc = counters.find_one({"_id": COUNTERS_ID}) or {}
+    return {"total": doc.get("total", 0), "by_classification": doc.get("by_classification", {})}
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the detection counters document")
+    parser.add_argument("command", choices=["rebuild", "show"])
+    parser.add_argument("--collection", default="contacts")
+    parser.add_argument("--counters", default="stats")
+    args = parser.parse_args()
+
+    from services.mongodb_service import get_collection
+    counters = get_collection(args.counters)
+    if args.command == "rebuild":
+        rebuild_counters(get_collection(args.collection), counters)
+    print(read_counters(counters))
+
+if __name__ == "__main__":
+    main()
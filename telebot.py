@@ -1,12 +1,11 @@
+import asyncio
+import json
 import logging
-import re
 import time
 import sys
 import ssl
-import requests
 from datetime import datetime
-from collections import defaultdict
-from openai import OpenAI
+from openai import AsyncOpenAI
 from telegram import Update
 from telegram.ext import (
     ApplicationBuilder,
@@ -16,9 +15,25 @@ from telegram.ext import (
     ContextTypes,
     filters,
 )
-from pymongo import MongoClient
+from services.mongodb_service import get_client
 
 import io
+from utils.ttl_cache import TTLCache
+from utils.entity_extractor import ENTITY_KINDS, extract_entities
+from services.classification_cache import ClassificationCache
+from services.classification_batcher import ClassificationBatcher
+from services.media_service import MediaPipeline
+from services.media_cache import MediaResultCache
+from services.detection_writer import DetectionWriter
+from services.dm_history import build_messages, compact_history, prompt_tokens
+from services.stats_service import ensure_counters, read_counters
+from services.recent_detections import RecentDetections
+from services.state_backend import MemoryStateBackend, MongoStateBackend, VersionConflict
+from services.session_store import (
+    DECOY_IDLE_SECONDS, DECOY_MAX_SESSIONS, DM_IDLE_SECONDS, DM_MAX_SESSIONS, DecoySession, DmSession, SessionStore
+)
+from services.media_prep import choose_photo_size, download_telegram_file, prepare_image_for_ocr
+from services.local_classifier import DEFAULT_THRESHOLD, load_model
 
 # ====== CONFIG ======
 OPENROUTER_KEY = "API_KEY"
@@ -27,23 +42,54 @@ MONGO_URI = "Phantom-protocol URI"
 MONGO_DB = "Phantom-Protocol"
 MONGO_COLLECTION = "contacts"
 FEEDBACK_COLLECTION = "feedback"
+CLASSIFICATION_CACHE_COLLECTION = "classification_cache"
+CLASSIFICATION_CACHE_SIZE = 50000
+CLASSIFICATION_CACHE_TTL_SECONDS = 6 * 3600
+MEDIA_JOBS_COLLECTION = "media_jobs"
+MEDIA_CACHE_COLLECTION = "media_cache"
+STATS_COLLECTION = "stats"  # Counters document kept up to date by the detection writer
+STATS_CACHE_SECONDS = 5
+STATE_COLLECTION = "bot_state"
+SHARED_STATE = True  # Keep conversations in Mongo so bot workers can share them and survive restarts
+REPORTED_NAMESPACE = "reported"
+RECENT_DETECTIONS_SIZE = 1000  # Detections kept in memory for repeat-identifier lookups
+VERDICT_LOG_COLLECTION = "classified_messages"  # LLM verdicts, used to retrain the local classifier
+LOCAL_CLASSIFIER_THRESHOLD = DEFAULT_THRESHOLD
 ASSEMBLYAI_API_KEY = "ASSEMBLY"
 OCR_SPACE_API_KEY = "OCR_KEY"
+LLM_MODEL = "google/gemma-3n-e4b-it:free"
+LLM_MAX_CONCURRENCY = 8  # Simultaneous OpenRouter requests
+LLM_TIMEOUT_SECONDS = 20  # Per call, including time spent waiting for a slot
+CONCURRENT_UPDATES = 64  # Updates python-telegram-bot may process at once
+LLM_BATCH_WINDOW_MS = 100  # How long a group message waits for others to share its LLM request
+LLM_BATCH_MAX_SIZE = 20
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO,
 )
 logger = logging.getLogger(__name__)
 
-client = OpenAI(
+client = AsyncOpenAI(
     base_url="https://openrouter.ai/api/v1",
     api_key=OPENROUTER_KEY,
+    timeout=LLM_TIMEOUT_SECONDS,
+    max_retries=1,
 )
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
 
 contacts_collection = None
 feedback_collection = None
+stats_collection = None
+stats_cache = TTLCache(maxsize=1, ttl=STATS_CACHE_SECONDS)
+verdict_log_collection = None
+local_classifier = load_model()
+media_pipeline = MediaPipeline()
+detection_writer = DetectionWriter()
+media_cache = MediaResultCache()
+state_backend = None  # Sessions stay in this process until Mongo is reachable
+classification_cache = ClassificationCache(maxsize=CLASSIFICATION_CACHE_SIZE, ttl=CLASSIFICATION_CACHE_TTL_SECONDS)
 try:
-    mongo_client = MongoClient(
+    mongo_client = get_client(
         MONGO_URI,
         tls=True,
         tlsAllowInvalidCertificates=False,
@@ -51,23 +97,62 @@ try:
     )
     mongo_db = mongo_client[MONGO_DB]
     contacts_collection = mongo_db[MONGO_COLLECTION]
+    detection_writer.collection = contacts_collection
+    stats_collection = mongo_db[STATS_COLLECTION]
+    detection_writer.counters = stats_collection
     feedback_collection = mongo_db[FEEDBACK_COLLECTION]
     mongo_client.server_info()
-    n_docs = contacts_collection.count_documents({})
-    print(f"[MongoDB] Connection success! Collection '{MONGO_COLLECTION}' currently has {n_docs} documents.")
+    verdict_log_collection = mongo_db[VERDICT_LOG_COLLECTION]
+    media_pipeline.jobs_collection = mongo_db[MEDIA_JOBS_COLLECTION]
+    media_cache.collection = mongo_db[MEDIA_CACHE_COLLECTION]
+    media_cache.ensure_indexes()
+    classification_cache.collection = mongo_db[CLASSIFICATION_CACHE_COLLECTION]
+    classification_cache.ensure_indexes()
+    if SHARED_STATE:
+        state_backend = MongoStateBackend(mongo_db[STATE_COLLECTION])
+        state_backend.ensure_indexes()
+    n_docs = contacts_collection.estimated_document_count()
+    print(f"[MongoDB] Connection success! Collection '{MONGO_COLLECTION}' currently has about {n_docs} documents.")
     if n_docs == 0:
         print("[MongoDB] WARNING: No documents found in collection yet.")
 except Exception as e:
     print(f"[MongoDB] Connection failed: {e}")
     logger.error(f"[MongoDB] Connection failed: {e}")
 
-scammer_data = []
-decoy_conversations = defaultdict(lambda: {
-    'history': [],
-    'last_active': time.time(),
-    'decoy_state': None,
-    'tries': 0
-})
+if stats_collection is not None:
+    # A first build scans all of contacts; if it fails the bot still runs and /stats shows what is there
+    try:
+        ensure_counters(contacts_collection, stats_collection)
+    except Exception as e:
+        logger.error(f"[MongoDB] Could not build detection counters: {e}")
+
+recent_detections = RecentDetections(capacity=RECENT_DETECTIONS_SIZE)
+HUMAN_PERSONA_PROMPT = (
+    "You are a real person who is skeptical but hopeful. "
+    "You've lost money to scams before. "
+    "You're chatting privately with someone who claims to have received money. "
+    "Try to get concrete proof or details (such as UPI, bank, or social) before trusting. "
+    "Use natural, informal language, and never admit you are a bot or AI."
+)
+HUMAN_PERSONA_INSTRUCTIONS = (
+    "Continue acting like a real, informal, slightly emotional, skeptical human. "
+    "Ask for more details or proof if you haven't received it yet. "
+    "Do not repeat yourself word for word. Never reveal you are not human. "
+    "If the conversation seems stuck or repetitive, politely end it. "
+    "If the user keeps asking what kind of proof you want, list examples (like UPI ID, payment screenshot, bank details), but after two times, politely say you can't help further and end the conversation. "
+    "Use casual, natural language and try to sound different each time."
+)
+DM_MAX_TURNS = 8  # Exchanges before the persona signs off
+decoy_sessions = SessionStore(
+    DecoySession, idle_timeout=DECOY_IDLE_SECONDS, maxsize=DECOY_MAX_SESSIONS, backend=state_backend, namespace="decoy"
+)
+dm_sessions = SessionStore(
+    lambda user_id: DmSession(user_id, [{"role": "system", "content": HUMAN_PERSONA_PROMPT}]),
+    idle_timeout=DM_IDLE_SECONDS,
+    maxsize=DM_MAX_SESSIONS,
+    backend=state_backend,
+    namespace="dm"
+)
 
 HUMAN_DM = range(1)
 SCAM_ALERT_CHAT_ID = None  # Set to your admin/log group/channel id (e.g., -1001234567890)
@@ -76,17 +161,7 @@ ALLOWED_DOMAINS = [
     "upi.com", "facebook.com", "instagram.com", "twitter.com", "linkedin.com"
 ]
 
-reported_users = set()
-
-def extract_social_or_phone(text):
-    phones = re.findall(r"\b[6-9]\d{9}\b", text)
-    socials = re.findall(r"(instagram\.com/\S+|facebook\.com/\S+|insta:? ?@?\w+|fb:? ?@?\w+)", text, re.I)
-    return phones, socials
-
-def extract_upi_or_bank(text):
-    upi = re.findall(r"\b\w+@[a-z]+\b", text)
-    bank = re.findall(r"\b\d{9,18}\b", text)
-    return upi, bank
+reports_backend = state_backend or MemoryStateBackend()
 
 def contains_proof_phrase(text):
     triggers = [
@@ -105,28 +180,15 @@ def contains_intent_to_share(text):
     t = text.lower()
     return any(phrase in t for phrase in intent_phrases)
 
-def extract_sensitive_info(text):
-    upi_ids = re.findall(r"\b\w+@[a-z]+\b", text)
-    phones = re.findall(r"\b[6-9]\d{9}\b", text)
-    account_numbers = re.findall(r"\b\d{9,18}\b", text)
-    socials = re.findall(r"(facebook\.com/\S+|instagram\.com/\S+|insta:? ?@?\w+|fb:? ?@?\w+)", text, re.I)
-    return {
-        "upi_ids": upi_ids if upi_ids else [],
-        "phones": phones if phones else [],
-        "account_numbers": account_numbers if account_numbers else [],
-        "socials": socials if socials else [],
-    }
-
-def extract_urls(text):
-    url_pattern = re.compile(r'(https?://[^\s]+)')
-    return url_pattern.findall(text)
-
 def is_suspicious_url(url):
     for allowed in ALLOWED_DOMAINS:
         if allowed in url:
             return False
     return True
 
+def suspicious_urls_in(entities):
+    return [u for u in entities["urls"] if is_suspicious_url(u)]
+
 def extract_main_classification(gpt_response):
     gpt_response = gpt_response.lower()
     if "scammer" in gpt_response:
@@ -146,50 +208,53 @@ def wrap_list(val):
     else:
         return []
 
-def mongo_insert(doc):
-    if contacts_collection is None:
-        print("[MongoDB] Insert attempted but no DB connection.")
-        logger.error("[MongoDB] Insert attempted but no DB connection.")
-        return
-    try:
-        result = contacts_collection.insert_one(doc)
-        logger.info("[MongoDB] Inserted: %s", doc)
-        print(f"[MongoDB] Inserted with _id={result.inserted_id}: {doc}")
-    except Exception as e:
-        logger.error(f"MongoDB insert failed: {e}")
-        print(f"[MongoDB] Insert failed: {e}")
+async def llm_chat(messages, timeout=LLM_TIMEOUT_SECONDS, **kwargs):
+    """
+    Run a chat completion without blocking the event loop.
+
+    At most LLM_MAX_CONCURRENCY requests are in flight; the whole call, queueing
+    included, is cancelled after timeout seconds (raises asyncio.TimeoutError).
+    """
+    async def call():
+        async with llm_semaphore:
+            return await client.chat.completions.create(model=LLM_MODEL, messages=messages, **kwargs)
+
+    return await asyncio.wait_for(call(), timeout)
+
+CLASSIFICATION_GUIDE = (
+    "You are a message classifier. Classify the following message as exactly one of: 'scammer', 'decoy', or 'innocent'.\n"
+    "- A 'scammer' is someone trying to get money or personal information, often sharing UPI, bank, or social handles, or asking you to contact them for a reward.\n"
+    "- A 'decoy' is someone posting fake testimonials or reviews (e.g., 'I have won 10 lakhs, thank you!', 'I received my money, this is real!') meant to make others trust the scam.\n"
+    "- 'Innocent' is anything not related to a scam.\n"
+    "\n"
+    "EXAMPLES:\n"
+    "1. 'Send me your UPI to get money.' => scammer\n"
+    "2. 'I have won 10 lakhs, thank you so much!' => decoy\n"
+    "3. 'Is this group legit?' => innocent\n"
+    "4. 'Contact me for your reward: john@upi' => scammer\n"
+    "5. 'This worked for me, I got my payment.' => decoy\n"
+    "6. 'What types of proof do you want?' => decoy\n"
+    "7. 'How can I prove it?' => decoy\n"
+    "8. 'My bank account is 1234567890, send money here.' => scammer\n"
+    "9. 'I have a question about the process.' => innocent\n"
+    "10. 'Why do you need my details?' => decoy\n"
+    "11. 'What do you want as proof?' => decoy\n"
+    "\n"
+    "If the message is a question from someone who appears to be engaging or skeptical, and not asking for money or sharing bank/UPI, classify as 'decoy' or 'innocent'.\n"
+)
 
 async def classify_message_with_gpt(text):
     try:
-        completion = client.chat.completions.create(
+        completion = await llm_chat(
             extra_headers={
                 "HTTP-Referer": "https://yourwebsite.com",
                 "X-Title": "ScamHunterBot",
             },
-            model="google/gemma-3n-e4b-it:free",
             messages=[
                 {
                     "role": "user",
                     "content": (
-                        "You are a message classifier. Classify the following message as exactly one of: 'scammer', 'decoy', or 'innocent'.\n"
-                        "- A 'scammer' is someone trying to get money or personal information, often sharing UPI, bank, or social handles, or asking you to contact them for a reward.\n"
-                        "- A 'decoy' is someone posting fake testimonials or reviews (e.g., 'I have won 10 lakhs, thank you!', 'I received my money, this is real!') meant to make others trust the scam.\n"
-                        "- 'Innocent' is anything not related to a scam.\n"
-                        "\n"
-                        "EXAMPLES:\n"
-                        "1. 'Send me your UPI to get money.' => scammer\n"
-                        "2. 'I have won 10 lakhs, thank you so much!' => decoy\n"
-                        "3. 'Is this group legit?' => innocent\n"
-                        "4. 'Contact me for your reward: john@upi' => scammer\n"
-                        "5. 'This worked for me, I got my payment.' => decoy\n"
-                        "6. 'What types of proof do you want?' => decoy\n"
-                        "7. 'How can I prove it?' => decoy\n"
-                        "8. 'My bank account is 1234567890, send money here.' => scammer\n"
-                        "9. 'I have a question about the process.' => innocent\n"
-                        "10. 'Why do you need my details?' => decoy\n"
-                        "11. 'What do you want as proof?' => decoy\n"
-                        "\n"
-                        "If the message is a question from someone who appears to be engaging or skeptical, and not asking for money or sharing bank/UPI, classify as 'decoy' or 'innocent'.\n"
+                        CLASSIFICATION_GUIDE +
                         "Now classify this message:\n"
                         f"{text}\n"
                         "Only reply with one word: scammer, decoy, or innocent."
@@ -199,105 +264,142 @@ async def classify_message_with_gpt(text):
         )
         logger.info(f"[GPT Output] {completion}")
         return completion.choices[0].message.content.strip().lower()
+    except asyncio.TimeoutError:
+        logger.error(f"GPT classification timed out after {LLM_TIMEOUT_SECONDS}s")
+        return "unknown"
     except Exception as e:
         logger.error(f"Error in GPT classification: {e}")
         return "unknown"
 
-# ----------- AssemblyAI VOICE HANDLER -----------
-
-def transcribe_with_assemblyai(audio_bytes, api_key):
-    headers = {'authorization': api_key}
-    upload_response = requests.post(
-        'https://api.assemblyai.com/v2/upload',
-        headers=headers,
-        data=audio_bytes
-    )
-    upload_url = upload_response.json()['upload_url']
-
-    transcript_response = requests.post(
-        'https://api.assemblyai.com/v2/transcript',
-        headers={**headers, 'content-type': 'application/json'},
-        json={'audio_url': upload_url}
-    )
-    transcript_id = transcript_response.json()['id']
-
-    while True:
-        polling = requests.get(
-            f'https://api.assemblyai.com/v2/transcript/{transcript_id}',
-            headers=headers
+async def classify_batch_with_gpt(texts):
+    """
+    Classify several messages with one LLM request; returns one raw label per text.
+    Falls back to one request per message if the batched answer can't be used.
+    """
+    if len(texts) == 1:
+        return [await classify_message_with_gpt(texts[0])]
+    numbered = "\n".join(f"{i}. {json.dumps(text, ensure_ascii=False)}" for i, text in enumerate(texts, 1))
+    try:
+        completion = await llm_chat(
+            extra_headers={
+                "HTTP-Referer": "https://yourwebsite.com",
+                "X-Title": "ScamHunterBot",
+            },
+            messages=[
+                {
+                    "role": "user",
+                    "content": (
+                        CLASSIFICATION_GUIDE +
+                        f"Now classify each of these {len(texts)} messages (JSON strings, numbered):\n"
+                        f"{numbered}\n"
+                        f"Only reply with a JSON array of exactly {len(texts)} strings, one per message in order, "
+                        "each being scammer, decoy, or innocent."
+                    ),
+                }
+            ],
         )
-        status = polling.json()['status']
-        if status == "completed":
-            return polling.json()['text']
-        elif status == "failed":
-            return ""
-        time.sleep(2)
-
-# ----------- OCR.SPACE IMAGE OCR HANDLER -----------
-
-def ocr_space_image(image_bytes, api_key=OCR_SPACE_API_KEY):
-    payload = {
-        'isOverlayRequired': False,
-        'OCREngine': 2,
-    }
-    files = {
-        'filename': ('image.png', image_bytes)
-    }
-    headers = {
-        'apikey': api_key,
-    }
-    r = requests.post('https://api.ocr.space/parse/image',
-                      files=files,
-                      data=payload,
-                      headers=headers,
-                      )
-    result = r.json()
-    return result['ParsedResults'][0]['ParsedText'] if 'ParsedResults' in result else ""
+        content = completion.choices[0].message.content
+        labels = json.loads(content[content.index("["):content.rindex("]") + 1])
+        if not isinstance(labels, list) or len(labels) != len(texts):
+            raise ValueError(f"expected {len(texts)} labels, got {content!r}")
+        logger.info(f"[GPT Batch] {len(texts)} messages classified in one request")
+        return [str(label).strip().lower() for label in labels]
+    except asyncio.TimeoutError:
+        logger.error(f"GPT batch classification timed out after {LLM_TIMEOUT_SECONDS}s")
+    except Exception as e:
+        logger.error(f"Error in GPT batch classification, classifying individually: {e}")
+    return list(await asyncio.gather(*(classify_message_with_gpt(text) for text in texts)))
 
-# ----------- END OCR.SPACE IMAGE OCR HANDLER -----------
+classification_batcher = ClassificationBatcher(
+    classify_batch_with_gpt, window_ms=LLM_BATCH_WINDOW_MS, max_batch=LLM_BATCH_MAX_SIZE
+)
+
+async def log_verdict(text, classification):
+    if verdict_log_collection is None or classification not in ("scammer", "decoy", "innocent"):
+        return
+    try:
+        await asyncio.to_thread(verdict_log_collection.insert_one, {
+            "text": text,
+            "classification": classification,
+            "source": "llm",
+            "datetime": datetime.utcnow()
+        })
+    except Exception as e:
+        logger.error(f"Verdict log insert failed: {e}")
+
+async def classify_message(text):
+    """
+    Main classification for text: the classification cache first, then the local
+    classifier when it is confident, and the LLM only for what is left.
+    """
+    cached = await classification_cache.get(text)
+    if cached is not None:
+        logger.info(f"Classification cache hit: {cached} {classification_cache.stats()}")
+        return cached
+    if local_classifier is not None:
+        label, confidence = local_classifier.predict(text)
+        if confidence >= LOCAL_CLASSIFIER_THRESHOLD:
+            logger.info(f"Local classifier: {label} ({confidence:.3f}), skipping LLM")
+            await classification_cache.set(text, label)
+            return label
+    main_classification = extract_main_classification(await classification_batcher.classify(text))
+    await classification_cache.set(text, main_classification)
+    await log_verdict(text, main_classification)
+    return main_classification
+
+def remember_detection(doc):
+    repeated = recent_detections.add(doc)
+    if repeated:
+        logger.info(f"Identifiers already in recent detections: {repeated}")
+
+async def save_session(store, session):
+    try:
+        await store.save(session)
+    except VersionConflict:
+        logger.warning(f"Session of {session.user_id} was changed by another worker; keeping their version")
 
 async def handle_decoy_convo(update, convo, user_id, username):
     text = update.message.text
-    convo['history'].append({"role": "user", "content": text})
-    convo['last_active'] = time.time()
+    convo.history.append({"role": "user", "content": text})
 
-    upi, bank = extract_upi_or_bank(text)
-    phones, socials = extract_social_or_phone(text)
+    entities = extract_entities(text)
+    upi, bank = entities["upi_ids"], entities["account_numbers"]
+    phones, socials = entities["phones"], entities["socials"]
 
-    if convo.get('decoy_state') == 'awaiting_proof':
+    if convo.decoy_state == 'awaiting_proof':
         if upi or "screenshot" in text.lower() or contains_proof_phrase(text):
-            convo['decoy_state'] = 'awaiting_contact'
-            convo['tries'] = 0
+            convo.decoy_state = 'awaiting_contact'
+            convo.tries = 0
             await update.message.reply_text(
                 "Nice, got it! Now just send me your phone number or Insta/Facebook so we can finish this up."
             )
             return
         elif contains_intent_to_share(text):
-            convo['tries'] = convo.get('tries', 0) + 1
-            if convo['tries'] >= 3:
+            convo.tries += 1
+            if convo.tries >= 3:
                 await update.message.reply_text(
                     "Alright, if you wanna share proof later, just ping me!"
                 )
-                convo['decoy_state'] = 'completed'
-                del decoy_conversations[user_id]
+                convo.decoy_state = 'completed'
+                await decoy_sessions.end(convo)
             else:
                 await update.message.reply_text("Ok, share it.")
             return
         else:
-            convo['tries'] = convo.get('tries', 0) + 1
-            if convo['tries'] >= 3:
+            convo.tries += 1
+            if convo.tries >= 3:
                 await update.message.reply_text(
                     "I need your UPI ID or payment screenshot as proof to go ahead."
                 )
-                convo['decoy_state'] = 'completed'
-                del decoy_conversations[user_id]
+                convo.decoy_state = 'completed'
+                await decoy_sessions.end(convo)
             else:
                 await update.message.reply_text(
                     "Can you share your UPI ID or a payment screenshot?"
                 )
             return
 
-    if convo.get('decoy_state') == 'awaiting_contact':
+    if convo.decoy_state == 'awaiting_contact':
         if phones or socials:
             doc = {
                 "user": username,
@@ -307,21 +409,21 @@ async def handle_decoy_convo(update, convo, user_id, username):
                 "account_numbers": wrap_list(bank),
                 "phones": wrap_list(phones),
                 "socials": wrap_list(socials),
-                "datetime": datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+                "datetime": datetime.utcnow()
             }
-            scammer_data.append(doc)
-            mongo_insert(doc)
+            remember_detection(doc)
+            await detection_writer.write(doc)
             await update.message.reply_text(
                 "Awesome, thanks! That's all I needed. Take care!"
             )
-            convo['decoy_state'] = 'completed'
-            del decoy_conversations[user_id]
+            convo.decoy_state = 'completed'
+            await decoy_sessions.end(convo)
             return
         else:
-            convo['tries'] = convo.get('tries', 0) + 1
-            if convo['tries'] >= 2:
-                convo['decoy_state'] = 'awaiting_bank_lure'
-                convo['tries'] = 0
+            convo.tries += 1
+            if convo.tries >= 2:
+                convo.decoy_state = 'awaiting_bank_lure'
+                convo.tries = 0
                 await update.message.reply_text(
                     "You know what, it's fine. I trust you. Just send me your account number, I'll pay you and you invest for me."
                 )
@@ -331,8 +433,7 @@ async def handle_decoy_convo(update, convo, user_id, username):
                 )
             return
 
-    if convo.get('decoy_state') == 'awaiting_bank_lure':
-        upi, bank = extract_upi_or_bank(text)
+    if convo.decoy_state == 'awaiting_bank_lure':
         if bank:
             doc = {
                 "user": username,
@@ -342,30 +443,30 @@ async def handle_decoy_convo(update, convo, user_id, username):
                 "account_numbers": wrap_list(bank),
                 "phones": [],
                 "socials": [],
-                "datetime": datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+                "datetime": datetime.utcnow()
             }
-            scammer_data.append(doc)
-            mongo_insert(doc)
+            remember_detection(doc)
+            await detection_writer.write(doc)
             await update.message.reply_text("Perfect, thanks! You're a lifesaver. 👍")
-            convo['decoy_state'] = 'completed'
-            del decoy_conversations[user_id]
+            convo.decoy_state = 'completed'
+            await decoy_sessions.end(convo)
         else:
-            convo['tries'] = convo.get('tries', 0) + 1
-            if convo['tries'] >= 2:
+            convo.tries += 1
+            if convo.tries >= 2:
                 await update.message.reply_text(
                     "Just drop your account number if you want me to pay you. Otherwise, no worries!"
                 )
-                convo['decoy_state'] = 'completed'
-                del decoy_conversations[user_id]
+                convo.decoy_state = 'completed'
+                await decoy_sessions.end(convo)
             else:
                 await update.message.reply_text(
                     "Share your account number, I'll send the money and you invest from your side."
                 )
         return
 
-    if not convo.get('decoy_state'):
-        convo['decoy_state'] = 'awaiting_proof'
-        convo['tries'] = 0
+    if not convo.decoy_state:
+        convo.decoy_state = 'awaiting_proof'
+        convo.tries = 0
         await update.message.reply_text(
             "Hey, can you send your UPI or a payment screenshot as proof?"
         )
@@ -383,26 +484,22 @@ async def handle_group_message(update: Update, context: ContextTypes.DEFAULT_TYP
             username = user.username if user.username else str(user_id)
             logger.info(f"Group message from {user_id}: {text}")
 
-            gpt_response = await classify_message_with_gpt(text)
-            main_classification = extract_main_classification(gpt_response)
-            is_decoy_in_progress = user_id in decoy_conversations
+            main_classification = await classify_message(text)
+            convo = await decoy_sessions.get(user_id)
+            is_decoy_in_progress = convo is not None
 
             logger.info(f"Classified as: {main_classification}, decoy_in_progress: {is_decoy_in_progress}")
 
-            for uid, d in list(decoy_conversations.items()):
-                if time.time() - d['last_active'] > 3600:
-                    del decoy_conversations[uid]
-
-            urls = extract_urls(text)
-            suspicious_urls = [u for u in urls if is_suspicious_url(u)]
-
             if main_classification == "decoy" or is_decoy_in_progress:
-                convo = decoy_conversations[user_id]
+                if convo is None:
+                    convo = decoy_sessions.create(user_id)
                 await handle_decoy_convo(update, convo, user_id, username)
+                await save_session(decoy_sessions, convo)
                 return
 
             if main_classification == "scammer":
-                extracted = extract_sensitive_info(text)
+                extracted = extract_entities(text)
+                suspicious_urls = suspicious_urls_in(extracted)
                 doc = {
                     "user": username,
                     "text": suspicious_urls[0] if suspicious_urls else text,
@@ -411,10 +508,10 @@ async def handle_group_message(update: Update, context: ContextTypes.DEFAULT_TYP
                     "phones": extracted["phones"],
                     "account_numbers": extracted["account_numbers"],
                     "socials": extracted["socials"],
-                    "datetime": datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+                    "datetime": datetime.utcnow()
                 }
-                scammer_data.append(doc)
-                mongo_insert(doc)
+                remember_detection(doc)
+                await detection_writer.write(doc)
                 if SCAM_ALERT_CHAT_ID is not None:
                     try:
                         await context.bot.send_message(
@@ -432,25 +529,12 @@ async def human_dm(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = update.message.text
     logger.info(f"DM from {user_id}: {text}")
 
-    if "human_histories" not in context.bot_data:
-        context.bot_data["human_histories"] = {}
-    if user_id not in context.bot_data["human_histories"]:
-        context.bot_data["human_histories"][user_id] = [
-            {"role": "system", "content": (
-                "You are a real person who is skeptical but hopeful. "
-                "You've lost money to scams before. "
-                "You're chatting privately with someone who claims to have received money. "
-                "Try to get concrete proof or details (such as UPI, bank, or social) before trusting. "
-                "Use natural, informal language, and never admit you are a bot or AI."
-            )}
-        ]
-    history = context.bot_data["human_histories"][user_id]
-    history.append({"role": "user", "content": text})
-
-    extracted = extract_sensitive_info(text)
-    urls = extract_urls(text)
-    suspicious_urls = [u for u in urls if is_suspicious_url(u)]
-    if any(extracted.values()) or suspicious_urls:
+    session = await dm_sessions.get_or_create(user_id)
+    session.history.append({"role": "user", "content": text})
+
+    extracted = extract_entities(text)
+    suspicious_urls = suspicious_urls_in(extracted)
+    if any(extracted[k] for k in ("upi_ids", "phones", "account_numbers", "socials")) or suspicious_urls:
         doc = {
             "user": user_id,
             "text": suspicious_urls[0] if suspicious_urls else text,
@@ -459,30 +543,26 @@ async def human_dm(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "phones": extracted["phones"],
             "account_numbers": extracted["account_numbers"],
             "socials": extracted["socials"],
-            "datetime": datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+            "datetime": datetime.utcnow()
         }
-        scammer_data.append(doc)
-        mongo_insert(doc)
+        remember_detection(doc)
+        await detection_writer.write(doc)
         await update.message.reply_text(
             "Wow, thanks for being straight up! Stay safe out there."
         )
-        context.bot_data["human_histories"].pop(user_id, None)
+        await dm_sessions.end(session)
         return ConversationHandler.END
 
+    session.history, session.summary = compact_history(session.history, session.summary, HUMAN_PERSONA_INSTRUCTIONS)
+    messages = build_messages(session.history, session.summary, HUMAN_PERSONA_INSTRUCTIONS)
     try:
-        reply = client.chat.completions.create(
-            model="google/gemma-3n-e4b-it:free",
-            messages=history + [
-                {"role": "system", "content":
-                    "Continue acting like a real, informal, slightly emotional, skeptical human. "
-                    "Ask for more details or proof if you haven't received it yet. "
-                    "Do not repeat yourself word for word. Never reveal you are not human. "
-                    "If the conversation seems stuck or repetitive, politely end it. "
-                    "If the user keeps asking what kind of proof you want, list examples (like UPI ID, payment screenshot, bank details), but after two times, politely say you can't help further and end the conversation. "
-                    "Use casual, natural language and try to sound different each time."
-                }
-            ],
-            max_tokens=80,
+        started = time.perf_counter()
+        reply = await llm_chat(messages=messages, max_tokens=80)
+        usage = getattr(reply, "usage", None)
+        logger.info(
+            f"DM turn {session.turns + 1} with {user_id}: "
+            f"{usage.prompt_tokens if usage else prompt_tokens(messages)} prompt tokens, "
+            f"{time.perf_counter() - started:.2f}s"
         )
         gpt_reply = reply.choices[0].message.content.strip()
         if not gpt_reply or "fuzzy" in gpt_reply.lower():
@@ -491,45 +571,71 @@ async def human_dm(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.error(f"GPT DM error: {e}")
         gpt_reply = "Hey, can you tell me a bit more? Just being careful after what happened before."
 
-    history.append({"role": "assistant", "content": gpt_reply})
+    session.history.append({"role": "assistant", "content": gpt_reply})
+    session.turns += 1
     await update.message.reply_text(gpt_reply)
-    if len(history) > 16:
+    if session.turns >= DM_MAX_TURNS:
         await update.message.reply_text("Alright, gotta go for now. Thanks for chatting!")
-        context.bot_data["human_histories"].pop(user_id, None)
+        await dm_sessions.end(session)
         return ConversationHandler.END
+    await save_session(dm_sessions, session)
     return HUMAN_DM
 
+async def extract_media_entities(bot, kind, media, api_key, username):
+    """
+    Text and entities of a photo ("ocr") or voice note ("transcription").
+
+    Media already seen under the same file_unique_id is answered without a
+    download; identical content, or an image with identical pixels, is answered without
+    an OCR/transcription call. Images are shrunk before upload; voice notes
+    (already compact Opus) are streamed as downloaded.
+    """
+    cached = await media_cache.lookup_unique_id(kind, media.file_unique_id)
+    if cached is None:
+        data = await download_telegram_file(bot, media.file_id)
+        sha256, image, cached = await media_cache.lookup_content(kind, media.file_unique_id, data)
+        if cached is None:
+            if kind == "ocr":
+                data = await asyncio.to_thread(prepare_image_for_ocr, data)
+            text = await media_pipeline.submit(kind, data, api_key, meta={"user": username, "file_id": media.file_id})
+            entities = extract_entities(text)
+            entities = {k: entities[k] for k in ENTITY_KINDS}
+            await media_cache.store(kind, media.file_unique_id, sha256, image, text, entities)
+            return text, entities
+    logger.info(f"Reusing cached {kind} result for {media.file_unique_id} {media_cache.stats()}")
+    entities = cached.get("entities")
+    if entities is None:
+        entities = extract_entities(cached["text"])
+    return cached["text"], entities
+
 async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         user = update.message.from_user
         user_id = user.id
         username = user.username if user.username else str(user_id)
-        photo = update.message.photo[-1]
-        file = await context.bot.get_file(photo.file_id)
-        photo_bytes = await file.download_as_bytearray()
-        extracted_text = ocr_space_image(photo_bytes)  # Use cloud OCR
-
-        extracted = extract_sensitive_info(extracted_text)
-        urls = extract_urls(extracted_text)
-        suspicious_urls = [u for u in urls if is_suspicious_url(u)]
+        photo = choose_photo_size(update.message.photo)
+        extracted_text, extracted = await extract_media_entities(
+            context.bot, "ocr", photo, OCR_SPACE_API_KEY, username
+        )
+        suspicious_urls = suspicious_urls_in(extracted)
 
         doc = {
             "user": username,
             "text": suspicious_urls[0] if suspicious_urls else extracted_text,
-            "classification": "scammer",
+            "classification": "scammer_image",
             "upi_ids": extracted["upi_ids"],
             "phones": extracted["phones"],
             "account_numbers": extracted["account_numbers"],
             "socials": extracted["socials"],
-            "datetime": datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+            "datetime": datetime.utcnow()
         }
-        scammer_data.append(doc)
-        mongo_insert(doc)
-        if update.message.chat.type == "private" or user_id in decoy_conversations:
+        remember_detection(doc)
+        await detection_writer.write(doc)
+        if update.message.chat.type == "private" or await decoy_sessions.active(user_id):
             await update.message.reply_text("Image processed and analyzed.")
     except Exception as e:
         logger.error(f"Image processing error: {e}")
-        if update.message.chat.type == "private" or user_id in decoy_conversations:
+        if update.message.chat.type == "private" or await decoy_sessions.active(user_id):
             await update.message.reply_text("Image could not be processed.")
 
 async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -537,32 +643,28 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.message.from_user
         user_id = user.id
         username = user.username if user.username else str(user_id)
-        file = await context.bot.get_file(update.message.voice.file_id)
-        voice_bytes = await file.download_as_bytearray()
-
-        transcript = transcribe_with_assemblyai(voice_bytes, ASSEMBLYAI_API_KEY)
-
-        extracted = extract_sensitive_info(transcript)
-        urls = extract_urls(transcript)
-        suspicious_urls = [u for u in urls if is_suspicious_url(u)]
+        transcript, extracted = await extract_media_entities(
+            context.bot, "transcription", update.message.voice, ASSEMBLYAI_API_KEY, username
+        )
+        suspicious_urls = suspicious_urls_in(extracted)
 
         doc = {
             "user": username,
             "text": suspicious_urls[0] if suspicious_urls else transcript,
-            "classification": "scammer",
+            "classification": "scammer_voice",
             "upi_ids": extracted["upi_ids"],
             "phones": extracted["phones"],
             "account_numbers": extracted["account_numbers"],
             "socials": extracted["socials"],
-            "datetime": datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+            "datetime": datetime.utcnow()
         }
-        scammer_data.append(doc)
-        mongo_insert(doc)
-        if update.message.chat.type == "private" or user_id in decoy_conversations:
+        remember_detection(doc)
+        await detection_writer.write(doc)
+        if update.message.chat.type == "private" or await decoy_sessions.active(user_id):
             await update.message.reply_text("Voice message processed and analyzed.")
     except Exception as e:
         logger.error(f"Voice processing error: {e}")
-        if update.message.chat.type == "private" or user_id in decoy_conversations:
+        if update.message.chat.type == "private" or await decoy_sessions.active(user_id):
             await update.message.reply_text("Voice could not be processed.")
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -587,23 +689,41 @@ async def report_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Usage: /report <@username or user id>")
         return
     reported = context.args[0]
-    reported_users.add(reported)
+    try:
+        await reports_backend.put(REPORTED_NAMESPACE, reported, {
+            "reported_by": update.message.from_user.id,
+            "reported_at": datetime.utcnow()
+        }, 0)
+    except VersionConflict:
+        pass  # Already flagged
     await update.message.reply_text(f"User {reported} has been flagged for review. Thank you!")
 
+async def load_stats():
+    stats = stats_cache.get("stats")
+    if stats is None:
+        counters = await asyncio.to_thread(read_counters, stats_collection)
+        stats = {**counters, "decoy_chats": await decoy_sessions.count()}
+        stats_cache.set("stats", stats)
+    return stats
+
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    scam_count = contacts_collection.count_documents({"classification": "scammer"})
-    decoy_count = contacts_collection.count_documents({"classification": "decoy"})
-    image_count = contacts_collection.count_documents({"classification": "scammer"})
-    voice_count = contacts_collection.count_documents({"classification": "scammer"})
-    total = contacts_collection.count_documents({})
+    if stats_collection is None:
+        await update.message.reply_text("Stats are unavailable right now.")
+        return
+    stats = await load_stats()
+    counts = stats["by_classification"]
+    image_count = counts.get("scammer_image", 0)
+    voice_count = counts.get("scammer_voice", 0)
     await update.message.reply_text(
         f"📊 *Scam Hunter Stats*\n"
-        f"Scammers flagged: {scam_count}\n"
-        f"Decoys detected: {decoy_count}\n"
+        f"Scammers flagged: {counts.get('scammer', 0) + image_count + voice_count}\n"
+        f"Decoys detected: {counts.get('decoy', 0)}\n"
         f"Images flagged: {image_count}\n"
         f"Voice flagged: {voice_count}\n"
-        f"Total processed: {total}"
+        f"Total processed: {stats['total']}\n"
+        f"Decoy chats in progress: {stats['decoy_chats']}"
     )
+    logger.info(f"Decoy sessions: {decoy_sessions.stats()}, DM sessions: {dm_sessions.stats()}")
 
 async def feedback_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
@@ -613,13 +733,28 @@ async def feedback_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     feedback_doc = {
         "user": update.message.from_user.username or update.message.from_user.id,
         "feedback": feedback,
-        "datetime": datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+        "datetime": datetime.utcnow()
     }
     feedback_collection.insert_one(feedback_doc)
     await update.message.reply_text("Thank you for your feedback!")
 
+async def post_init(application):
+    await media_pipeline.start()
+    await detection_writer.start()
+
+async def post_shutdown(application):
+    await media_pipeline.stop()
+    await detection_writer.stop()
+
 def main():
-    application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
+    application = (
+        ApplicationBuilder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .concurrent_updates(CONCURRENT_UPDATES)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     group_handler = MessageHandler(
         filters.TEXT & (filters.ChatType.GROUPS | filters.ChatType.SUPERGROUP),
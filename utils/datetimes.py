@@ -0,0 +1,32 @@
+from datetime import datetime
+
+LEGACY_BOT_FORMAT = "%d-%m-%Y %H:%M:%S"  # What the bot stored before it wrote BSON dates
+
+def is_legacy_timestamp(value):
+    """True for a string in the legacy bot format, which was written in the bot host's local time."""
+    if not isinstance(value, str):
+        return False
+    text = value.strip()
+    return len(text) == 19 and text[2] == "-" and text[5] == "-"
+
+def parse_timestamp(value):
+    """
+    datetime for a stored timestamp. BSON dates are returned as they are;
+    strings in the legacy bot format ("06-07-2025 12:25:30") or ISO form
+    ("2025-07-06 12:25:30", "2025-07-06T12:25:30Z") are parsed without
+    trying formats one after another. Raises ValueError for anything else.
+    """
+    if isinstance(value, datetime):
+        return value
+    if not isinstance(value, str):
+        raise ValueError(f"Unrecognised timestamp: {value!r}")
+    text = value.strip()
+    try:
+        if is_legacy_timestamp(text):
+            return datetime(int(text[6:10]), int(text[3:5]), int(text[0:2]),
+                            int(text[11:13]), int(text[14:16]), int(text[17:19]))
+        if text.endswith("Z"):
+            text = text[:-1]
+        return datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"Unrecognised timestamp: {value!r}") from None
@@ -0,0 +1,100 @@
+import re
+
+# Entity patterns, identical to the ones the bot handlers used to run separately.
+URL_RE = re.compile(r"https?://[^\s]+")
+SOCIAL_RE = re.compile(r"instagram\.com/\S+|facebook\.com/\S+|insta:? ?@?\w+|fb:? ?@?\w+", re.I)
+UPI_RE = re.compile(r"\b\w+@[a-z]+\b")
+DIGITS_RE = re.compile(r"\b\d{9,18}\b")  # Account numbers; 10-digit runs starting 6-9 are also phones
+
+SOCIAL_ANCHORS = ("insta", "fb", "facebook.com/")  # Every social match starts with one of these
+CASE_FOLD_EXCEPTIONS = "\u0130\u0131\u017f\u212a"  # Non-ASCII letters re.I matches against a-z
+ENTITY_KINDS = ("upi_ids", "phones", "account_numbers", "socials", "urls")
+
+def _find_all(haystack, needle):
+    pos = haystack.find(needle)
+    while pos != -1:
+        yield pos
+        pos = haystack.find(needle, pos + 1)
+
+def _is_word(ch):
+    # Same definition of \w as the re module uses for str patterns
+    return ch.isalnum() or ch == "_"
+
+def _upi_starts(text):
+    """Start of the word run before each '@' -- the only places a UPI ID can begin."""
+    for at in _find_all(text, "@"):
+        start = at
+        while start and _is_word(text[start - 1]):
+            start -= 1
+        if start < at:
+            yield start
+
+def _social_starts(text):
+    lowered = text.lower()
+    # re.I also folds these to ASCII letters, and lower() can change offsets; scan the slow way
+    if len(lowered) != len(text) or any(ch in text for ch in CASE_FOLD_EXCEPTIONS):
+        return (m.start() for m in SOCIAL_RE.finditer(text))
+    starts = set()
+    for anchor in SOCIAL_ANCHORS:
+        starts.update(_find_all(lowered, anchor))
+    return sorted(starts)
+
+def _match_at(text, pattern, starts):
+    """Matches of pattern beginning at starts, with re.finditer's non-overlapping semantics."""
+    next_free = 0
+    for pos in starts:
+        if pos < next_free:
+            continue
+        match = pattern.match(text, pos)
+        if match is not None:
+            next_free = match.end()
+            yield match
+
+def extract_entities(text):
+    """
+    Extract every entity type from text with one call and no redundant scans.
+
+    UPI IDs and social handles are only matched at their anchors ('@' and the
+    insta/fb/facebook prefixes), URLs only when '://' occurs, and a single digit
+    scan yields both account numbers and phones. Each kind returns exactly what
+    its own re.findall would, overlaps between kinds included.
+
+    Returns deduplicated "upi_ids", "phones", "account_numbers", "socials" and
+    "urls" lists in first-seen order, plus "spans": (kind, start, end, value)
+    tuples for every match.
+    """
+    result = {"upi_ids": [], "phones": [], "account_numbers": [], "socials": [], "urls": [], "spans": []}
+    if not text:
+        return result
+    spans = result["spans"]
+
+    def collect(kind, matches):
+        values = result[kind]
+        seen = set()
+        for match in matches:
+            value = match.group()
+            spans.append((kind, match.start(), match.end(), value))
+            if value not in seen:
+                seen.add(value)
+                values.append(value)
+
+    if "@" in text:
+        collect("upi_ids", _match_at(text, UPI_RE, _upi_starts(text)))
+    if "://" in text:
+        collect("urls", URL_RE.finditer(text))
+    collect("socials", _match_at(text, SOCIAL_RE, _social_starts(text)))
+
+    seen_accounts, seen_phones = set(), set()
+    for match in DIGITS_RE.finditer(text):
+        value = match.group()
+        start, end = match.span()
+        spans.append(("account_numbers", start, end, value))
+        if value not in seen_accounts:
+            seen_accounts.add(value)
+            result["account_numbers"].append(value)
+        if end - start == 10 and value[0] in "6789":
+            spans.append(("phones", start, end, value))
+            if value not in seen_phones:
+                seen_phones.add(value)
+                result["phones"].append(value)
+    return result